@@ -0,0 +1,22 @@
+"""
+Benchmarks for the API and consumer hot paths.
+
+Usage:
+
+    python -m benchmarks [--meteringpoints N] [--output results.json]
+
+See benchmarks/__main__.py for all options. Seeds the database
+configured by SQL_URI with generated MeteringPoints (see seed.py) and
+measures the scenarios in scenarios.py against it, writing the results
+as JSON for comparison between runs.
+"""
+import os
+import sys
+
+
+# Adds the src folder to the local path (as tests/conftest.py does)
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(benchmarks_dir, '..', 'src')
+
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
@@ -0,0 +1,268 @@
+"""
+Runs the benchmarks and writes the results as JSON.
+
+Usage:
+
+    python -m benchmarks [--meteringpoints N] [--output PATH]
+
+Connects to the database configured by SQL_URI (and SQL_REPLICA_URI),
+and requires INTERNAL_TOKEN_SECRET to be set, like the API.
+
+Seeds the database with generated data, unless it already contains
+MeteringPoints (use --reset to replace them, or --skip-seed to use
+them as they are). NEVER point it at a database with data to keep.
+"""
+import sys
+import json
+import platform
+import argparse
+from typing import Any, Dict, List
+from datetime import datetime, timezone
+from dataclasses import asdict
+from contextlib import redirect_stdout
+
+from sqlalchemy import text
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.config import (
+    PAGE_SIZE_DEFAULT,
+    SUBJECT_READ_MODEL_ENABLED,
+)
+from meteringpoints_api.app import create_app
+
+from .seed import (
+    SeedParameters,
+    get_subjects_by_rank,
+    is_seeded,
+    reset,
+    seed,
+)
+from .scenarios import (
+    Result,
+    bench_details,
+    bench_list,
+    bench_consumer,
+)
+
+
+SCENARIOS = ('details', 'list', 'consumer')
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    defaults = SeedParameters()
+
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmark the API and consumer against a database.',
+    )
+
+    seeding = parser.add_argument_group('seeding')
+    seeding.add_argument(
+        '--meteringpoints',
+        type=int,
+        default=defaults.meteringpoints,
+        help=f'Number of MeteringPoints (default: {defaults.meteringpoints})',
+    )
+    seeding.add_argument(
+        '--subjects',
+        type=int,
+        default=defaults.subjects,
+        help=f'Number of subjects (default: {defaults.subjects})',
+    )
+    seeding.add_argument(
+        '--delegates-per-meteringpoint',
+        type=int,
+        default=defaults.delegates_per_meteringpoint,
+        help='Number of delegates per MeteringPoint '
+             f'(default: {defaults.delegates_per_meteringpoint})',
+    )
+    seeding.add_argument(
+        '--skew',
+        type=float,
+        default=defaults.skew,
+        help='Skew of delegates per subject, 1 being uniform '
+             f'(default: {defaults.skew})',
+    )
+    seeding.add_argument(
+        '--random-seed',
+        type=float,
+        default=defaults.random_seed,
+        help='Seed for random(), between -1 and 1 '
+             f'(default: {defaults.random_seed})',
+    )
+    seeding.add_argument(
+        '--reset',
+        action='store_true',
+        help='Delete existing data before seeding',
+    )
+    seeding.add_argument(
+        '--skip-seed',
+        action='store_true',
+        help='Benchmark against existing data without seeding',
+    )
+
+    parser.add_argument(
+        '--scenario',
+        action='append',
+        choices=SCENARIOS,
+        help='Scenario to run (repeatable, default: all)',
+    )
+    parser.add_argument(
+        '--requests',
+        type=int,
+        default=200,
+        help='Number of /details requests per subject (default: 200)',
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=20,
+        help='Number of times to list per subject (default: 20)',
+    )
+    parser.add_argument(
+        '--pages',
+        type=int,
+        default=5,
+        help='Number of pages to follow when listing (default: 5)',
+    )
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=PAGE_SIZE_DEFAULT,
+        help='Number of MeteringPoints per page '
+             f'(default: {PAGE_SIZE_DEFAULT})',
+    )
+    parser.add_argument(
+        '--messages',
+        type=int,
+        default=2000,
+        help='Number of messages to consume per dispatcher (default: 2000)',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=100,
+        help='Number of messages per batch (default: 100)',
+    )
+    parser.add_argument(
+        '--label',
+        default='',
+        help='Label to identify the run by, for instance a commit hash',
+    )
+    parser.add_argument(
+        '--output',
+        default='-',
+        help="Path to write results to, or '-' for stdout (default)",
+    )
+
+    return parser.parse_args(args)
+
+
+def prepare_database(args: argparse.Namespace):
+    """Create tables (if missing) and seed the database as requested."""
+
+    db.ModelBase.metadata.create_all(db.engine)
+
+    if args.skip_seed:
+        return
+
+    with db.make_session() as session:
+        if is_seeded(session):
+            if not args.reset:
+                raise SystemExit(
+                    'Database already contains MeteringPoints. '
+                    'Use --reset to replace them, or --skip-seed.')
+
+            reset(session)
+
+        seed(session, SeedParameters(
+            meteringpoints=args.meteringpoints,
+            subjects=args.subjects,
+            delegates_per_meteringpoint=args.delegates_per_meteringpoint,
+            skew=args.skew,
+            random_seed=args.random_seed,
+        ))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the benchmarks and return the report."""
+
+    started = datetime.now(tz=timezone.utc)
+    scenarios = args.scenario or SCENARIOS
+    results: List[Result] = []
+
+    prepare_database(args)
+
+    with db.make_session() as session:
+        subjects = get_subjects_by_rank(session)
+        server_version = session.execute(text('SHOW server_version')).scalar()
+
+    client = create_app().test_client
+
+    for rank, (subject, delegates) in subjects.items():
+        labels = {'subject': rank, 'delegates': str(delegates)}
+
+        if 'details' in scenarios:
+            results.extend(bench_details(
+                client=client,
+                subject=subject,
+                requests=args.requests,
+                labels=labels,
+            ))
+
+        if 'list' in scenarios:
+            results.extend(bench_list(
+                subject=subject,
+                repeat=args.repeat,
+                pages=args.pages,
+                page_size=args.page_size,
+                labels=labels,
+            ))
+
+    if 'consumer' in scenarios:
+        results.extend(bench_consumer(
+            messages=args.messages,
+            batch_size=args.batch_size,
+        ))
+
+    return {
+        'label': args.label,
+        'started': started.isoformat(),
+        'parameters': {
+            k: v for k, v in vars(args).items()
+            if k not in ('output', 'label', 'scenario')
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'postgresql': server_version,
+            'subject_read_model': SUBJECT_READ_MODEL_ENABLED,
+        },
+        'subjects': {
+            rank: {'subject': subject, 'delegates': delegates}
+            for rank, (subject, delegates) in subjects.items()
+        },
+        'results': [asdict(result) for result in results],
+    }
+
+
+def main(args: List[str]):
+    """Run the benchmarks and write the report to the output."""
+
+    args = parse_args(args)
+
+    # Keeps stdout clean for the report (MessageDispatcher prints to it)
+    with redirect_stdout(sys.stderr):
+        report = run(args)
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
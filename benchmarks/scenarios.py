@@ -0,0 +1,316 @@
+"""
+Benchmark scenarios for the API and consumer hot paths.
+
+Each scenario returns a list of Results. Latencies are summarized as
+percentiles (in milliseconds), and consumer throughput in messages
+per second. Results are identified by name and labels, so the same
+result can be compared between runs.
+"""
+from time import perf_counter
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from flask.testing import FlaskClient
+
+from origin.bus import Message, messages as m
+from origin.tokens import TokenEncoder
+from origin.models.auth import InternalToken
+from origin.models.common import Address
+from origin.models.tech import TechnologyCodes
+from origin.models.delegates import MeteringPointDelegate
+from origin.models.meteringpoints import MeteringPoint, MeteringPointType
+
+from meteringpoints_shared.db import db, read_db
+from meteringpoints_shared.controller import controller
+from meteringpoints_shared.config import INTERNAL_TOKEN_SECRET
+from meteringpoints_api.endpoints import get_accessible_meteringpoints
+from meteringpoints_api.details import details_cache, access_cache
+from meteringpoints_consumer.handlers import dispatcher, batch_dispatcher
+
+from .seed import TECHNOLOGIES
+
+
+# Percentiles to summarize latencies by
+PERCENTILES = (50, 90, 95, 99)
+
+# Prefix of GSRNs created (and deleted again) by consumer scenarios
+CONSUMER_GSRN_PREFIX = '58'
+
+
+@dataclass
+class Result:
+    """Result of a benchmark."""
+
+    # Name of the benchmark, for instance 'details.cold'
+    name: str
+
+    # Unit of metrics, for instance 'ms' or 'msgs/s'
+    unit: str
+
+    # Measured values, mapped by name, for instance 'p99'
+    metrics: Dict[str, float]
+
+    # Parameters of the benchmark, for instance which subject was used
+    labels: Dict[str, str] = field(default_factory=dict)
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    """Return the p'th percentile of sorted samples (nearest rank)."""
+
+    rank = max(1, -(-len(samples) * p // 100))
+
+    return samples[int(rank) - 1]
+
+
+def summarize(
+        name: str,
+        durations: Iterable[float],
+        labels: Optional[Dict[str, str]] = None,
+) -> Result:
+    """Summarize durations (in seconds) as latencies in milliseconds."""
+
+    samples = sorted(d * 1000 for d in durations)
+
+    metrics = {'samples': len(samples)}
+
+    if samples:
+        metrics['min'] = samples[0]
+        metrics['mean'] = sum(samples) / len(samples)
+        metrics.update(
+            (f'p{p}', percentile(samples, p)) for p in PERCENTILES)
+        metrics['max'] = samples[-1]
+
+    return Result(name=name, unit='ms', metrics=metrics, labels=labels or {})
+
+
+def timed(func: Callable[[], None], repeat: int) -> List[float]:
+    """Invoke func repeat times and return the duration of each call."""
+
+    durations = []
+
+    for _ in range(repeat):
+        started = perf_counter()
+        func()
+        durations.append(perf_counter() - started)
+
+    return durations
+
+
+# -- API ---------------------------------------------------------------------
+
+
+def encode_token(subject: str) -> str:
+    """Return an encoded InternalToken with read access for subject."""
+
+    encoder = TokenEncoder(schema=InternalToken, secret=INTERNAL_TOKEN_SECRET)
+
+    return encoder.encode(InternalToken(
+        issued=datetime.now(tz=timezone.utc),
+        expires=datetime.now(tz=timezone.utc) + timedelta(days=1),
+        actor=subject,
+        subject=subject,
+        scope=['meteringpoints.read'],
+    ))
+
+
+def get_delegated_gsrn(subject: str, limit: int) -> List[str]:
+    """Return up to limit GSRNs delegated to subject, in random order."""
+
+    with read_db.make_session() as session:
+        return session.execute(text(
+            'SELECT gsrn FROM meteringpoint_delegate '
+            'WHERE subject = :subject ORDER BY random() LIMIT :limit'
+        ), {'subject': subject, 'limit': limit}).scalars().all()
+
+
+def bench_details(
+        client: FlaskClient,
+        subject: str,
+        requests: int,
+        labels: Dict[str, str],
+) -> List[Result]:
+    """
+    Measure latency of GET /details for MeteringPoints of subject.
+
+    Requests up to requests different MeteringPoints with empty caches
+    (details.cold), and then the same MeteringPoints again with their
+    details and access decisions cached (details.warm).
+    """
+    headers = {'Authorization': f'Bearer: {encode_token(subject)}'}
+    gsrns = get_delegated_gsrn(subject, requests)
+
+    def _request(gsrn: str) -> float:
+        started = perf_counter()
+        res = client.get('/details', query_string={'gsrn': gsrn},
+                         headers=headers)
+        elapsed = perf_counter() - started
+
+        if res.status_code != 200 or not res.json['success']:
+            raise RuntimeError(f'GET /details failed for GSRN {gsrn}')
+
+        return elapsed
+
+    details_cache.clear()
+    access_cache.clear()
+
+    cold = [_request(gsrn) for gsrn in gsrns]
+    warm = [_request(gsrn) for gsrn in gsrns]
+
+    return [
+        summarize('details.cold', cold, labels),
+        summarize('details.warm', warm, labels),
+    ]
+
+
+def bench_list(
+        subject: str,
+        repeat: int,
+        pages: int,
+        page_size: int,
+        labels: Dict[str, str],
+) -> List[Result]:
+    """
+    Measure time to query pages of MeteringPoints accessible by subject.
+
+    Queries the first page (list.first_page) and then follows the
+    cursor for up to pages more pages (list.next_page), repeat times.
+    Queries are made directly against the database (not through HTTP).
+    """
+    first_page = []
+    next_page = []
+    labels = {**labels, 'page_size': str(page_size)}
+
+    for _ in range(repeat):
+        with read_db.make_session() as session:
+            def _query(cursor: Optional[str] = None) -> Optional[str]:
+                return get_accessible_meteringpoints(
+                    session=session,
+                    subject=subject,
+                    cursor=cursor,
+                    limit=page_size,
+                )[1]
+
+            started = perf_counter()
+            cursor = _query()
+            first_page.append(perf_counter() - started)
+
+            for _ in range(pages):
+                if cursor is None:
+                    break
+
+                started = perf_counter()
+                cursor = _query(cursor)
+                next_page.append(perf_counter() - started)
+
+    return [
+        summarize('list.first_page', first_page, labels),
+        summarize('list.next_page', next_page, labels),
+    ]
+
+
+# -- Consumer ----------------------------------------------------------------
+
+
+def make_messages(offset: int, meteringpoints: int) -> List[Message]:
+    """
+    Create messages about new MeteringPoints.
+
+    Creates four messages per MeteringPoint: the MeteringPoint itself,
+    its address, its technology and a delegate, in the order received
+    from the data sync domain. GSRNs are distinct from seeded ones.
+    """
+    messages = []
+
+    for i in range(offset, offset + meteringpoints):
+        gsrn = f'{CONSUMER_GSRN_PREFIX}{i:016d}'
+        tech_code, fuel_code, _ = TECHNOLOGIES[i % len(TECHNOLOGIES)]
+
+        messages.extend((
+            m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                gsrn=gsrn,
+                type=MeteringPointType.PRODUCTION,
+                sector='DK1',
+            )),
+            m.MeteringPointAddressUpdate(
+                gsrn=gsrn,
+                address=Address(street_name=f'Street {i}'),
+            ),
+            m.MeteringPointTechnologyUpdate(
+                gsrn=gsrn,
+                codes=TechnologyCodes(
+                    tech_code=tech_code,
+                    fuel_code=fuel_code,
+                ),
+            ),
+            m.MeteringPointDelegateGranted(
+                delegate=MeteringPointDelegate(subject='subject-0', gsrn=gsrn),
+            ),
+        ))
+
+    return messages
+
+
+def bench_consumer(messages: int, batch_size: int) -> List[Result]:
+    """
+    Measure throughput of applying messages to the database.
+
+    Applies messages one at a time through dispatcher
+    (consumer.dispatcher), and in batches of batch_size through
+    batch_dispatcher (consumer.batch_dispatcher). MeteringPoints
+    created by the messages are deleted again afterwards.
+    """
+    meteringpoints = max(1, messages // 4)
+    single = make_messages(0, meteringpoints)
+    batched = make_messages(meteringpoints, meteringpoints)
+
+    def _dispatch():
+        for msg in single:
+            dispatcher(msg)
+
+    def _dispatch_batched():
+        for i in range(0, len(batched), batch_size):
+            batch_dispatcher(batched[i:i + batch_size])
+
+    results = [
+        throughput('consumer.dispatcher', _dispatch, len(single)),
+        throughput('consumer.batch_dispatcher', _dispatch_batched,
+                   len(batched), {'batch_size': str(batch_size)}),
+    ]
+
+    delete_consumed_meteringpoints(
+        gsrn=[msg.meteringpoint.gsrn for msg in single + batched
+              if isinstance(msg, m.MeteringPointUpdate)],
+    )
+
+    return results
+
+
+def throughput(
+        name: str,
+        func: Callable[[], None],
+        messages: int,
+        labels: Optional[Dict[str, str]] = None,
+) -> Result:
+    """Invoke func once and return throughput of messages it handles."""
+
+    seconds = timed(func, 1)[0]
+
+    return Result(
+        name=name,
+        unit='msgs/s',
+        metrics={
+            'messages': messages,
+            'seconds': seconds,
+            'throughput': messages / seconds,
+        },
+        labels=labels or {},
+    )
+
+
+@db.atomic()
+def delete_consumed_meteringpoints(gsrn: List[str], session: db.Session):
+    """Delete MeteringPoints created by bench_consumer()."""
+
+    controller.delete_meteringpoints(session=session, gsrn=gsrn)
@@ -0,0 +1,169 @@
+"""
+Seeds the database with generated MeteringPoints.
+
+All rows are generated by PostgreSQL using generate_series(), so even
+the largest volumes (1e7 MeteringPoints) are seeded in minutes without
+passing through Python. Every MeteringPoint has an address, production
+MeteringPoints have a technology, and each MeteringPoint is delegated
+to one or more subjects.
+
+Subjects are picked as floor(subjects * random() ^ skew), so a skew
+of 1 spreads delegates evenly among subjects, while higher values
+concentrate them on the first subjects (subject-0 having the most),
+like a few large companies and many households in production.
+"""
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.controller import controller
+
+
+# Technologies assigned to production MeteringPoints, in turn
+TECHNOLOGIES = (
+    ('T010000', 'F01040100', 'SOLAR'),
+    ('T020000', 'F01050100', 'WIND'),
+    ('T030000', 'F01010000', 'COAL'),
+    ('T040000', 'F01020000', 'NUCLEAR'),
+)
+
+# SQL expression for the GSRN of the i'th MeteringPoint (see get_gsrn())
+GSRN_SQL = '\'57\' || lpad(i::text, 16, \'0\')'
+
+
+@dataclass
+class SeedParameters:
+    """Volumes and distribution of generated data."""
+
+    # Number of MeteringPoints
+    meteringpoints: int = 100_000
+
+    # Number of subjects MeteringPoints are delegated to
+    subjects: int = 10_000
+
+    # Number of delegates per MeteringPoint (duplicates are skipped)
+    delegates_per_meteringpoint: int = 1
+
+    # Skew of delegates per subject (1 is uniform, higher is more skewed)
+    skew: float = 1.0
+
+    # Seed for random() in PostgreSQL, between -1 and 1
+    random_seed: float = 0.5
+
+
+def get_gsrn(i: int) -> str:
+    """Return the GSRN of the i'th generated MeteringPoint."""
+
+    return f'57{i:016d}'
+
+
+def is_seeded(session: db.Session) -> bool:
+    """Check whether the database contains any MeteringPoints."""
+
+    return session.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM meteringpoint)'
+    )).scalar()
+
+
+def reset(session: db.Session):
+    """Delete all rows from all tables."""
+
+    tables = ', '.join(t.name for t in db.ModelBase.metadata.sorted_tables)
+
+    session.execute(text(f'TRUNCATE {tables}'))
+
+
+def seed(session: db.Session, params: SeedParameters):
+    """
+    Seed the database with generated data.
+
+    Inserts data in the (empty) tables, rebuilds derived data, and
+    commits before analyzing the tables for the query planner.
+    """
+    session.execute(text('SELECT setseed(:seed)'), {
+        'seed': params.random_seed,
+    })
+
+    for tech_code, fuel_code, type in TECHNOLOGIES:
+        session.execute(text(
+            'INSERT INTO technology (tech_code, fuel_code, type) '
+            'VALUES (:tech_code, :fuel_code, :type)'
+        ), {'tech_code': tech_code, 'fuel_code': fuel_code, 'type': type})
+
+    # Every other MeteringPoint is a production MeteringPoint
+    session.execute(text(
+        'INSERT INTO meteringpoint (gsrn, sector, type) '
+        f'SELECT {GSRN_SQL}, '
+        'CASE WHEN i % 3 = 0 THEN \'DK2\' ELSE \'DK1\' END, '
+        '(CASE WHEN i % 2 = 0 THEN \'CONSUMPTION\' '
+        'ELSE \'PRODUCTION\' END)::energydirection '
+        'FROM generate_series(0, :n - 1) AS i'
+    ), {'n': params.meteringpoints})
+
+    session.execute(text(
+        'INSERT INTO meteringpoint_address '
+        '(gsrn, street_name, building_number, post_code, city_name) '
+        f'SELECT {GSRN_SQL}, '
+        '\'Street \' || (i / 100), (i % 100)::text, '
+        '(1000 + i % 8000)::text, \'City \' || (i % 8000) '
+        'FROM generate_series(0, :n - 1) AS i'
+    ), {'n': params.meteringpoints})
+
+    session.execute(text(
+        'INSERT INTO meteringpoint_technology (gsrn, tech_code, fuel_code) '
+        f'SELECT {GSRN_SQL}, t.tech_code, t.fuel_code '
+        'FROM generate_series(1, :n - 1, 2) AS i '
+        'JOIN (SELECT tech_code, fuel_code, '
+        'row_number() OVER (ORDER BY tech_code) - 1 AS k '
+        'FROM technology) AS t ON t.k = (i / 2) % :technologies'
+    ), {'n': params.meteringpoints, 'technologies': len(TECHNOLOGIES)})
+
+    session.execute(text(
+        'INSERT INTO meteringpoint_delegate (gsrn, subject) '
+        f'SELECT {GSRN_SQL}, '
+        '\'subject-\' || floor(:subjects * power(random(), :skew))::bigint '
+        'FROM generate_series(0, :n - 1) AS i, '
+        'generate_series(1, :delegates) AS d '
+        'ON CONFLICT DO NOTHING'
+    ), {
+        'n': params.meteringpoints,
+        'subjects': params.subjects,
+        'delegates': params.delegates_per_meteringpoint,
+        'skew': params.skew,
+    })
+
+    controller.rebuild_statistics(session)
+    controller.rebuild_subject_meteringpoints(session)
+
+    session.commit()
+
+    for table in db.ModelBase.metadata.sorted_tables:
+        session.execute(text(f'ANALYZE {table.name}'))
+
+    session.commit()
+
+
+def get_subjects_by_rank(session: db.Session) -> Dict[str, Tuple[str, int]]:
+    """
+    Return subjects to benchmark, with their number of delegates.
+
+    :returns: Tuples of (subject, delegates) for the subjects with the
+        most and the median number of delegates, mapped by 'max' and
+        'median'
+    """
+    rows = session.execute(text(
+        'SELECT subject, count(*) AS delegates '
+        'FROM meteringpoint_delegate '
+        'GROUP BY subject '
+        'ORDER BY delegates DESC, subject'
+    )).all()
+
+    if not rows:
+        return {}
+
+    return {
+        'max': tuple(rows[0]),
+        'median': tuple(rows[len(rows) // 2]),
+    }
@@ -1,5 +1,10 @@
 #!/bin/bash
 set -e
 
+# Share metrics between gunicorn workers (see gunicorn.conf.py)
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # Run API
-gunicorn 'meteringpoints_api.app:create_app()' -w 2 --threads 2 -b 0.0.0.0:80
+gunicorn 'meteringpoints_api.app:create_app()' -c gunicorn.conf.py -w 2 --threads 2 -b 0.0.0.0:80
@@ -0,0 +1,12 @@
+"""
+Configuration of gunicorn for the API (see entrypoint_api.sh).
+
+Workers share Prometheus metrics through PROMETHEUS_MULTIPROC_DIR.
+"""
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    """Remove live gauges (like requests in flight) of an exited worker."""
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,19 +1,55 @@
-from origin.api import Application, ScopedGuard
+from typing import List
 
-from meteringpoints_shared.config import INTERNAL_TOKEN_SECRET
+from origin.api import ScopedGuard
 
-from .endpoints import GetMeteringPointDetails, GetMeteringPointList
+from meteringpoints_shared.db import db, read_db, API_POOL
+from meteringpoints_shared.models import DbTechnology
+from meteringpoints_shared.queries import TechnologyQuery
+from meteringpoints_shared.technologies import technology_catalogue
+from meteringpoints_shared.config import (
+    INTERNAL_TOKEN_SECRET,
+    API_BUS_LISTENER_ENABLED,
+)
 
+from .listener import start_listener
+from .metrics import InstrumentedApplication
+from .endpoints import (
+    GetMeteringPointList,
+    GetMeteringPointDetails,
+    GetMeteringPointDetailsBatch,
+    SearchMeteringPoints,
+    ExportMeteringPoints,
+    GetMeteringPointStatistics,
+    GetMetrics,
+)
 
-def create_app() -> Application:
+
+def get_technologies() -> List[DbTechnology]:
+    """Return all Technologies from the database."""
+
+    with read_db.make_session() as session:
+        return TechnologyQuery(session).all()
+
+
+def refresh_technology_catalogue():
+    """(Re)load the technology catalogue before a request, if stale."""
+
+    technology_catalogue.refresh(get_technologies)
+
+
+def create_app() -> InstrumentedApplication:
     """Create a new instance of the application."""
 
-    app = Application.create(
+    db.use_pool(API_POOL)
+
+    app = InstrumentedApplication.create(
         name='MeteringPoints API',
         secret=INTERNAL_TOKEN_SECRET,
         health_check_path='/health',
     )
 
+    app.wsgi_app.before_request(refresh_technology_catalogue)
+
     app.add_endpoint(
         method='GET',
         path='/list',
@@ -28,4 +64,41 @@ def create_app() -> Application:
         guards=[ScopedGuard('meteringpoints.read')],
     )
 
+    app.add_endpoint(
+        method='POST',
+        path='/details/batch',
+        endpoint=GetMeteringPointDetailsBatch(),
+        guards=[ScopedGuard('meteringpoints.read')],
+    )
+
+    app.add_endpoint(
+        method='POST',
+        path='/search',
+        endpoint=SearchMeteringPoints(),
+        guards=[ScopedGuard('meteringpoints.read')],
+    )
+
+    app.add_endpoint(
+        method='POST',
+        path='/export',
+        endpoint=ExportMeteringPoints(),
+        guards=[ScopedGuard('meteringpoints.export')],
+    )
+
+    app.add_endpoint(
+        method='GET',
+        path='/statistics',
+        endpoint=GetMeteringPointStatistics(),
+        guards=[ScopedGuard('meteringpoints.statistics')],
+    )
+
+    app.add_endpoint(
+        method='GET',
+        path='/metrics',
+        endpoint=GetMetrics(),
+    )
+
+    if API_BUS_LISTENER_ENABLED:
+        start_listener()
+
     return app
@@ -0,0 +1,93 @@
+from typing import Optional, Tuple
+
+from origin.serialize import simple_serializer
+from origin.models.meteringpoints import MeteringPoint
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.cache import TTLCache
+from meteringpoints_shared.metrics import register_cache
+from meteringpoints_shared.queries import MeteringPointQuery, DelegateQuery
+from meteringpoints_shared.config import (
+    DETAILS_CACHE_SIZE,
+    DETAILS_CACHE_TTL,
+    ACCESS_CACHE_SIZE,
+    ACCESS_CACHE_TTL,
+)
+
+from .metrics import Phase, phase
+
+
+# MeteringPoint details, mapped by GSRN
+details_cache: TTLCache[MeteringPoint] = TTLCache(
+    max_size=DETAILS_CACHE_SIZE,
+    ttl=DETAILS_CACHE_TTL,
+)
+
+# Whether a subject has access to a MeteringPoint, mapped by (subject, gsrn)
+access_cache: TTLCache[bool] = TTLCache(
+    max_size=ACCESS_CACHE_SIZE,
+    ttl=ACCESS_CACHE_TTL,
+)
+
+register_cache('details', details_cache)
+register_cache('access', access_cache)
+
+
+def get_meteringpoint_details(
+        session: db.Session,
+        subject: str,
+        gsrn: str,
+) -> Optional[MeteringPoint]:
+    """
+    Return a MeteringPoint if it exists and subject has access to it.
+
+    Both the access decision and the details are cached, so repeated
+    lookups do not touch the database. Details are detached from the
+    database session, and can be shared between threads.
+    """
+    def _has_access() -> bool:
+        with phase(Phase.DB):
+            return DelegateQuery(session) \
+                .has_gsrn(gsrn) \
+                .has_subject(subject) \
+                .exists()
+
+    def _get_details() -> Optional[MeteringPoint]:
+        with phase(Phase.DB):
+            meteringpoint = MeteringPointQuery(session) \
+                .has_gsrn(gsrn) \
+                .one_or_none()
+
+        if meteringpoint is not None:
+            return simple_serializer.deserialize(
+                data=simple_serializer.serialize(
+                    meteringpoint, schema=MeteringPoint),
+                schema=MeteringPoint,
+                validate=False,
+            )
+
+    if not access_cache.get_or_set((subject, gsrn), _has_access):
+        return None
+
+    return details_cache.get_or_set(gsrn, _get_details)
+
+
+def invalidate_meteringpoint(gsrn: str):
+    """Forget cached details for a MeteringPoint."""
+
+    details_cache.invalidate(gsrn)
+
+
+def invalidate_access(subject: str, gsrn: str):
+    """Forget cached access decision for a subject to a MeteringPoint."""
+
+    access_cache.invalidate((subject, gsrn))
+
+
+def invalidate_meteringpoint_access(gsrn: str):
+    """Forget cached access decisions for all subjects to a MeteringPoint."""
+
+    def _has_gsrn(key: Tuple[str, str]) -> bool:
+        return key[1] == gsrn
+
+    access_cache.invalidate_where(_has_gsrn)
@@ -1,12 +1,102 @@
-from typing import List, Optional
-from dataclasses import dataclass
-import requests
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Iterator
 
-from origin.api import Endpoint, Context
-from origin.models.meteringpoints import MeteringPoint
+from prometheus_client import CONTENT_TYPE_LATEST
+from origin.api import Endpoint, Context, BadRequest, HttpResponse
+from origin.models.tech import TechnologyType
+from origin.models.meteringpoints import MeteringPoint, MeteringPointType
 
-from meteringpoints_shared.db import db
-from meteringpoints_shared.queries import MeteringPointQuery
+from meteringpoints_shared.db import db, read_db
+from meteringpoints_shared.metrics import generate_metrics
+from meteringpoints_shared.config import (
+    LIST_FROM_DATABASE,
+    SUBJECT_READ_MODEL_ENABLED,
+    PAGE_SIZE_DEFAULT,
+    PAGE_SIZE_MAX,
+    DETAILS_BATCH_SIZE_MAX,
+)
+from meteringpoints_shared.queries import (
+    MeteringPointQuery,
+    MeteringPointStatisticsQuery,
+    SubjectMeteringPointQuery,
+)
+from meteringpoints_shared.export import (
+    ExportFormat,
+    MIME_TYPES,
+    export_meteringpoints,
+)
+from meteringpoints_shared.models import (
+    MeteringPointFilters,
+    MeteringPointOrdering,
+)
+
+from .details import get_meteringpoint_details
+from .upstream import get_user_info, get_gsrn_by_tin
+from .metrics import Phase, phase
+
+
+def get_meteringpoint_query(session: db.Session) -> MeteringPointQuery:
+    """
+    Return a query for listing MeteringPoints accessible by subjects.
+
+    Queries the subject read model if enabled, which does not need to
+    join delegates, addresses and technologies.
+    """
+    if SUBJECT_READ_MODEL_ENABLED:
+        return SubjectMeteringPointQuery(session)
+    else:
+        return MeteringPointQuery(session)
+
+
+def get_accessible_meteringpoints(
+        session: db.Session,
+        subject: str,
+        filters: Optional[MeteringPointFilters] = None,
+        ordering: Optional[MeteringPointOrdering] = None,
+        cursor: Optional[str] = None,
+        limit: int = PAGE_SIZE_DEFAULT,
+) -> Tuple[List[MeteringPoint], Optional[str]]:
+    """
+    Query a page of MeteringPoints accessible by subject from the database.
+
+    Addresses and technologies are loaded in the same query, or from
+    the subject read model if enabled. Results are ordered by GSRN
+    unless another ordering is provided.
+
+    :returns: Tuple of (MeteringPoints, cursor for the next page)
+    """
+    if not 0 < limit <= PAGE_SIZE_MAX:
+        raise BadRequest(body=f'Limit must be between 1 and {PAGE_SIZE_MAX}')
+
+    query = get_meteringpoint_query(session) \
+        .is_accessible_by(subject)
+
+    if filters is not None:
+        query = query.apply_filters(filters)
+
+    try:
+        with phase(Phase.DB):
+            return query.paginate(
+                ordering=ordering, cursor=cursor, limit=limit)
+    except MeteringPointQuery.InvalidCursor:
+        raise BadRequest(body='Invalid cursor')
+
+
+@dataclass
+class StreamingResponse(HttpResponse):
+    """HTTP response with a body which is sent in chunks as produced."""
+
+    # Response body, produced in chunks
+    body: Optional[Iterator[str]] = field(default=None)
+
+    # MIME type of the response body
+    mimetype: str = field(default='application/octet-stream')
+
+    @property
+    def actual_mimetype(self) -> str:
+        """Return the MIME type of the response body."""
+
+        return self.mimetype
 
 
 class GetMeteringPointList(Endpoint):
@@ -15,37 +105,60 @@ class GetMeteringPointList(Endpoint):
 
     Given the users token, their tin can be requested
     and used to receive their metering point IDs.
+
+    If LIST_FROM_DATABASE is enabled, metering points are instead listed
+    with full details from the local database (via delegates), one page
+    at a time.
     """
 
+    @dataclass
+    class Request:
+        """TODO."""
+
+        cursor: Optional[str] = field(default=None)
+
     @dataclass
     class Response:
         """TODO."""
 
         meteringpoints: List[MeteringPoint]
+        next_cursor: Optional[str] = field(default=None)
 
+    @read_db.session()
     def handle_request(
             self,
+            request: Request,
             context: Context,
+            session: db.Session,
     ) -> Response:
         """Handle HTTP request."""
 
-        token = {"Authorization": f'Bearer: {context.internal_token_encoded}'}
-
-        response = requests.get('http://eo-auth/user/info', headers=token)  # noqa: E501
+        if LIST_FROM_DATABASE:
+            meteringpoints, next_cursor = get_accessible_meteringpoints(
+                session=session,
+                subject=context.token.subject,
+                cursor=request.cursor,
+            )
 
-        user_info = response.json()
+            return self.Response(
+                meteringpoints=meteringpoints,
+                next_cursor=next_cursor,
+            )
 
-        data_sync_url = f'http://eo-data-sync/MeteringPoints/GetByTin/{user_info["tin"]}'  # noqa: E501
-
-        response = requests.get(data_sync_url, headers=token)
+        user_info = get_user_info(context)
+        gsrn = get_gsrn_by_tin(user_info['tin'], context)
 
         return self.Response(
-            meteringpoints=[MeteringPoint(gsrn=mp['gsrn']) for mp in response.json()],  # noqa: E501
+            meteringpoints=[MeteringPoint(gsrn=g) for g in gsrn],
         )
 
 
 class GetMeteringPointDetails(Endpoint):
-    """Returns details about a single MeteringPoint."""
+    """
+    Returns details about a single MeteringPoint.
+
+    Details and access decisions are cached in-process.
+    """
 
     @dataclass
     class Request:
@@ -60,7 +173,7 @@ class GetMeteringPointDetails(Endpoint):
         success: bool
         meteringpoint: Optional[MeteringPoint]
 
-    @db.session()
+    @read_db.session()
     def handle_request(
             self,
             request: Request,
@@ -69,12 +182,231 @@ class GetMeteringPointDetails(Endpoint):
     ) -> Response:
         """Handle HTTP request."""
 
-        meteringpoint = MeteringPointQuery(session) \
-            .is_accessible_by(context.token.subject) \
-            .has_gsrn(request.gsrn) \
-            .one_or_none()
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject=context.token.subject,
+            gsrn=request.gsrn,
+        )
 
         return self.Response(
             success=meteringpoint is not None,
             meteringpoint=meteringpoint,
         )
+
+
+class GetMeteringPointDetailsBatch(Endpoint):
+    """
+    Returns details about multiple MeteringPoints.
+
+    Looks up all of the requested MeteringPoints in a single query, and
+    returns a result for each of them in the order requested.
+    """
+
+    @dataclass
+    class Request:
+        """TODO."""
+
+        gsrn: List[str] = field(default_factory=list)
+
+    @dataclass
+    class Result:
+        """Details about a single requested MeteringPoint."""
+
+        gsrn: str
+        success: bool
+        meteringpoint: Optional[MeteringPoint]
+
+    @dataclass
+    class Response:
+        """TODO."""
+
+        results: List['GetMeteringPointDetailsBatch.Result']
+
+    @read_db.session()
+    def handle_request(
+            self,
+            request: Request,
+            context: Context,
+            session: db.Session,
+    ) -> Response:
+        """Handle HTTP request."""
+
+        if len(request.gsrn) > DETAILS_BATCH_SIZE_MAX:
+            raise BadRequest(body=(
+                f'Can not request more than {DETAILS_BATCH_SIZE_MAX} '
+                f'MeteringPoints at once'
+            ))
+
+        with phase(Phase.DB):
+            meteringpoints = get_meteringpoint_query(session) \
+                .is_accessible_by(context.token.subject) \
+                .has_any_gsrn(request.gsrn) \
+                .all()
+
+        meteringpoints_by_gsrn = {mp.gsrn: mp for mp in meteringpoints}
+
+        return self.Response(results=[
+            self.Result(
+                gsrn=gsrn,
+                success=gsrn in meteringpoints_by_gsrn,
+                meteringpoint=meteringpoints_by_gsrn.get(gsrn),
+            )
+            for gsrn in request.gsrn
+        ])
+
+
+class SearchMeteringPoints(Endpoint):
+    """
+    Search metering points accessible by the client.
+
+    Served from the local database, with addresses and technologies.
+    """
+
+    @dataclass
+    class Request:
+        """TODO."""
+
+        filters: Optional[MeteringPointFilters] = field(default=None)
+        ordering: Optional[MeteringPointOrdering] = field(default=None)
+        cursor: Optional[str] = field(default=None)
+        limit: Optional[int] = field(default=None)
+
+    @dataclass
+    class Response:
+        """TODO."""
+
+        meteringpoints: List[MeteringPoint]
+        next_cursor: Optional[str] = field(default=None)
+
+    @read_db.session()
+    def handle_request(
+            self,
+            request: Request,
+            context: Context,
+            session: db.Session,
+    ) -> Response:
+        """Handle HTTP request."""
+
+        meteringpoints, next_cursor = get_accessible_meteringpoints(
+            session=session,
+            subject=context.token.subject,
+            filters=request.filters,
+            ordering=request.ordering,
+            cursor=request.cursor,
+            limit=request.limit if request.limit is not None else PAGE_SIZE_DEFAULT,  # noqa: E501
+        )
+
+        return self.Response(
+            meteringpoints=meteringpoints,
+            next_cursor=next_cursor,
+        )
+
+
+class ExportMeteringPoints(Endpoint):
+    """
+    Export all MeteringPoints, optionally filtered, as NDJSON or CSV.
+
+    Not limited to the MeteringPoints accessible by the client, so it
+    requires a separate scope. The export is streamed to the client
+    while it is read from the database, using a session of its own
+    which stays open until the response has been sent.
+    """
+
+    @dataclass
+    class Request:
+        """TODO."""
+
+        format: ExportFormat = field(default=ExportFormat.NDJSON)
+        filters: Optional[MeteringPointFilters] = field(default=None)
+
+    def handle_request(self, request: Request) -> StreamingResponse:
+        """Handle HTTP request."""
+
+        def _stream() -> Iterator[str]:
+            with read_db.make_session() as session:
+                yield from export_meteringpoints(
+                    session=session,
+                    format=request.format,
+                    filters=request.filters,
+                )
+
+        return StreamingResponse(
+            status=200,
+            body=_stream(),
+            mimetype=MIME_TYPES[request.format],
+        )
+
+
+class GetMeteringPointStatistics(Endpoint):
+    """
+    Returns the number of MeteringPoints per sector, type and technology.
+
+    Served from a summary table which is kept up-to-date as
+    MeteringPoints change, so the response time does not depend on
+    the number of MeteringPoints. Clients can sum groups to get
+    totals per sector, type, or technology type.
+    """
+
+    @dataclass
+    class Group:
+        """Number of MeteringPoints with the same attributes."""
+
+        sector: Optional[str]
+        type: Optional[MeteringPointType]
+        technology_type: Optional[TechnologyType]
+        count: int
+
+    @dataclass
+    class Response:
+        """TODO."""
+
+        total: int
+        groups: List['GetMeteringPointStatistics.Group']
+
+    @read_db.session()
+    def handle_request(self, session: db.Session) -> Response:
+        """Handle HTTP request."""
+
+        with phase(Phase.DB):
+            rows = MeteringPointStatisticsQuery(session) \
+                .is_not_empty() \
+                .all()
+
+        groups = [
+            self.Group(
+                sector=row.sector or None,
+                type=MeteringPointType[row.type] if row.type else None,
+                technology_type=row.technology_type,
+                count=row.count,
+            )
+            for row in rows
+        ]
+
+        return self.Response(
+            total=sum(group.count for group in groups),
+            groups=groups,
+        )
+
+
+class GetMetrics(Endpoint):
+    """
+    Returns metrics in the text format of Prometheus.
+
+    Not guarded, as Prometheus scrapes it without a token, so it
+    should only be reachable from within the cluster.
+    """
+
+    @dataclass
+    class Response(HttpResponse):
+        """Metrics in the text format of Prometheus."""
+
+        @property
+        def actual_mimetype(self) -> str:
+            """Return the MIME type of the response body."""
+
+            return CONTENT_TYPE_LATEST
+
+    def handle_request(self) -> Response:
+        """Handle HTTP request."""
+
+        return self.Response(status=200, body=generate_metrics())
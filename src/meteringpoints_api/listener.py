@@ -0,0 +1,86 @@
+from threading import Thread
+
+from origin.bus import MessageDispatcher, messages as m, topics as t
+
+from meteringpoints_shared.bus import listener_broker
+from meteringpoints_shared.technologies import technology_catalogue
+
+from .upstream import invalidate_subject
+from .details import (
+    details_cache,
+    invalidate_access,
+    invalidate_meteringpoint,
+    invalidate_meteringpoint_access,
+)
+
+
+# -- Handlers ----------------------------------------------------------------
+
+
+def on_meteringpoint_delegate_changed(
+        msg: m.MeteringPointDelegateGranted,
+):
+    """Invalidate cached data for the subject which has been (un)granted."""
+
+    invalidate_subject(msg.delegate.subject)
+    invalidate_access(msg.delegate.subject, msg.delegate.gsrn)
+
+
+def on_meteringpoint_update(msg: m.MeteringPointUpdate):
+    """Invalidate cached details for the MeteringPoint."""
+
+    invalidate_meteringpoint(msg.meteringpoint.gsrn)
+
+
+def on_meteringpoint_removed(msg: m.MeteringPointRemoved):
+    """Invalidate cached details and access for the MeteringPoint."""
+
+    invalidate_meteringpoint(msg.gsrn)
+    invalidate_meteringpoint_access(msg.gsrn)
+
+
+def on_meteringpoint_details_update(msg: m.MeteringPointAddressUpdate):
+    """Invalidate cached details for the MeteringPoint."""
+
+    invalidate_meteringpoint(msg.gsrn)
+
+
+def on_technology_update(msg: m.TechnologyUpdate):
+    """Update the technology catalogue and invalidate cached details."""
+
+    technology_catalogue.set(msg.technology)
+    details_cache.clear()
+
+
+def on_technology_removed(msg: m.TechnologyRemoved):
+    """Update the technology catalogue and invalidate cached details."""
+
+    technology_catalogue.remove(
+        tech_code=msg.codes.tech_code,
+        fuel_code=msg.codes.fuel_code,
+    )
+    details_cache.clear()
+
+
+# -- Dispatcher --------------------------------------------------------------
+
+
+dispatcher = MessageDispatcher({
+    m.MeteringPointDelegateGranted: on_meteringpoint_delegate_changed,
+    m.MeteringPointDelegateRevoked: on_meteringpoint_delegate_changed,
+    m.MeteringPointUpdate: on_meteringpoint_update,
+    m.MeteringPointRemoved: on_meteringpoint_removed,
+    m.MeteringPointAddressUpdate: on_meteringpoint_details_update,
+    m.MeteringPointTechnologyUpdate: on_meteringpoint_details_update,
+    m.TechnologyUpdate: on_technology_update,
+    m.TechnologyRemoved: on_technology_removed,
+})
+
+
+def start_listener() -> Thread:
+    """Listen on the Message Bus in the background for this process."""
+
+    return listener_broker.listen_in_background(
+        topics=[t.AUTH, t.METERINGPOINTS, t.TECHNOLOGIES],
+        handler=dispatcher,
+    )
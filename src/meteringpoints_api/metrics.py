@@ -0,0 +1,227 @@
+"""
+Prometheus metrics for the API.
+
+Requests are measured per endpoint (by path) from when they are
+received until the response has been produced, and counted by HTTP
+status, so error rates can be derived. Phases of handling a request
+are measured separately, so time spent authorizing the client,
+querying the database, calling upstream services and serializing
+the response can be told apart. Streamed responses (exports) are
+measured until streaming begins.
+
+Each request is a unit of work for the SQL profiler (if enabled).
+"""
+from enum import Enum
+from time import perf_counter
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Type
+
+import flask
+from prometheus_client import Counter, Gauge, Histogram
+
+from origin.api import Application, Context, Endpoint, EndpointGuard
+
+from meteringpoints_shared.db import sql_profiler
+from meteringpoints_shared.metrics import write_process_metrics
+
+
+class Phase(Enum):
+    """Phases of handling a request."""
+
+    # Validating the token and its scopes
+    AUTH = 'auth'
+
+    # Querying the database
+    DB = 'db'
+
+    # Calling upstream services over HTTP
+    UPSTREAM = 'upstream'
+
+    # Serializing the response body
+    SERIALIZE = 'serialize'
+
+
+def get_endpoint() -> Optional[str]:
+    """Return the path of the endpoint handling the current request."""
+
+    if flask.has_request_context() and flask.request.url_rule is not None:
+        return flask.request.url_rule.rule
+
+
+@contextmanager
+def phase(name: Phase) -> Iterator[None]:
+    """
+    Measure time spent in a phase of handling the current request.
+
+    Does nothing outside of requests, so the same code can be used
+    by the consumer and benchmarks without being measured.
+    """
+    endpoint = get_endpoint()
+
+    if endpoint is None:
+        yield
+        return
+
+    started = perf_counter()
+
+    try:
+        yield
+    finally:
+        phase_duration \
+            .labels(endpoint, name.value) \
+            .observe(perf_counter() - started)
+
+
+class TimedGuard(EndpointGuard):
+    """Measures time spent validating a guard as the auth phase."""
+
+    def __init__(self, guard: EndpointGuard):
+        self.guard = guard
+
+    def validate(self, context: Context):
+        """Validate the guard."""
+
+        with phase(Phase.AUTH):
+            self.guard.validate(context)
+
+
+class TimedEndpoint(Endpoint):
+    """
+    Marks when an endpoint has handled a request.
+
+    The response is serialized after the endpoint returns it, so the
+    time from then until the response is ready is measured as the
+    serialize phase.
+    """
+
+    def __init__(self, endpoint: Endpoint):
+        self.endpoint = endpoint
+
+    @property
+    def request_schema(self) -> Optional[Type[Any]]:
+        """Return the request schema of the endpoint."""
+
+        return self.endpoint.request_schema
+
+    @property
+    def requires_context(self) -> bool:
+        """Check if the endpoint requires a Context."""
+
+        return self.endpoint.requires_context
+
+    @property
+    def should_parse_request_data(self) -> bool:
+        """Check if the endpoint requires an instance of its Request."""
+
+        return self.endpoint.should_parse_request_data
+
+    def handle_request(self, **kwargs) -> Optional[Any]:
+        """Handle HTTP request."""
+
+        response = self.endpoint.handle_request(**kwargs)
+        flask.g.metrics_handled = perf_counter()
+        return response
+
+
+class InstrumentedApplication(Application):
+    """
+    Application which measures requests to its endpoints.
+
+    Requests for paths without an endpoint are not measured.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(InstrumentedApplication, self).__init__(*args, **kwargs)
+        self.wsgi_app.before_request(_before_request)
+        self.wsgi_app.after_request(_after_request)
+        self.wsgi_app.teardown_request(_teardown_request)
+
+    def add_endpoint(
+            self,
+            method: str,
+            path: str,
+            endpoint: Endpoint,
+            guards: List[EndpointGuard] = None,
+    ):
+        """Add endpoints to the application."""
+
+        super(InstrumentedApplication, self).add_endpoint(
+            method=method,
+            path=path,
+            endpoint=TimedEndpoint(endpoint),
+            guards=[TimedGuard(guard) for guard in guards or ()],
+        )
+
+
+def _before_request():
+    """Start measuring a request."""
+
+    endpoint = get_endpoint()
+
+    if endpoint is not None:
+        flask.g.metrics_started = perf_counter()
+        requests_in_flight.labels(flask.request.method, endpoint).inc()
+        sql_profiler.begin(f'{flask.request.method} {endpoint}')
+
+
+def _after_request(response: flask.Response) -> flask.Response:
+    """Record status and serialization time of a response."""
+
+    flask.g.metrics_status = response.status_code
+
+    if 'metrics_handled' in flask.g:
+        phase_duration \
+            .labels(get_endpoint(), Phase.SERIALIZE.value) \
+            .observe(perf_counter() - flask.g.metrics_handled)
+
+    return response
+
+
+def _teardown_request(exception: Optional[BaseException]):
+    """Stop measuring a request."""
+
+    if 'metrics_started' not in flask.g:
+        return
+
+    method = flask.request.method
+    endpoint = get_endpoint()
+
+    # Exceptions propagate without a response when testing
+    status = flask.g.get('metrics_status', 500)
+
+    request_duration \
+        .labels(method, endpoint) \
+        .observe(perf_counter() - flask.g.metrics_started)
+    request_count.labels(method, endpoint, str(status)).inc()
+    requests_in_flight.labels(method, endpoint).dec()
+    sql_profiler.end()
+    write_process_metrics()
+
+
+# -- Singletons --------------------------------------------------------------
+
+
+request_duration = Histogram(
+    'meteringpoints_api_request_duration_seconds',
+    'Time spent handling requests',
+    ['method', 'endpoint'],
+)
+
+request_count = Counter(
+    'meteringpoints_api_requests',
+    'Number of handled requests by response status',
+    ['method', 'endpoint', 'status'],
+)
+
+requests_in_flight = Gauge(
+    'meteringpoints_api_requests_in_flight',
+    'Number of requests currently being handled',
+    ['method', 'endpoint'],
+    multiprocess_mode='livesum',
+)
+
+phase_duration = Histogram(
+    'meteringpoints_api_phase_duration_seconds',
+    'Time spent in phases of handling requests',
+    ['endpoint', 'phase'],
+)
@@ -0,0 +1,85 @@
+from typing import Dict, Any, List
+
+from origin.api import Context
+
+from meteringpoints_shared.cache import TTLCache
+from meteringpoints_shared.metrics import register_cache
+from meteringpoints_shared.services import http_client
+from meteringpoints_shared.config import (
+    AUTH_SERVICE_URL,
+    DATA_SYNC_SERVICE_URL,
+    USER_INFO_CACHE_SIZE,
+    USER_INFO_CACHE_TTL,
+    GSRN_CACHE_SIZE,
+    GSRN_CACHE_TTL,
+)
+
+from .metrics import Phase, phase
+
+
+# User info from the auth service, mapped by subject
+user_info_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    max_size=USER_INFO_CACHE_SIZE,
+    ttl=USER_INFO_CACHE_TTL,
+)
+
+# GSRN numbers from the data sync service, mapped by TIN
+gsrn_cache: TTLCache[List[str]] = TTLCache(
+    max_size=GSRN_CACHE_SIZE,
+    ttl=GSRN_CACHE_TTL,
+)
+
+register_cache('user_info', user_info_cache)
+register_cache('gsrn', gsrn_cache)
+
+
+def _auth_headers(context: Context) -> Dict[str, str]:
+    """Return headers to authorize as the client at upstream services."""
+
+    return {'Authorization': f'Bearer: {context.internal_token_encoded}'}
+
+
+def get_user_info(context: Context) -> Dict[str, Any]:
+    """Return user info for the client from the auth service (cached)."""
+
+    def _fetch() -> Dict[str, Any]:
+        with phase(Phase.UPSTREAM):
+            response = http_client.get(
+                f'{AUTH_SERVICE_URL}/user/info',
+                headers=_auth_headers(context),
+            )
+            response.raise_for_status()
+            return response.json()
+
+    return user_info_cache.get_or_set(context.token.subject, _fetch)
+
+
+def get_gsrn_by_tin(tin: str, context: Context) -> List[str]:
+    """Return GSRN numbers owned by TIN from data sync service (cached)."""
+
+    def _fetch() -> List[str]:
+        with phase(Phase.UPSTREAM):
+            response = http_client.get(
+                f'{DATA_SYNC_SERVICE_URL}/MeteringPoints/GetByTin/{tin}',
+                headers=_auth_headers(context),
+            )
+            response.raise_for_status()
+            return [mp['gsrn'] for mp in response.json()]
+
+    return gsrn_cache.get_or_set(tin, _fetch)
+
+
+def invalidate_subject(subject: str):
+    """Forget cached user info and GSRN numbers for a subject."""
+
+    # User info may have expired before the GSRN numbers of its TIN
+    user_info = user_info_cache.peek(subject)
+
+    if user_info is not None:
+        gsrn_cache.invalidate(user_info['tin'])
+    else:
+        # TIN is unknown, but GSRN numbers for it may be being read,
+        # so don't cache any GSRN numbers read before now
+        gsrn_cache.invalidate_where(lambda tin: False)
+
+    user_info_cache.invalidate(subject)
@@ -2,14 +2,43 @@
 
 # Commented out due to tests takes too long, and is not used in prod yet
 
+# from prometheus_client import start_http_server
 # from origin.bus import topics as t
 
-# from meteringpoints_shared.bus import broker
+# from meteringpoints_shared.db import db, CONSUMER_POOL
+# from meteringpoints_shared.bus import batch_broker
+# from meteringpoints_shared.config import (
+#     CONSUMER_BATCH_SIZE,
+#     CONSUMER_BATCH_TIMEOUT,
+#     CONSUMER_WORKERS,
+#     CONSUMER_METRICS_PORT,
+# )
+
+# from .handlers import batch_dispatcher
+# from .workers import PartitionedBatchHandler
+
+
+# TOPICS = [t.AUTH, t.METERINGPOINTS, t.TECHNOLOGIES]
+
+
+# db.use_pool(CONSUMER_POOL)
+
+
+# Serves metrics for Prometheus (see metrics.py) in a daemon thread
+
+# start_http_server(CONSUMER_METRICS_PORT)
 
-# from .handlers import dispatcher
 
+# Messages are always consumed through batch_broker (in batches of one
+# message if CONSUMER_BATCH_SIZE is 1), as it timestamps each message
+# with the time it was published, used to skip stale updates.
 
-# broker.listen(
-#     topics=[t.AUTH, t.METERINGPOINTS, t.TECHNOLOGIES],
-#     handler=dispatcher,
+# batch_broker.listen_batched(
+#     topics=TOPICS,
+#     handler=PartitionedBatchHandler(
+#         handler=batch_dispatcher,
+#         workers=CONSUMER_WORKERS,
+#     ),
+#     batch_size=CONSUMER_BATCH_SIZE,
+#     timeout=CONSUMER_BATCH_TIMEOUT,
 # )
@@ -0,0 +1,36 @@
+from itertools import groupby
+from typing import Dict, Type, List, Callable
+
+from origin.bus import Message
+
+from meteringpoints_shared.db import db
+
+from .metrics import measure_messages
+
+
+TMessageBatchHandler = Callable[[List[Message], db.Session], None]
+
+
+class MessageBatchDispatcher(Dict[Type[Message], TMessageBatchHandler]):
+    """
+    Dispatches batches of incoming messages to the appropriate handlers.
+
+    Consecutive messages of the same type are grouped and passed to
+    their handler as a list, so the order of messages is preserved
+    across types. Each message type can have a single handler associated.
+
+    The whole batch is applied in a single database transaction.
+    Each group is measured by message type (see metrics.py).
+    """
+
+    @db.atomic()
+    def __call__(self, messages: List[Message], session: db.Session):
+        """Dispatch a batch of messages."""
+
+        for message_type, group in groupby(messages, key=type):
+            if message_type in self:
+                handler = self[message_type]
+                msgs = list(group)
+
+                with measure_messages(message_type, len(msgs)):
+                    handler(msgs, session=session)
@@ -1,8 +1,17 @@
-from origin.bus import MessageDispatcher, messages as m
+from typing import List, Dict, Callable, TypeVar
+
+from origin.bus import Message, messages as m
 
 from meteringpoints_shared.db import db
+from meteringpoints_shared.bus import get_message_timestamp
 from meteringpoints_shared.controller import controller
 
+from .batch import MessageBatchDispatcher
+from .metrics import MeasuredMessageDispatcher
+
+
+TMessage = TypeVar('TMessage', bound=Message)
+
 
 # -- MeteringPoints ----------------------------------------------------------
 
@@ -14,25 +23,27 @@ def on_meteringpoint_update(
 ):
     """TODO."""
 
-    meteringpoint = controller.get_or_create_meteringpoint(
+    timestamp = get_message_timestamp(msg)
+
+    controller.set_meteringpoints(
         session=session,
-        gsrn=msg.meteringpoint.gsrn,
+        meteringpoints=[msg.meteringpoint],
+        timestamps={msg.meteringpoint.gsrn: timestamp},
     )
 
-    meteringpoint.type = msg.meteringpoint.type
-    meteringpoint.sector = msg.meteringpoint.sector
-
     if msg.meteringpoint.address:
         controller.set_meteringpoint_address(
             session=session,
             gsrn=msg.meteringpoint.gsrn,
             address=msg.meteringpoint.address,
+            timestamp=timestamp,
         )
     if msg.meteringpoint.technology:
         controller.set_meteringpoint_technology(
             session=session,
             gsrn=msg.meteringpoint.gsrn,
             technology=msg.meteringpoint.technology,
+            timestamp=timestamp,
         )
 
 
@@ -46,6 +57,7 @@ def on_meteringpoint_removed(
     controller.delete_meteringpoint(
         session=session,
         gsrn=msg.gsrn,
+        timestamp=get_message_timestamp(msg),
     )
 
 
@@ -63,12 +75,14 @@ def on_meteringpoint_address_update(
         controller.delete_meteringpoint_address(
             session=session,
             gsrn=msg.gsrn,
+            timestamp=get_message_timestamp(msg),
         )
     else:
         controller.set_meteringpoint_address(
             session=session,
             gsrn=msg.gsrn,
             address=msg.address,
+            timestamp=get_message_timestamp(msg),
         )
 
 
@@ -86,12 +100,14 @@ def on_meteringpoint_technology_update(
         controller.delete_meteringpoint_technology(
             session=session,
             gsrn=msg.gsrn,
+            timestamp=get_message_timestamp(msg),
         )
     else:
         controller.set_meteringpoint_technology(
             session=session,
             gsrn=msg.gsrn,
             technology=msg.codes,
+            timestamp=get_message_timestamp(msg),
         )
 
 
@@ -148,14 +164,11 @@ def on_technology_update(
 ):
     """TODO."""
 
-    technology = controller.get_or_create_technology(
+    controller.set_technologies(
         session=session,
-        tech_code=msg.technology.tech_code,
-        fuel_code=msg.technology.fuel_code,
+        technologies=[msg.technology],
     )
 
-    technology.type = msg.technology.type
-
 
 @db.atomic()
 def on_technology_removed(
@@ -171,10 +184,225 @@ def on_technology_removed(
     )
 
 
+# -- Batch handlers ----------------------------------------------------------
+
+
+def latest_by_gsrn(
+        msgs: List[TMessage],
+        get_gsrn: Callable[[TMessage], str],
+) -> Dict[str, TMessage]:
+    """
+    Map messages by GSRN, keeping only the latest message for each GSRN.
+
+    A message replaces an earlier received message for the same GSRN,
+    unless both are timestamped and it was published before the other.
+    """
+    latest = {}
+
+    for msg in msgs:
+        gsrn = get_gsrn(msg)
+        current = latest.get(gsrn)
+
+        if current is not None:
+            timestamp = get_message_timestamp(msg)
+            current_timestamp = get_message_timestamp(current)
+
+            if timestamp is not None \
+                    and current_timestamp is not None \
+                    and timestamp < current_timestamp:
+                continue
+
+        latest[gsrn] = msg
+
+    return latest
+
+
+def on_meteringpoint_update_batch(
+        msgs: List[m.MeteringPointUpdate],
+        session: db.Session,
+):
+    """
+    Create or update MeteringPoints using bulk upserts.
+
+    Addresses and technologies are only included in some updates, so the
+    latest value for each is picked separately, like the single message
+    handler which leaves them untouched when they are omitted.
+    """
+
+    def get_gsrn(msg: m.MeteringPointUpdate) -> str:
+        return msg.meteringpoint.gsrn
+
+    def get_timestamps(latest: Dict[str, m.MeteringPointUpdate]):
+        return {
+            gsrn: get_message_timestamp(msg)
+            for gsrn, msg in latest.items()
+        }
+
+    latest = latest_by_gsrn(msgs, get_gsrn)
+
+    latest_addresses = latest_by_gsrn(
+        [msg for msg in msgs if msg.meteringpoint.address],
+        get_gsrn,
+    )
+
+    latest_technologies = latest_by_gsrn(
+        [msg for msg in msgs if msg.meteringpoint.technology],
+        get_gsrn,
+    )
+
+    controller.set_meteringpoints(
+        session=session,
+        meteringpoints=[msg.meteringpoint for msg in latest.values()],
+        timestamps=get_timestamps(latest),
+    )
+
+    controller.set_meteringpoint_addresses(
+        session=session,
+        addresses=[
+            (gsrn, msg.meteringpoint.address)
+            for gsrn, msg in latest_addresses.items()
+        ],
+        timestamps=get_timestamps(latest_addresses),
+    )
+
+    controller.set_meteringpoint_technologies(
+        session=session,
+        technologies=[
+            (gsrn, msg.meteringpoint.technology)
+            for gsrn, msg in latest_technologies.items()
+        ],
+        timestamps=get_timestamps(latest_technologies),
+    )
+
+
+def on_meteringpoint_removed_batch(
+        msgs: List[m.MeteringPointRemoved],
+        session: db.Session,
+):
+    """Delete MeteringPoints and all of their associated data."""
+
+    latest = latest_by_gsrn(msgs, lambda msg: msg.gsrn)
+
+    controller.delete_meteringpoints(
+        session=session,
+        gsrn=list(latest),
+        timestamps={
+            gsrn: get_message_timestamp(msg)
+            for gsrn, msg in latest.items()
+        },
+    )
+
+
+def on_meteringpoint_address_update_batch(
+        msgs: List[m.MeteringPointAddressUpdate],
+        session: db.Session,
+):
+    """Create, update or delete addresses using bulk statements."""
+
+    # Only the latest address for each GSRN is relevant
+    latest = latest_by_gsrn(msgs, lambda msg: msg.gsrn)
+    addresses = {gsrn: msg.address for gsrn, msg in latest.items()}
+    timestamps = {
+        gsrn: get_message_timestamp(msg)
+        for gsrn, msg in latest.items()
+    }
+
+    controller.delete_meteringpoint_addresses(
+        session=session,
+        gsrn=[gsrn for gsrn, a in addresses.items() if a is None],
+        timestamps=timestamps,
+    )
+
+    controller.set_meteringpoint_addresses(
+        session=session,
+        addresses=[(gsrn, a) for gsrn, a in addresses.items() if a],
+        timestamps=timestamps,
+    )
+
+
+def on_meteringpoint_technology_update_batch(
+        msgs: List[m.MeteringPointTechnologyUpdate],
+        session: db.Session,
+):
+    """Create, update or delete technology codes using bulk statements."""
+
+    # Only the latest technology codes for each GSRN are relevant
+    latest = latest_by_gsrn(msgs, lambda msg: msg.gsrn)
+    codes = {gsrn: msg.codes for gsrn, msg in latest.items()}
+    timestamps = {
+        gsrn: get_message_timestamp(msg)
+        for gsrn, msg in latest.items()
+    }
+
+    controller.delete_meteringpoint_technologies(
+        session=session,
+        gsrn=[gsrn for gsrn, c in codes.items() if c is None],
+        timestamps=timestamps,
+    )
+
+    controller.set_meteringpoint_technologies(
+        session=session,
+        technologies=[(gsrn, c) for gsrn, c in codes.items() if c],
+        timestamps=timestamps,
+    )
+
+
+def on_meteringpoint_delegate_granted_batch(
+        msgs: List[m.MeteringPointDelegateGranted],
+        session: db.Session,
+):
+    """Grant subjects access to MeteringPoints."""
+
+    controller.grant_meteringpoint_delegates(
+        session=session,
+        delegates=[(msg.delegate.gsrn, msg.delegate.subject) for msg in msgs],
+    )
+
+
+def on_meteringpoint_delegate_revoked_batch(
+        msgs: List[m.MeteringPointDelegateRevoked],
+        session: db.Session,
+):
+    """Revoke subjects access to MeteringPoints."""
+
+    for msg in msgs:
+        controller.revoke_meteringpoint_delegate(
+            session=session,
+            gsrn=msg.delegate.gsrn,
+            subject=msg.delegate.subject,
+        )
+
+
+def on_technology_update_batch(
+        msgs: List[m.TechnologyUpdate],
+        session: db.Session,
+):
+    """Create or update Technologies."""
+
+    controller.set_technologies(
+        session=session,
+        technologies=[msg.technology for msg in msgs],
+    )
+
+
+def on_technology_removed_batch(
+        msgs: List[m.TechnologyRemoved],
+        session: db.Session,
+):
+    """Delete Technologies."""
+
+    for msg in msgs:
+        controller.delete_technology(
+            session=session,
+            tech_code=msg.codes.tech_code,
+            fuel_code=msg.codes.fuel_code,
+        )
+
+
 # -- Dispatcher --------------------------------------------------------------
 
 
-dispatcher = MessageDispatcher({
+dispatcher = MeasuredMessageDispatcher({
     m.MeteringPointUpdate: on_meteringpoint_update,
     m.MeteringPointRemoved: on_meteringpoint_removed,
     m.MeteringPointAddressUpdate: on_meteringpoint_address_update,
@@ -184,3 +412,15 @@ dispatcher = MessageDispatcher({
     m.TechnologyUpdate: on_technology_update,
     m.TechnologyRemoved: on_technology_removed,
 })
+
+
+batch_dispatcher = MessageBatchDispatcher({
+    m.MeteringPointUpdate: on_meteringpoint_update_batch,
+    m.MeteringPointRemoved: on_meteringpoint_removed_batch,
+    m.MeteringPointAddressUpdate: on_meteringpoint_address_update_batch,
+    m.MeteringPointTechnologyUpdate: on_meteringpoint_technology_update_batch,
+    m.MeteringPointDelegateGranted: on_meteringpoint_delegate_granted_batch,
+    m.MeteringPointDelegateRevoked: on_meteringpoint_delegate_revoked_batch,
+    m.TechnologyUpdate: on_technology_update_batch,
+    m.TechnologyRemoved: on_technology_removed_batch,
+})
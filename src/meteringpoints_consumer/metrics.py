@@ -0,0 +1,141 @@
+"""
+Prometheus metrics for the consumer.
+
+Messages are counted and measured by type, as handled by either
+dispatcher or batch_dispatcher. For batches, consecutive messages of
+the same type are handled together, so the handler duration is that
+of the group, and the number of messages handled tells the average
+per message. SQL statements executed while handling are counted, so
+statements per message can be derived too (statements flushed when
+a batch is committed are not attributed to any type). Each message,
+or group of messages, is a unit of work for the SQL profiler (if
+enabled).
+"""
+from time import perf_counter
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Type
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import Metric, GaugeMetricFamily
+
+from origin.bus import Message, MessageDispatcher
+
+from meteringpoints_shared.db import statement_counter, sql_profiler
+from meteringpoints_shared.bus import batch_broker
+from meteringpoints_shared.metrics import ProcessCollector, register_collector
+
+
+@contextmanager
+def measure_messages(
+        message_type: Type[Message],
+        messages: int,
+) -> Iterator[None]:
+    """
+    Measure handling of a number of messages of the same type.
+
+    Messages are counted as failed if handling them raises an exception.
+    """
+    name = message_type.__name__
+    statements = statement_counter.count
+    started = perf_counter()
+
+    sql_profiler.begin(name)
+
+    try:
+        yield
+    except Exception:
+        messages_failed.labels(name).inc(messages)
+        raise
+    else:
+        messages_handled.labels(name).inc(messages)
+        handler_duration.labels(name).observe(perf_counter() - started)
+        statements_executed \
+            .labels(name) \
+            .inc(statement_counter.count - statements)
+    finally:
+        sql_profiler.end()
+
+
+@contextmanager
+def measure_batch(messages: int) -> Iterator[None]:
+    """Measure handling of a batch of messages (of any types)."""
+
+    started = perf_counter()
+
+    yield
+
+    batch_size.observe(messages)
+    batch_duration.observe(perf_counter() - started)
+
+
+class MeasuredMessageDispatcher(MessageDispatcher):
+    """MessageDispatcher which measures the messages it handles."""
+
+    def __call__(self, msg: Message):
+        """Dispatch a message."""
+
+        if type(msg) in self:
+            with measure_messages(type(msg), 1):
+                super(MeasuredMessageDispatcher, self).__call__(msg)
+        else:
+            super(MeasuredMessageDispatcher, self).__call__(msg)
+
+
+class LagCollector(ProcessCollector):
+    """Collects the lag of partitions consumed by batch_broker."""
+
+    def collect_metrics(self) -> Iterable[Metric]:
+        """Collect metrics."""
+
+        lag = GaugeMetricFamily(
+            'meteringpoints_consumer_lag',
+            'Number of messages in a partition not consumed yet',
+            labels=['topic', 'partition'])
+
+        for (topic, partition), value in batch_broker.lag.items():
+            lag.add_metric([topic, str(partition)], value)
+
+        return lag,
+
+
+# -- Singletons --------------------------------------------------------------
+
+
+messages_handled = Counter(
+    'meteringpoints_consumer_messages',
+    'Number of messages handled by type',
+    ['type'],
+)
+
+messages_failed = Counter(
+    'meteringpoints_consumer_messages_failed',
+    'Number of messages which failed to be handled by type',
+    ['type'],
+)
+
+handler_duration = Histogram(
+    'meteringpoints_consumer_handler_duration_seconds',
+    'Time spent handling a message, or a group of messages in a batch',
+    ['type'],
+)
+
+statements_executed = Counter(
+    'meteringpoints_consumer_statements',
+    'Number of SQL statements executed while handling messages by type',
+    ['type'],
+)
+
+batch_size = Histogram(
+    'meteringpoints_consumer_batch_size',
+    'Number of messages per batch',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000),
+)
+
+batch_duration = Histogram(
+    'meteringpoints_consumer_batch_duration_seconds',
+    'Time spent handling batches',
+)
+
+statement_counter.start()
+
+register_collector(LagCollector())
@@ -0,0 +1,39 @@
+"""
+Rebuilds data derived from MeteringPoints.
+
+Usage:
+
+    python -m meteringpoints_consumer.rebuild
+
+Recounts meteringpoint_statistics, and rebuilds the subject read model
+(subject_meteringpoint) if it is enabled, from the actual tables in a
+single transaction. Run it after enabling SUBJECT_READ_MODEL_ENABLED,
+or to repair derived data.
+"""
+import sys
+from time import monotonic
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.controller import controller
+
+
+@db.atomic()
+def rebuild(session: db.Session):
+    """Rebuild statistics and the subject read model (if enabled)."""
+
+    controller.rebuild_statistics(session)
+    controller.rebuild_subject_meteringpoints(session)
+
+
+def main():
+    """Rebuild and report time spent to stderr."""
+
+    started = monotonic()
+
+    rebuild()
+
+    print(f'Rebuilt in {monotonic() - started:.1f} seconds', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
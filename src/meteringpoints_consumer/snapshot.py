@@ -0,0 +1,544 @@
+"""
+Imports a snapshot of MeteringPoints into the database.
+
+Usage:
+
+    python -m meteringpoints_consumer.snapshot PATH [--format ndjson|csv]
+
+Reads a snapshot of MeteringPoints (from a file, or stdin if PATH is '-')
+and loads it in a single transaction, which makes it suitable for
+populating the database of a fresh environment. Records are streamed
+in chunks into temporary staging tables using PostgreSQL COPY, and
+merged into the actual tables afterwards using a single INSERT ...
+SELECT statement per table.
+
+The snapshot is merged into any existing data. MeteringPoints, addresses
+and technologies are created or updated (the last occurrence of a GSRN
+wins), and delegates are granted. Nothing is deleted.
+
+NDJSON snapshots contain one JSON object per line:
+
+    {"gsrn": "...", "type": "consumption", "sector": "DK1",
+     "address": {"street_name": "...", ...},
+     "technology": {"tech_code": "...", "fuel_code": "..."},
+     "subjects": ["...", "..."]}
+
+CSV snapshots have a header row with the columns gsrn, type, sector,
+the address fields (street_code, street_name, etc.), tech_code,
+fuel_code, and subjects (separated by semicolons). Empty values are
+imported as NULL.
+"""
+import io
+import os
+import sys
+import csv
+import json
+import argparse
+import sqlalchemy as sa
+from time import monotonic
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, List, Dict, Optional, Any
+from typing import Callable, Type
+from sqlalchemy.dialects.postgresql import insert
+
+from origin.serialize import Serializable, simple_serializer
+from origin.models.common import Address
+from origin.models.tech import TechnologyCodes
+from origin.models.meteringpoints import MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.controller import (
+    ADDRESS_FIELDS,
+    controller,
+    is_deleted,
+    on_conflict_update_changed,
+)
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointTechnology,
+    DbMeteringPointDelegate,
+)
+
+
+# Number of records to buffer before copying them to the database
+DEFAULT_CHUNK_SIZE = 10000
+
+# Separates subjects in CSV snapshots
+SUBJECTS_SEPARATOR = ';'
+
+# Snapshot formats, mapped by file extensions
+FORMATS = {
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+}
+
+
+@dataclass
+class SnapshotRecord(Serializable):
+    """A MeteringPoint and its associated data, as found in a snapshot."""
+
+    gsrn: str
+    type: Optional[MeteringPointType] = field(default=None)
+    sector: Optional[str] = field(default=None)
+    address: Optional[Address] = field(default=None)
+    technology: Optional[TechnologyCodes] = field(default=None)
+    subjects: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ImportResult:
+    """Outcome of importing a snapshot."""
+
+    # Number of records read from the snapshot
+    records: int
+
+    # Number of rows created or updated, mapped by table name
+    written: Dict[str, int]
+
+    # Time (in seconds) it took to import the snapshot
+    elapsed: float
+
+    @property
+    def records_per_second(self) -> float:
+        """Number of records imported per second."""
+
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+
+# -- Reading snapshots -------------------------------------------------------
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[SnapshotRecord]:
+    """Read SnapshotRecords from a NDJSON stream, skipping blank lines."""
+
+    for line in stream:
+        if line.strip():
+            yield simple_serializer.deserialize(
+                data=json.loads(line),
+                schema=SnapshotRecord,
+            )
+
+
+def read_csv(stream: IO[str]) -> Iterator[SnapshotRecord]:
+    """Read SnapshotRecords from a CSV stream with a header row."""
+
+    for row in csv.DictReader(stream):
+        row = {k: v or None for k, v in row.items()}
+
+        address = {f: row.get(f) for f in ADDRESS_FIELDS}
+        subjects = row.get('subjects')
+
+        yield SnapshotRecord(
+            gsrn=row['gsrn'],
+            type=MeteringPointType(row['type']) if row.get('type') else None,
+            sector=row.get('sector'),
+            address=(
+                Address(**address)
+                if any(v is not None for v in address.values())
+                else None
+            ),
+            technology=(
+                TechnologyCodes(
+                    tech_code=row.get('tech_code'),
+                    fuel_code=row.get('fuel_code'),
+                )
+                if row.get('tech_code') or row.get('fuel_code')
+                else None
+            ),
+            subjects=subjects.split(SUBJECTS_SEPARATOR) if subjects else [],
+        )
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+# -- Staging tables ----------------------------------------------------------
+
+
+staging_metadata = sa.MetaData()
+
+
+def _staging_table(name: str, *columns: str) -> sa.Table:
+    """
+    Declare a temporary table for staging rows before merging them.
+
+    Each row has a sequence number (seq) which is its position in the
+    snapshot, used to let the last occurrence of a GSRN win.
+    """
+    return sa.Table(
+        name,
+        staging_metadata,
+        sa.Column('seq', sa.BigInteger()),
+        *(sa.Column(c, sa.String()) for c in columns),
+        prefixes=['TEMPORARY'],
+        postgresql_on_commit='DROP',
+    )
+
+
+staging_meteringpoint = _staging_table(
+    'staging_meteringpoint', 'gsrn', 'type', 'sector')
+
+staging_address = _staging_table(
+    'staging_meteringpoint_address', 'gsrn', *ADDRESS_FIELDS)
+
+staging_technology = _staging_table(
+    'staging_meteringpoint_technology', 'gsrn', 'tech_code', 'fuel_code')
+
+staging_delegate = _staging_table(
+    'staging_meteringpoint_delegate', 'gsrn', 'subject')
+
+
+class StagingBuffer(object):
+    """
+    Buffers rows for a staging table, and copies them in on flush().
+
+    Rows are formatted as CSV in memory and loaded using COPY,
+    which is considerably faster than INSERT for large volumes.
+    """
+
+    def __init__(self, table: sa.Table):
+        self.table = table
+        self.rows = 0
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def append(self, *values: Optional[str]):
+        """Add a row of values, prefixed by its sequence number."""
+
+        self._writer.writerow((self.rows,) + values)
+        self.rows += 1
+
+    def flush(self, session: db.Session):
+        """Copy buffered rows into the staging table."""
+
+        if not self._buffer.tell():
+            return
+
+        columns = ', '.join(c.name for c in self.table.columns)
+
+        self._buffer.seek(0)
+
+        with session.connection().connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {self.table.name} ({columns}) '
+                f'FROM STDIN WITH (FORMAT csv)',
+                self._buffer,
+            )
+
+        self._buffer.seek(0)
+        self._buffer.truncate()
+
+
+def stage_records(
+        session: db.Session,
+        records: Iterable[SnapshotRecord],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Create staging tables and copy records into them, chunk by chunk.
+
+    Returns the number of records staged.
+
+    :param progress: Called with the number of records staged so far
+        after each chunk (optional)
+    """
+    staging_metadata.create_all(session.connection())
+
+    meteringpoints = StagingBuffer(staging_meteringpoint)
+    addresses = StagingBuffer(staging_address)
+    technologies = StagingBuffer(staging_technology)
+    delegates = StagingBuffer(staging_delegate)
+    buffers = (meteringpoints, addresses, technologies, delegates)
+    count = 0
+
+    for record in records:
+        meteringpoints.append(
+            record.gsrn,
+            record.type.name if record.type else None,
+            record.sector,
+        )
+
+        if record.address is not None:
+            addresses.append(
+                record.gsrn,
+                *(getattr(record.address, f) for f in ADDRESS_FIELDS),
+            )
+
+        if record.technology is not None:
+            technologies.append(
+                record.gsrn,
+                record.technology.tech_code,
+                record.technology.fuel_code,
+            )
+
+        for subject in record.subjects:
+            delegates.append(record.gsrn, subject)
+
+        count += 1
+
+        if count % chunk_size == 0:
+            for buffer in buffers:
+                buffer.flush(session)
+            if progress is not None:
+                progress(count)
+
+    for buffer in buffers:
+        buffer.flush(session)
+
+    return count
+
+
+# -- Merging -----------------------------------------------------------------
+
+
+def _merge(
+        session: db.Session,
+        model: Type[db.ModelBase],
+        staging: sa.Table,
+        columns: Dict[str, Any],
+        index_elements: List[str],
+) -> int:
+    """
+    Merge the latest staged row per key into the table of model.
+
+    Issues a single INSERT ... SELECT DISTINCT ON statement, which
+    updates existing rows like DatabaseController does (see
+    on_conflict_update_changed()). If the columns include an
+    event_timestamp, rows deleted by newer events are skipped (see
+    is_deleted()). Returns the number of rows written.
+
+    :param columns: SQL expressions for the inserted values, mapped
+        by column name
+    """
+    key = [staging.c[c] for c in index_elements]
+
+    select = sa.select(*columns.values()) \
+        .distinct(*key) \
+        .order_by(*key, staging.c.seq.desc())
+
+    if 'event_timestamp' in columns:
+        select = select.where(~is_deleted(
+            table=model.__table__,
+            gsrn=staging.c.gsrn,
+            event_timestamp=columns['event_timestamp'],
+        ))
+
+    statement = on_conflict_update_changed(
+        statement=insert(model.__table__).from_select(list(columns), select),
+        table=model.__table__,
+        columns=columns,
+        index_elements=index_elements,
+    )
+
+    return session.execute(statement).rowcount
+
+
+def merge_staged(
+        session: db.Session,
+        timestamp: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    Merge staged rows into the actual tables.
+
+    Returns the number of rows written, mapped by table name.
+
+    :param timestamp: Time the snapshot was taken (optional). If
+        provided, rows updated (or deleted) by events after it are left
+        untouched, and it is stored as the event timestamp of the
+        imported rows.
+    """
+    event_timestamp = sa.cast(
+        sa.literal(timestamp), sa.DateTime(timezone=True))
+
+    written = {}
+
+    written[DbMeteringPoint.__tablename__] = _merge(
+        session=session,
+        model=DbMeteringPoint,
+        staging=staging_meteringpoint,
+        index_elements=['gsrn'],
+        columns={
+            'gsrn': staging_meteringpoint.c.gsrn,
+            'type': sa.cast(
+                staging_meteringpoint.c.type, DbMeteringPoint.type.type),
+            'sector': staging_meteringpoint.c.sector,
+            'event_timestamp': event_timestamp,
+        },
+    )
+
+    written[DbMeteringPointAddress.__tablename__] = _merge(
+        session=session,
+        model=DbMeteringPointAddress,
+        staging=staging_address,
+        index_elements=['gsrn'],
+        columns={
+            'gsrn': staging_address.c.gsrn,
+            'event_timestamp': event_timestamp,
+            **{f: staging_address.c[f] for f in ADDRESS_FIELDS},
+        },
+    )
+
+    written[DbMeteringPointTechnology.__tablename__] = _merge(
+        session=session,
+        model=DbMeteringPointTechnology,
+        staging=staging_technology,
+        index_elements=['gsrn'],
+        columns={
+            'gsrn': staging_technology.c.gsrn,
+            'tech_code': staging_technology.c.tech_code,
+            'fuel_code': staging_technology.c.fuel_code,
+            'event_timestamp': event_timestamp,
+        },
+    )
+
+    written[DbMeteringPointDelegate.__tablename__] = _merge(
+        session=session,
+        model=DbMeteringPointDelegate,
+        staging=staging_delegate,
+        index_elements=['gsrn', 'subject'],
+        columns={
+            'gsrn': staging_delegate.c.gsrn,
+            'subject': staging_delegate.c.subject,
+        },
+    )
+
+    return written
+
+
+def import_snapshot(
+        session: db.Session,
+        records: Iterable[SnapshotRecord],
+        timestamp: Optional[datetime] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress: Optional[Callable[[int], None]] = None,
+) -> ImportResult:
+    """
+    Import a snapshot of MeteringPoints.
+
+    Stages and merges records using the provided session, but does not
+    commit. The staging tables are dropped afterwards, or when the
+    transaction ends if the import fails. Statistics and the subject
+    read model (if enabled) are rebuilt from scratch, which is cheaper
+    than maintaining them incrementally for a large number of records.
+    See stage_records() and merge_staged() for parameters.
+    """
+    started = monotonic()
+
+    count = stage_records(
+        session=session,
+        records=records,
+        chunk_size=chunk_size,
+        progress=progress,
+    )
+
+    written = merge_staged(
+        session=session,
+        timestamp=timestamp,
+    )
+
+    staging_metadata.drop_all(session.connection())
+    controller.rebuild_statistics(session)
+    controller.rebuild_subject_meteringpoints(session)
+    session.expire_all()
+
+    return ImportResult(
+        records=count,
+        written=written,
+        elapsed=monotonic() - started,
+    )
+
+
+# -- Command line ------------------------------------------------------------
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog='python -m meteringpoints_consumer.snapshot',
+        description='Import a snapshot of MeteringPoints.',
+    )
+
+    parser.add_argument(
+        'path',
+        help="Path to snapshot file, or '-' to read from stdin",
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(READERS),
+        help='Snapshot format (default: inferred from file extension)',
+    )
+    parser.add_argument(
+        '--timestamp',
+        type=datetime.fromisoformat,
+        help='Time the snapshot was taken (ISO 8601, with timezone)',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help='Number of records to copy at a time '
+             f'(default: {DEFAULT_CHUNK_SIZE})',
+    )
+
+    args = parser.parse_args(args)
+
+    if args.format is None:
+        extension = os.path.splitext(args.path)[1].lower()
+
+        if extension not in FORMATS:
+            parser.error('Can not infer format, please provide --format')
+
+        args.format = FORMATS[extension]
+
+    return args
+
+
+def main(args: List[str]):
+    """Import a snapshot and report progress to stderr."""
+
+    args = parse_args(args)
+    started = monotonic()
+
+    def _progress(count: int):
+        elapsed = monotonic() - started
+        print(
+            f'Staged {count} records ({count / elapsed:.0f} records/s)',
+            file=sys.stderr,
+        )
+
+    if args.path == '-':
+        stream = sys.stdin
+    else:
+        stream = open(args.path, newline='', encoding='utf-8')
+
+    with stream, db.make_session() as session:
+        result = import_snapshot(
+            session=session,
+            records=READERS[args.format](stream),
+            timestamp=args.timestamp,
+            chunk_size=args.chunk_size,
+            progress=_progress,
+        )
+
+        session.commit()
+
+    print(
+        f'Imported {result.records} records in {result.elapsed:.1f} '
+        f'seconds ({result.records_per_second:.0f} records/s)',
+        file=sys.stderr,
+    )
+
+    for table, written in result.written.items():
+        print(f'  {table}: {written} rows written', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+from zlib import crc32
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from origin.bus import Message, messages as m
+
+from meteringpoints_shared.bus import TBatchHandler
+
+from .metrics import measure_batch
+
+
+def get_partition_key(msg: Message) -> Optional[str]:
+    """
+    Return the key which decides what worker handles a message.
+
+    Messages regarding a MeteringPoint are keyed by its GSRN, and
+    messages regarding a Technology by its codes. Other messages
+    have no key.
+    """
+    if isinstance(msg, m.MeteringPointUpdate):
+        return msg.meteringpoint.gsrn
+    elif isinstance(msg, (m.MeteringPointDelegateGranted,
+                          m.MeteringPointDelegateRevoked)):
+        return msg.delegate.gsrn
+    elif isinstance(msg, (m.MeteringPointRemoved,
+                          m.MeteringPointAddressUpdate,
+                          m.MeteringPointTechnologyUpdate)):
+        return msg.gsrn
+    elif isinstance(msg, m.TechnologyUpdate):
+        return f'{msg.technology.tech_code}/{msg.technology.fuel_code}'
+    elif isinstance(msg, m.TechnologyRemoved):
+        return f'{msg.codes.tech_code}/{msg.codes.fuel_code}'
+
+    return None
+
+
+def get_worker(msg: Message, workers: int) -> int:
+    """
+    Return the index of the worker to handle a message.
+
+    Uses a hash of the partition key which is stable across processes.
+    Messages without a key are handled by the first worker.
+    """
+    key = get_partition_key(msg)
+
+    if key is None:
+        return 0
+
+    return crc32(key.encode()) % workers
+
+
+class PartitionedBatchHandler(object):
+    """
+    Handles batches of messages concurrently in a pool of worker threads.
+
+    Each batch is split into partitions by get_worker(), so all messages
+    regarding the same MeteringPoint (GSRN) are handled by the same
+    worker in the order received. Partitions are handled concurrently,
+    each by invoking handler with its messages.
+
+    Returns once all partitions have been handled, so offsets can be
+    committed safely afterwards. If any of the workers fail, the first
+    exception is raised once the other workers have finished.
+
+    Each partition is handled (and committed) on its own, but the offset
+    is committed once per batch. When a partition fails, the partitions
+    already committed are handled again when the batch is redelivered,
+    so handler must be idempotent under replay of a batch.
+    """
+
+    def __init__(self, handler: TBatchHandler, workers: int):
+        self.handler = handler
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='consumer-worker',
+        )
+
+    def partition(self, messages: List[Message]) -> List[List[Message]]:
+        """Split messages into (non-empty) partitions, one per worker."""
+
+        partitions = [[] for _ in range(self.workers)]
+
+        for msg in messages:
+            partitions[get_worker(msg, self.workers)].append(msg)
+
+        return [partition for partition in partitions if partition]
+
+    def __call__(self, messages: List[Message]):
+        """Handle a batch of messages."""
+
+        with measure_batch(len(messages)):
+            partitions = self.partition(messages)
+
+            if len(partitions) == 1:
+                self.handler(partitions[0])
+                return
+
+            futures = [
+                self._executor.submit(self.handler, partition)
+                for partition in partitions
+            ]
+
+            wait(futures)
+
+            for future in futures:
+                future.result()
+
+    def shutdown(self):
+        """Wait for pending partitions and stop the worker threads."""
+
+        self._executor.shutdown(wait=True)
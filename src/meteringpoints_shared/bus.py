@@ -1,9 +1,240 @@
-from origin.bus import get_default_broker
+from uuid import uuid4
+from time import monotonic
+from threading import Thread
+from typing import List, Dict, Tuple, Callable, Optional
+from datetime import datetime, timezone
+from functools import cached_property
+from kafka import KafkaConsumer
+
+from origin.bus import get_default_broker, message_registry
+from origin.bus.broker import Message, TTopicList, TMessageHandler
+from origin.bus.kafka import KafkaMessageBroker
+from origin.bus.serialize import MessageSerializer
 
 from meteringpoints_shared.config import MESSAGE_BUS_SERVERS
 
 
+TBatchHandler = Callable[[List[Message]], None]
+
+
+# Attribute on consumed messages holding the time they were published
+TIMESTAMP_ATTRIBUTE = '_bus_timestamp'
+
+
+def set_message_timestamp(msg: Message, timestamp: datetime):
+    """Attach the time a message was published to the message."""
+
+    setattr(msg, TIMESTAMP_ATTRIBUTE, timestamp)
+
+
+def get_message_timestamp(msg: Message) -> Optional[datetime]:
+    """
+    Return the time a message was published, if known.
+
+    Only messages consumed through BatchMessageBroker are timestamped.
+    """
+    return getattr(msg, TIMESTAMP_ATTRIBUTE, None)
+
+
+class BatchMessageBroker(KafkaMessageBroker):
+    """
+    Kafka message broker which consumes messages in batches.
+
+    Consumed messages are timestamped with the time they were published
+    (see get_message_timestamp()).
+
+    Offsets are NOT committed automatically. They are committed once a
+    batch has been handled successfully, so messages are redelivered if
+    the consumer fails before then.
+
+    Keeps track of the lag (number of messages not consumed yet) of
+    each assigned partition while listening, see update_lag().
+    """
+
+    def __init__(
+            self,
+            group: str,
+            servers: List[str],
+            serializer: MessageSerializer,
+    ):
+        super(BatchMessageBroker, self).__init__(
+            group=group,
+            servers=servers,
+            serializer=serializer,
+        )
+
+        # Lag of assigned partitions, mapped by (topic, partition)
+        self.lag: Dict[Tuple[str, int], int] = {}
+
+    @cached_property
+    def _kafka_consumer(self) -> KafkaConsumer:
+        """Kafka consumer with auto-commit of offsets disabled."""
+
+        return KafkaConsumer(
+            bootstrap_servers=self.servers,
+            value_deserializer=self.serializer.deserialize,
+            group_id=self.group,
+            auto_offset_reset='earliest',
+            enable_auto_commit=False,
+        )
+
+    def poll_batch(self, max_records: int, timeout: int) -> List[Message]:
+        """
+        Poll the broker for a batch of messages.
+
+        Keeps polling until either max_records messages have been
+        received or the timeout has passed, whichever comes first.
+
+        :param max_records: Max number of messages in the batch
+        :param timeout: Timeout in milliseconds
+        """
+        deadline = monotonic() + timeout / 1000
+        batch = []
+
+        while len(batch) < max_records:
+            remaining = int((deadline - monotonic()) * 1000)
+
+            if remaining <= 0:
+                break
+
+            res = self._kafka_consumer.poll(
+                timeout_ms=remaining,
+                max_records=max_records - len(batch),
+            )
+
+            for record_list in res.values():
+                for record in record_list:
+                    set_message_timestamp(record.value, datetime.fromtimestamp(
+                        record.timestamp / 1000, tz=timezone.utc))
+                    batch.append(record.value)
+
+        return batch
+
+    def commit(self):
+        """Commit offsets for all messages polled so far."""
+
+        self._kafka_consumer.commit()
+
+    def update_lag(self):
+        """
+        Update the lag of assigned partitions.
+
+        The lag is the difference between the latest offset of a
+        partition (as of the last fetch) and the position of the
+        consumer, so it is known without asking the broker. Partitions
+        which have not been fetched from yet are left out.
+        """
+        consumer = self._kafka_consumer
+        lag = {}
+
+        for partition in consumer.assignment():
+            highwater = consumer.highwater(partition)
+
+            if highwater is not None:
+                lag[(partition.topic, partition.partition)] = \
+                    max(0, highwater - consumer.position(partition))
+
+        self.lag = lag
+
+    def listen_batched(
+            self,
+            topics: TTopicList,
+            handler: TBatchHandler,
+            batch_size: int,
+            timeout: int,
+    ):
+        """
+        Subscribe to the provided topics and invoke handler with batches.
+
+        Offsets are committed after the handler returns, ie. after the
+        batch has been applied.
+
+        :param topics: The topics to subscribe to
+        :param handler: Invoked with a list of messages
+        :param batch_size: Max number of messages per batch
+        :param timeout: Max time (in milliseconds) to wait for a batch
+        """
+        self.subscribe(topics)
+
+        while True:
+            batch = self.poll_batch(max_records=batch_size, timeout=timeout)
+
+            if batch:
+                handler(batch)
+                self.commit()
+
+            self.update_lag()
+
+
+class ListenerMessageBroker(KafkaMessageBroker):
+    """
+    Kafka message broker for keeping in-process state in sync with the bus.
+
+    Each instance joins a consumer group of its own, so every process
+    receives all messages, and only consumes messages published after
+    it has subscribed.
+    """
+
+    def __init__(
+            self,
+            group: str,
+            servers: List[str],
+            serializer: MessageSerializer,
+    ):
+        super(ListenerMessageBroker, self).__init__(
+            group=f'{group}-{uuid4()}',
+            servers=servers,
+            serializer=serializer,
+        )
+
+    @cached_property
+    def _kafka_consumer(self) -> KafkaConsumer:
+        """Kafka consumer starting from the latest offsets."""
+
+        return KafkaConsumer(
+            bootstrap_servers=self.servers,
+            value_deserializer=self.serializer.deserialize,
+            group_id=self.group,
+            auto_offset_reset='latest',
+            enable_auto_commit=True,
+        )
+
+    def listen_in_background(
+            self,
+            topics: TTopicList,
+            handler: TMessageHandler,
+    ) -> Thread:
+        """
+        Invoke handler with each new message in a daemon thread.
+
+        :param topics: The topics to subscribe to
+        :param handler: Invoked with each message
+        :return: The (started) thread
+        """
+        thread = Thread(
+            target=self.listen,
+            kwargs={'topics': topics, 'handler': handler},
+            daemon=True,
+        )
+
+        thread.start()
+
+        return thread
+
+
 broker = get_default_broker(
     group='meteringpoints',
     servers=MESSAGE_BUS_SERVERS,
 )
+
+batch_broker = BatchMessageBroker(
+    group='meteringpoints',
+    servers=MESSAGE_BUS_SERVERS,
+    serializer=MessageSerializer(registry=message_registry),
+)
+
+listener_broker = ListenerMessageBroker(
+    group='meteringpoints-api',
+    servers=MESSAGE_BUS_SERVERS,
+    serializer=MessageSerializer(registry=message_registry),
+)
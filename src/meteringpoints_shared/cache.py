@@ -0,0 +1,178 @@
+from time import monotonic
+from threading import Lock
+from collections import OrderedDict
+from typing import Generic, TypeVar, Hashable, Callable, Optional, Tuple
+from typing import Dict
+
+
+TValue = TypeVar('TValue')
+
+
+class TTLCache(Generic[TValue]):
+    """
+    Thread-safe, in-process LRU cache where entries expire after a TTL.
+
+    Holds at most max_size entries; when full, the least recently used
+    entry is evicted. Entries expire ttl seconds after being set.
+    A max_size or ttl of zero disables caching. Keeps count of hits
+    and misses. None can not be cached as a value.
+
+    Every invalidation increments the cache's generation. Values read
+    before an invalidation of their key (ie. by get_or_set()) are not
+    cached, as they may be older than the change which caused it.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, TValue]]' = \
+            OrderedDict()
+        self._lock = Lock()
+
+        # Generation each key was last invalidated in, and the generation
+        # all keys were last invalidated in (by clear() or invalidate_where())
+        self._generation = 0
+        self._invalidated: Dict[Hashable, int] = {}
+        self._invalidated_all = 0
+
+    def __len__(self) -> int:
+        """Return number of entries (including expired ones)."""
+
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Return the ratio of lookups which were hits (0 if none)."""
+
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Check whether caching is enabled."""
+
+        return self.max_size > 0 and self.ttl > 0
+
+    @property
+    def generation(self) -> int:
+        """Return the number of invalidations so far."""
+
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[TValue]:
+        """Return cached value for key, or None if not cached or expired."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] > monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def peek(self, key: Hashable) -> Optional[TValue]:
+        """
+        Return cached value for key, even if expired, or None if not cached.
+
+        Does not count as a hit or miss, nor as a use of the entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            return entry[1] if entry is not None else None
+
+    def set(
+            self,
+            key: Hashable,
+            value: TValue,
+            generation: Optional[int] = None,
+    ):
+        """
+        Cache value for key, evicting least recently used entries.
+
+        :param generation: Generation of the cache when value was read
+            (optional). If provided, value is not cached if key has been
+            invalidated since.
+        """
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation is not None and generation < max(
+                    self._invalidated.get(key, 0), self._invalidated_all):
+                return
+
+            self._entries[key] = (monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_set(
+            self,
+            key: Hashable,
+            factory: Callable[[], TValue],
+    ) -> TValue:
+        """
+        Return cached value for key, or cache and return a new value.
+
+        The factory is invoked outside the lock, so concurrent misses
+        on the same key may invoke it more than once. If key is
+        invalidated while the factory is invoked, the new value is
+        returned, but not cached.
+        """
+        value = self.get(key)
+
+        if value is None:
+            generation = self._generation
+            value = factory()
+            self.set(key, value, generation=generation)
+
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Remove entry for key, if it exists."""
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._invalidated[key] = self._generation
+
+            # Forget generations of single keys, but keep invalidating
+            # values read before now
+            if len(self._invalidated) > self.max_size:
+                self._invalidated.clear()
+                self._invalidated_all = self._generation
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """
+        Remove entries for all keys matching predicate.
+
+        Values being read for any key are not cached, as they can not be
+        matched against predicate before they are set.
+        """
+
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+            self._generation += 1
+            self._invalidated_all = self._generation
+
+    def clear(self):
+        """Remove all entries."""
+
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._invalidated_all = self._generation
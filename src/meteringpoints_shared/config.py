@@ -7,6 +7,32 @@ import os
 INTERNAL_TOKEN_SECRET = os.environ.get('INTERNAL_TOKEN_SECRET', '')
 
 
+# Whether to list MeteringPoints from the local database instead of
+# looking them up in the data sync domain
+LIST_FROM_DATABASE = os.environ.get('LIST_FROM_DATABASE', '0') == '1'
+
+
+# Whether to maintain (consumer) and list MeteringPoints from (API) a
+# denormalized read model with a row per subject and MeteringPoint
+SUBJECT_READ_MODEL_ENABLED = \
+    os.environ.get('SUBJECT_READ_MODEL_ENABLED', '0') == '1'
+
+
+# Default number of MeteringPoints per page when listing
+PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 100))
+
+# Max number of MeteringPoints per page a client can request
+PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 1000))
+
+
+# Max number of GSRNs a client can request details for at once
+DETAILS_BATCH_SIZE_MAX = int(os.environ.get('DETAILS_BATCH_SIZE_MAX', 500))
+
+
+# Number of MeteringPoints fetched from the database at a time when exporting
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+
 # -- Message Bus -------------------------------------------------------------
 
 # Message Bus host
@@ -25,4 +51,149 @@ MESSAGE_BUS_SERVERS = [f'{MESSAGE_BUS_HOST}:{MESSAGE_BUS_PORT}']
 SQL_URI = os.environ.get('SQL_URI', '')
 
 # Number of concurrent connection to SQL database
-SQL_POOL_SIZE = int(os.getenv('SQL_POOL_SIZE', 1))
+SQL_POOL_SIZE = int(os.getenv('SQL_POOL_SIZE', 5))
+
+# Number of connections to open beyond SQL_POOL_SIZE under load
+SQL_MAX_OVERFLOW = int(os.environ.get('SQL_MAX_OVERFLOW', 10))
+
+# Max time (in seconds) to wait for a connection from the pool
+SQL_POOL_TIMEOUT = float(os.environ.get('SQL_POOL_TIMEOUT', 30))
+
+# Whether to test connections for liveness before using them
+SQL_POOL_PRE_PING = os.environ.get('SQL_POOL_PRE_PING', '1') == '1'
+
+# Recycle connections after this number of seconds (-1 never recycles)
+SQL_POOL_RECYCLE = int(os.environ.get('SQL_POOL_RECYCLE', 1800))
+
+# Pool size and overflow for API processes (serving concurrent requests)
+SQL_API_POOL_SIZE = int(os.environ.get('SQL_API_POOL_SIZE', SQL_POOL_SIZE))
+SQL_API_MAX_OVERFLOW = int(
+    os.environ.get('SQL_API_MAX_OVERFLOW', SQL_MAX_OVERFLOW))
+
+# Pool size and overflow for consumer processes
+SQL_CONSUMER_POOL_SIZE = int(os.environ.get('SQL_CONSUMER_POOL_SIZE', 2))
+SQL_CONSUMER_MAX_OVERFLOW = int(
+    os.environ.get('SQL_CONSUMER_MAX_OVERFLOW', 0))
+
+
+# SqlAlchemy connection string for a read replica (optional), used by
+# the API for read-only queries
+SQL_REPLICA_URI = os.environ.get('SQL_REPLICA_URI', '')
+
+# Max replication lag (in seconds) before reading from the primary instead
+SQL_REPLICA_MAX_LAG = float(os.environ.get('SQL_REPLICA_MAX_LAG', 5))
+
+# Interval (in seconds) between checks of the replication lag
+SQL_REPLICA_LAG_CHECK_INTERVAL = float(
+    os.environ.get('SQL_REPLICA_LAG_CHECK_INTERVAL', 5))
+
+
+# Whether to profile SQL statements, logging number of statements and time
+# spent per request or message, slow statements, and repeated statements
+SQL_PROFILING_ENABLED = os.environ.get('SQL_PROFILING_ENABLED', '0') == '1'
+
+# Statements slower than this (in seconds) are logged with their EXPLAIN
+# plan when profiling
+SQL_SLOW_STATEMENT_THRESHOLD = float(
+    os.environ.get('SQL_SLOW_STATEMENT_THRESHOLD', 0.5))
+
+# Statements executed at least this number of times within the same request
+# or message are logged as possible N+1 queries when profiling
+SQL_REPEATED_STATEMENT_THRESHOLD = int(
+    os.environ.get('SQL_REPEATED_STATEMENT_THRESHOLD', 5))
+
+
+# -- Consumer ----------------------------------------------------------------
+
+# Max number of messages to apply in a single database transaction
+# (a value of 1 consumes messages one at a time without batching)
+CONSUMER_BATCH_SIZE = int(os.environ.get('CONSUMER_BATCH_SIZE', 1))
+
+# Max time (in milliseconds) to wait for a batch to fill up
+CONSUMER_BATCH_TIMEOUT = int(os.environ.get('CONSUMER_BATCH_TIMEOUT', 500))
+
+# Number of worker threads to apply batches with. Messages are assigned
+# to workers by GSRN. SQL_CONSUMER_POOL_SIZE should be at least this
+CONSUMER_WORKERS = int(os.environ.get('CONSUMER_WORKERS', 1))
+
+
+# -- Upstream services -------------------------------------------------------
+
+# Base URL of the auth service
+AUTH_SERVICE_URL = os.environ.get('AUTH_SERVICE_URL', 'http://eo-auth')
+
+# Base URL of the data sync service
+DATA_SYNC_SERVICE_URL = os.environ.get(
+    'DATA_SYNC_SERVICE_URL', 'http://eo-data-sync')
+
+# Max number of pooled (keep-alive) connections per upstream host
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+
+# Whether requests wait for a pooled connection when all are in use.
+# Requests can wait indefinitely, as no timeout applies while waiting, so
+# by default a temporary connection is opened instead (and then discarded)
+HTTP_POOL_BLOCK = os.environ.get('HTTP_POOL_BLOCK', '0') == '1'
+
+# Timeout (in seconds) for connecting to upstream services
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3))
+
+# Timeout (in seconds) for reading responses from upstream services
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+
+
+# -- API caching -------------------------------------------------------------
+
+# Whether the API listens on the Message Bus to invalidate its caches
+API_BUS_LISTENER_ENABLED = \
+    os.environ.get('API_BUS_LISTENER_ENABLED', '0') == '1'
+
+# Max number of cached user infos from the auth service (by subject)
+USER_INFO_CACHE_SIZE = int(os.environ.get('USER_INFO_CACHE_SIZE', 10000))
+
+# Time-to-live (in seconds) for cached user infos (0 disables caching).
+# Only cached by default if the API listens on the Message Bus, as nothing
+# else invalidates user infos when delegates are granted or revoked
+USER_INFO_CACHE_TTL = int(os.environ.get(
+    'USER_INFO_CACHE_TTL', 300 if API_BUS_LISTENER_ENABLED else 0))
+
+# Max number of cached GSRN lists from the data sync service (by TIN)
+GSRN_CACHE_SIZE = int(os.environ.get('GSRN_CACHE_SIZE', 10000))
+
+# Time-to-live (in seconds) for cached GSRN lists (0 disables caching).
+# Only cached by default if the API listens on the Message Bus, as nothing
+# else invalidates GSRN lists when delegates are granted or revoked
+GSRN_CACHE_TTL = int(os.environ.get(
+    'GSRN_CACHE_TTL', 60 if API_BUS_LISTENER_ENABLED else 0))
+
+# Max number of cached MeteringPoint details (by GSRN)
+DETAILS_CACHE_SIZE = int(os.environ.get('DETAILS_CACHE_SIZE', 100000))
+
+# Time-to-live (in seconds) for cached MeteringPoint details
+# (0 disables caching). Only cached by default if the API listens on the
+# Message Bus, as nothing else invalidates details when they change
+DETAILS_CACHE_TTL = int(os.environ.get(
+    'DETAILS_CACHE_TTL', 300 if API_BUS_LISTENER_ENABLED else 0))
+
+# Max number of cached access decisions (by subject and GSRN)
+ACCESS_CACHE_SIZE = int(os.environ.get('ACCESS_CACHE_SIZE', 100000))
+
+# Time-to-live (in seconds) for cached access decisions (0 disables caching).
+# Only cached by default if the API listens on the Message Bus, as nothing
+# else invalidates decisions when delegates are granted or revoked
+ACCESS_CACHE_TTL = int(os.environ.get(
+    'ACCESS_CACHE_TTL', 300 if API_BUS_LISTENER_ENABLED else 0))
+
+# Time-to-live (in seconds) for the in-memory technology catalogue, after
+# which it is reloaded from the database (0 never reloads)
+TECHNOLOGY_CATALOGUE_TTL = \
+    int(os.environ.get('TECHNOLOGY_CATALOGUE_TTL', 300))
+
+
+# -- Metrics -----------------------------------------------------------------
+
+# Directory where processes share Prometheus metrics, when running multiple
+# processes (for instance gunicorn workers), or None for a single process
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# Port the consumer serves metrics on (for Prometheus)
+CONSUMER_METRICS_PORT = int(os.environ.get('CONSUMER_METRICS_PORT', 9094))
@@ -1,14 +1,30 @@
-from typing import Union
+from threading import Lock
+from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+from typing import Union, Iterable, Tuple, Dict, Any, List, Type, Optional
+from typing import Collection
+from sqlalchemy import delete, values, column, cast, func, and_, or_, tuple_
+from sqlalchemy import select, exists
+from sqlalchemy import String, DateTime, Table
+from sqlalchemy.sql import ColumnElement, Select
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.dialects.postgresql import insert, Insert
 
 from origin.models.common import Address
 from origin.models.tech import Technology, TechnologyCodes
+from origin.models.meteringpoints import MeteringPoint
 
 from meteringpoints_shared.db import db
+from meteringpoints_shared.config import SUBJECT_READ_MODEL_ENABLED
 from meteringpoints_shared.models import (
     DbMeteringPoint,
     DbMeteringPointAddress,
     DbMeteringPointTechnology,
+    DbMeteringPointTombstone,
     DbMeteringPointDelegate,
+    DbMeteringPointStatistics,
+    DbSubjectMeteringPoint,
     DbTechnology,
 )
 from meteringpoints_shared.queries import (
@@ -32,9 +48,167 @@ TTechnology = Union[
     DbMeteringPointTechnology,
 ]
 
+# Models holding data associated with a MeteringPoint
+METERINGPOINT_DATA_MODELS = (
+    DbMeteringPointAddress,
+    DbMeteringPointTechnology,
+    DbMeteringPointDelegate,
+)
+
+# Models which keep tombstones for rows deleted by timestamped events
+TOMBSTONED_MODELS = (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointTechnology,
+)
+
+# Event timestamps mapped by GSRN
+TTimestamps = Dict[str, Optional[datetime]]
+
+# Group in meteringpoint_statistics: (sector, type, tech_code, fuel_code)
+TStatisticsKey = Tuple[str, str, str, str]
+
+# Number of slots each group in meteringpoint_statistics is split into
+STATISTICS_SLOTS = 16
+
+# Fields of an address which are stored on DbMeteringPointAddress
+ADDRESS_FIELDS = (
+    'street_code',
+    'street_name',
+    'building_number',
+    'floor_id',
+    'room_id',
+    'post_code',
+    'city_name',
+    'city_sub_division_name',
+    'municipality_code',
+    'location_description',
+)
+
+
+def on_conflict_update_changed(
+        statement: Insert,
+        table: Table,
+        columns: Iterable[str],
+        index_elements: List[str],
+) -> Insert:
+    """
+    Make an INSERT statement update existing rows, but only if changed.
+
+    Columns other than index_elements are updated on conflict; if there
+    are none, existing rows are left untouched. Existing rows are only
+    updated if any of their columns differ from the inserted values,
+    so unchanged rows produce no UPDATE.
+
+    If the columns include event_timestamp, existing rows are only
+    updated if their event_timestamp is not newer, which is checked in
+    the same statement. Rows without an event_timestamp are always
+    updated (if changed), keeping the existing event_timestamp.
+    Unchanged rows are still updated if the event is newer, so their
+    event_timestamp is moved forward, and older events received later
+    are skipped.
+    """
+    excluded = statement.excluded
+
+    update = {
+        column: excluded[column]
+        for column in columns
+        if column not in index_elements
+    }
+
+    # Only update rows where any of the (non-versioning) columns change
+    changed = [
+        table.c[column].is_distinct_from(excluded[column])
+        for column in update
+        if column != 'event_timestamp'
+    ]
+
+    if 'event_timestamp' in update:
+        update['event_timestamp'] = func.coalesce(
+            excluded.event_timestamp, table.c.event_timestamp)
+
+        newer = and_(
+            excluded.event_timestamp.isnot(None),
+            or_(
+                table.c.event_timestamp.is_(None),
+                table.c.event_timestamp < excluded.event_timestamp,
+            ),
+        )
+
+        return statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_=update,
+            where=and_(or_(*changed, newer), or_(
+                excluded.event_timestamp.is_(None),
+                table.c.event_timestamp.is_(None),
+                table.c.event_timestamp <= excluded.event_timestamp,
+            )),
+        )
+    elif update:
+        return statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_=update,
+            where=or_(*changed),
+        )
+    else:
+        return statement.on_conflict_do_nothing(
+            index_elements=index_elements,
+        )
+
+
+def is_deleted(
+        table: Table,
+        gsrn: ColumnElement,
+        event_timestamp: ColumnElement,
+) -> ColumnElement:
+    """
+    Check whether a row has been deleted by an event not older than it.
+
+    True if the GSRN has a tombstone for the table which is not older
+    than event_timestamp, in which case the row must not be (re)created.
+    Never true for rows without an event_timestamp.
+    """
+    tombstones = DbMeteringPointTombstone.__table__
+
+    return exists().where(and_(
+        tombstones.c.table_name == table.name,
+        tombstones.c.gsrn == gsrn,
+        tombstones.c.event_timestamp >= event_timestamp,
+    ))
+
+
+class WriteCounter(object):
+    """
+    Thread-safe count of rows written and skipped, per table.
+
+    A row is skipped when an upsert leaves an existing row untouched,
+    either because nothing changed (and the event is not newer), or
+    because the row has been changed by a newer event.
+    """
+
+    def __init__(self):
+        self.written = Counter()
+        self.skipped = Counter()
+        self._lock = Lock()
+
+    def add(self, table: str, written: int, skipped: int):
+        """Add number of rows written and skipped for a table."""
+
+        with self._lock:
+            self.written[table] += written
+            self.skipped[table] += skipped
+
 
 class DatabaseController(object):
-    """Controls business logic for SQL database."""
+    """
+    Controls business logic for SQL database.
+
+    :param subject_read_model: Whether to maintain DbSubjectMeteringPoint
+    """
+
+    def __init__(self, subject_read_model: bool = False):
+        self.subject_read_model = subject_read_model
+        self.write_counter = WriteCounter()
 
     # -- MeteringPoints ------------------------------------------------------
 
@@ -45,38 +219,129 @@ class DatabaseController(object):
     ) -> DbMeteringPoint:
         """Get DbMeteringPoint from database, or create a new if not found."""
 
-        meteringpoint = MeteringPointQuery(session) \
+        with self._maintain_statistics(session, DbMeteringPoint.gsrn == gsrn):
+            self._upsert(
+                session=session,
+                model=DbMeteringPoint,
+                rows={gsrn: {'gsrn': gsrn}},
+                index_elements=['gsrn'],
+            )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=[gsrn])
+
+        return MeteringPointQuery(session) \
             .has_gsrn(gsrn) \
-            .one_or_none()
+            .one()
+
+    def set_meteringpoints(
+            self,
+            session: db.Session,
+            meteringpoints: Iterable[MeteringPoint],
+            timestamps: Optional[TTimestamps] = None,
+    ):
+        """
+        Create or update multiple DbMeteringPoints in a single statement.
+
+        Updates type and sector. If the same GSRN occurs more than once,
+        the last occurrence wins. Rows are not updated by events older
+        than the latest event applied to them, including events which
+        deleted them (see _upsert()).
+
+        :param timestamps: Event timestamps mapped by GSRN (optional)
+        """
+        timestamps = timestamps or {}
 
-        if meteringpoint is None:
-            meteringpoint = DbMeteringPoint(gsrn=gsrn)
-            session.add(meteringpoint)
+        rows = {
+            meteringpoint.gsrn: {
+                'gsrn': meteringpoint.gsrn,
+                'type': meteringpoint.type,
+                'sector': meteringpoint.sector,
+                'event_timestamp': timestamps.get(meteringpoint.gsrn),
+            }
+            for meteringpoint in meteringpoints
+        }
 
-        return meteringpoint
+        if not rows:
+            return
+
+        with self._maintain_statistics(
+                session, DbMeteringPoint.gsrn.in_(rows)):
+            self._upsert(
+                session=session,
+                model=DbMeteringPoint,
+                rows=rows,
+                index_elements=['gsrn'],
+                skip_deleted=True,
+            )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=rows)
 
     def delete_meteringpoint(
             self,
             session: db.Session,
             gsrn: str,
+            timestamp: Optional[datetime] = None,
     ):
         """Delete a DbMeteringPoint and all of its associated data."""
 
-        MeteringPointQuery(session) \
-            .has_gsrn(gsrn) \
-            .delete()
+        self.delete_meteringpoints(
+            session=session,
+            gsrn=[gsrn],
+            timestamps={gsrn: timestamp},
+        )
 
-        MeteringPointAddressQuery(session) \
-            .has_gsrn(gsrn) \
-            .delete()
+    def delete_meteringpoints(
+            self,
+            session: db.Session,
+            gsrn: List[str],
+            timestamps: Optional[TTimestamps] = None,
+    ):
+        """
+        Delete DbMeteringPoints and all of their associated data.
 
-        MeteringPointTechnologyQuery(session) \
-            .has_gsrn(gsrn) \
-            .delete()
+        Issues a single statement, where deletes of the associated
+        addresses, technologies and delegates are chained as CTEs.
+        Instances of the deleted rows are removed from the session.
 
-        DelegateQuery(session) \
-            .has_gsrn(gsrn) \
-            .delete()
+        For GSRNs with a timestamp, tombstones are kept for the
+        MeteringPoints, addresses and technologies, so older events
+        received later can not recreate them (see _add_tombstones()).
+
+        :param timestamps: Event timestamps mapped by GSRN (optional)
+        """
+        timestamps = timestamps or {}
+
+        if not gsrn:
+            return
+
+        statement = delete(DbMeteringPoint.__table__) \
+            .where(DbMeteringPoint.gsrn.in_(gsrn))
+
+        for model in METERINGPOINT_DATA_MODELS:
+            statement = statement.add_cte(
+                delete(model.__table__)
+                .where(model.gsrn.in_(gsrn))
+                .cte(f'deleted_{model.__tablename__}')
+            )
+
+        with self._maintain_statistics(
+                session, DbMeteringPoint.gsrn.in_(gsrn)):
+            session.execute(statement)
+
+        self._add_tombstones(
+            session=session,
+            tables=[model.__table__ for model in TOMBSTONED_MODELS],
+            timestamps={g: timestamps[g] for g in gsrn if timestamps.get(g)},
+        )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=gsrn)
+
+        deleted = set(gsrn)
+        models = (DbMeteringPoint,) + METERINGPOINT_DATA_MODELS
+
+        for instance in list(session.identity_map.values()):
+            if isinstance(instance, models) and instance.gsrn in deleted:
+                session.expunge(instance)
 
     # -- MeteringPoint Addresses ---------------------------------------------
 
@@ -85,41 +350,97 @@ class DatabaseController(object):
             session: db.Session,
             gsrn: str,
             address: TAddress,
+            timestamp: Optional[datetime] = None,
     ):
         """Create or update address for a DbMeteringPoint."""
 
-        meteringpoint_address = MeteringPointAddressQuery(session) \
-            .has_gsrn(gsrn) \
-            .one_or_none()
-
-        if meteringpoint_address is None:
-            meteringpoint_address = DbMeteringPointAddress(gsrn=gsrn)
-            session.add(meteringpoint_address)
-
-        meteringpoint_address.street_code = address.street_code
-        meteringpoint_address.street_name = address.street_name
-        meteringpoint_address.building_number = address.building_number
-        meteringpoint_address.floor_id = address.floor_id
-        meteringpoint_address.room_id = address.room_id
-        meteringpoint_address.post_code = address.post_code
-        meteringpoint_address.city_name = address.city_name
-        meteringpoint_address.city_sub_division_name = \
-            address.city_sub_division_name
-        meteringpoint_address.municipality_code = \
-            address.municipality_code
-        meteringpoint_address.location_description = \
-            address.location_description
+        self.set_meteringpoint_addresses(
+            session=session,
+            addresses=[(gsrn, address)],
+            timestamps={gsrn: timestamp},
+        )
+
+    def set_meteringpoint_addresses(
+            self,
+            session: db.Session,
+            addresses: Iterable[Tuple[str, TAddress]],
+            timestamps: Optional[TTimestamps] = None,
+    ):
+        """
+        Create or update multiple addresses in a single statement.
+
+        Takes (gsrn, address) pairs. If the same GSRN occurs more than
+        once, the last occurrence wins. Rows are not updated by events
+        older than the latest event applied to them, including events
+        which deleted them (see _upsert()).
+
+        :param timestamps: Event timestamps mapped by GSRN (optional)
+        """
+        timestamps = timestamps or {}
+
+        rows = {
+            gsrn: dict(
+                gsrn=gsrn,
+                event_timestamp=timestamps.get(gsrn),
+                **{f: getattr(address, f) for f in ADDRESS_FIELDS},
+            )
+            for gsrn, address in addresses
+        }
+
+        self._upsert(
+            session=session,
+            model=DbMeteringPointAddress,
+            rows=rows,
+            index_elements=['gsrn'],
+            skip_deleted=True,
+        )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=rows)
 
     def delete_meteringpoint_address(
             self,
             session: db.Session,
             gsrn: str,
+            timestamp: Optional[datetime] = None,
     ):
         """TODO."""
 
-        MeteringPointAddressQuery(session) \
-            .has_gsrn(gsrn) \
-            .delete()
+        if timestamp is None:
+            MeteringPointAddressQuery(session) \
+                .has_gsrn(gsrn) \
+                .delete()
+
+            self.refresh_subject_meteringpoints(session=session, gsrn=[gsrn])
+        else:
+            self.delete_meteringpoint_addresses(
+                session=session,
+                gsrn=[gsrn],
+                timestamps={gsrn: timestamp},
+            )
+
+    def delete_meteringpoint_addresses(
+            self,
+            session: db.Session,
+            gsrn: List[str],
+            timestamps: Optional[TTimestamps] = None,
+    ):
+        """
+        Delete addresses for any of the provided GSRNs.
+
+        Addresses are not deleted by events older than the latest event
+        applied to them (see _delete_versioned()).
+
+        :param timestamps: Event timestamps mapped by GSRN (optional)
+        """
+
+        self._delete_versioned(
+            session=session,
+            model=DbMeteringPointAddress,
+            gsrn=gsrn,
+            timestamps=timestamps or {},
+        )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=gsrn)
 
     # -- MeteringPoint Delegates ---------------------------------------------
 
@@ -131,16 +452,39 @@ class DatabaseController(object):
     ):
         """Grant subject access to DbMeteringPoint with gsrn."""
 
-        exists = DelegateQuery(session) \
-            .has_gsrn(gsrn) \
-            .has_subject(subject) \
-            .exists()
+        self.grant_meteringpoint_delegates(
+            session=session,
+            delegates=[(gsrn, subject)],
+        )
 
-        if not exists:
-            session.add(DbMeteringPointDelegate(
-                gsrn=gsrn,
-                subject=subject,
-            ))
+    def grant_meteringpoint_delegates(
+            self,
+            session: db.Session,
+            delegates: Iterable[Tuple[str, str]],
+    ):
+        """
+        Grant multiple delegates in a single statement.
+
+        Takes (gsrn, subject) pairs. Delegates which already exist
+        are left untouched.
+        """
+
+        rows = {
+            (gsrn, subject): {'gsrn': gsrn, 'subject': subject}
+            for gsrn, subject in delegates
+        }
+
+        self._upsert(
+            session=session,
+            model=DbMeteringPointDelegate,
+            rows=rows,
+            index_elements=['gsrn', 'subject'],
+        )
+
+        self.refresh_subject_meteringpoints(
+            session=session,
+            gsrn={gsrn for gsrn, _ in rows},
+        )
 
     def revoke_meteringpoint_delegate(
             self,
@@ -155,6 +499,8 @@ class DatabaseController(object):
             .has_subject(subject) \
             .delete()
 
+        self.refresh_subject_meteringpoints(session=session, gsrn=[gsrn])
+
     # -- MeteringPoint Technologies ------------------------------------------
 
     def set_meteringpoint_technology(
@@ -162,30 +508,110 @@ class DatabaseController(object):
             session: db.Session,
             gsrn: str,
             technology: TTechnology,
+            timestamp: Optional[datetime] = None,
     ):
-        """TODO."""
+        """Create or update technology codes for a DbMeteringPoint."""
 
-        meteringpoint_technology = MeteringPointTechnologyQuery(session) \
-            .has_gsrn(gsrn) \
-            .one_or_none()
+        self.set_meteringpoint_technologies(
+            session=session,
+            technologies=[(gsrn, technology)],
+            timestamps={gsrn: timestamp},
+        )
+
+    def set_meteringpoint_technologies(
+            self,
+            session: db.Session,
+            technologies: Iterable[Tuple[str, TTechnology]],
+            timestamps: Optional[TTimestamps] = None,
+    ):
+        """
+        Create or update multiple technology codes in a single statement.
+
+        Takes (gsrn, technology) pairs. If the same GSRN occurs more than
+        once, the last occurrence wins. Rows are not updated by events
+        older than the latest event applied to them, including events
+        which deleted them (see _upsert()).
 
-        if meteringpoint_technology is None:
-            meteringpoint_technology = DbMeteringPointTechnology(gsrn=gsrn)
-            session.add(meteringpoint_technology)
+        :param timestamps: Event timestamps mapped by GSRN (optional)
+        """
+        timestamps = timestamps or {}
 
-        meteringpoint_technology.tech_code = technology.tech_code
-        meteringpoint_technology.fuel_code = technology.fuel_code
+        rows = {
+            gsrn: {
+                'gsrn': gsrn,
+                'tech_code': technology.tech_code,
+                'fuel_code': technology.fuel_code,
+                'event_timestamp': timestamps.get(gsrn),
+            }
+            for gsrn, technology in technologies
+        }
+
+        if not rows:
+            return
+
+        with self._maintain_statistics(
+                session, DbMeteringPoint.gsrn.in_(rows)):
+            self._upsert(
+                session=session,
+                model=DbMeteringPointTechnology,
+                rows=rows,
+                index_elements=['gsrn'],
+                skip_deleted=True,
+            )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=rows)
 
     def delete_meteringpoint_technology(
             self,
             session: db.Session,
             gsrn: str,
+            timestamp: Optional[datetime] = None,
     ):
         """TODO."""
 
-        MeteringPointTechnologyQuery(session) \
-            .has_gsrn(gsrn) \
-            .delete()
+        if timestamp is None:
+            with self._maintain_statistics(
+                    session, DbMeteringPoint.gsrn == gsrn):
+                MeteringPointTechnologyQuery(session) \
+                    .has_gsrn(gsrn) \
+                    .delete()
+
+            self.refresh_subject_meteringpoints(session=session, gsrn=[gsrn])
+        else:
+            self.delete_meteringpoint_technologies(
+                session=session,
+                gsrn=[gsrn],
+                timestamps={gsrn: timestamp},
+            )
+
+    def delete_meteringpoint_technologies(
+            self,
+            session: db.Session,
+            gsrn: List[str],
+            timestamps: Optional[TTimestamps] = None,
+    ):
+        """
+        Delete technology codes for any of the provided GSRNs.
+
+        Technology codes are not deleted by events older than the latest
+        event applied to them (see _delete_versioned()).
+
+        :param timestamps: Event timestamps mapped by GSRN (optional)
+        """
+
+        if not gsrn:
+            return
+
+        with self._maintain_statistics(
+                session, DbMeteringPoint.gsrn.in_(gsrn)):
+            self._delete_versioned(
+                session=session,
+                model=DbMeteringPointTechnology,
+                gsrn=gsrn,
+                timestamps=timestamps or {},
+            )
+
+        self.refresh_subject_meteringpoints(session=session, gsrn=gsrn)
 
     # -- Technologies --------------------------------------------------------
 
@@ -195,18 +621,50 @@ class DatabaseController(object):
             tech_code: str,
             fuel_code: str,
     ) -> DbTechnology:
-        """TODO."""
+        """Get DbTechnology from database, or create a new if not found."""
 
-        technology = TechnologyQuery(session) \
+        self._upsert(
+            session=session,
+            model=DbTechnology,
+            rows={
+                (tech_code, fuel_code): {
+                    'tech_code': tech_code,
+                    'fuel_code': fuel_code,
+                },
+            },
+            index_elements=['tech_code', 'fuel_code'],
+        )
+
+        return TechnologyQuery(session) \
             .has_tech_code(tech_code) \
             .has_fuel_code(fuel_code) \
-            .one_or_none()
+            .one()
+
+    def set_technologies(
+            self,
+            session: db.Session,
+            technologies: Iterable[Technology],
+    ):
+        """
+        Create or update multiple DbTechnologies in a single statement.
 
-        if technology is None:
-            technology = DbTechnology(tech_code=tech_code, fuel_code=fuel_code)
-            session.add(technology)
+        If the same codes occur more than once, the last occurrence wins.
+        """
+        rows = {
+            (technology.tech_code, technology.fuel_code): {
+                'tech_code': technology.tech_code,
+                'fuel_code': technology.fuel_code,
+                'type': technology.type,
+            }
+            for technology in technologies
+        }
 
-        return technology
+        self._upsert(
+            session=session,
+            model=DbTechnology,
+            rows=rows,
+            index_elements=['tech_code', 'fuel_code'],
+        )
 
     def delete_technology(
             self,
@@ -221,8 +679,415 @@ class DatabaseController(object):
             .has_fuel_code(fuel_code) \
             .delete()
 
+    # -- Subject read model --------------------------------------------------
+
+    def refresh_subject_meteringpoints(
+            self,
+            session: db.Session,
+            gsrn: Collection[str],
+    ):
+        """
+        Update DbSubjectMeteringPoints for MeteringPoints with any of gsrn.
+
+        Copies the MeteringPoints, with their addresses and technology
+        codes, for each of their delegates, and deletes rows for
+        delegates (or MeteringPoints) which no longer exist. Rows which
+        have not changed are left untouched. Does nothing unless the
+        subject read model is enabled.
+        """
+        if not self.subject_read_model or not gsrn:
+            return
+
+        gsrn = list(gsrn)
+        table = DbSubjectMeteringPoint.__table__
+        columns, accessible = self._select_subject_meteringpoints(
+            DbMeteringPointDelegate.gsrn.in_(gsrn))
+
+        session.execute(
+            delete(table)
+            .where(table.c.gsrn.in_(gsrn))
+            .where(tuple_(table.c.subject, table.c.gsrn).not_in(
+                accessible.with_only_columns(
+                    DbMeteringPointDelegate.subject,
+                    DbMeteringPointDelegate.gsrn,
+                )
+            ))
+        )
+
+        session.execute(on_conflict_update_changed(
+            statement=insert(table).from_select(columns, accessible),
+            table=table,
+            columns=columns,
+            index_elements=['subject', 'gsrn'],
+        ))
+
+    def rebuild_subject_meteringpoints(self, session: db.Session):
+        """Rebuild all DbSubjectMeteringPoints from scratch."""
+
+        if not self.subject_read_model:
+            return
+
+        table = DbSubjectMeteringPoint.__table__
+        columns, accessible = self._select_subject_meteringpoints()
+
+        session.execute(delete(table))
+        session.execute(insert(table).from_select(columns, accessible))
+
+    def _select_subject_meteringpoints(
+            self,
+            condition: Optional[ColumnElement] = None,
+    ) -> Tuple[List[str], Select]:
+        """
+        Select rows for DbSubjectMeteringPoint from the actual tables.
+
+        :returns: Tuple of (column names, select statement)
+        """
+        columns = {
+            'subject': DbMeteringPointDelegate.subject,
+            'gsrn': DbMeteringPoint.gsrn,
+            'sector': DbMeteringPoint.sector,
+            'type': DbMeteringPoint.type,
+            **{f: getattr(DbMeteringPointAddress, f) for f in ADDRESS_FIELDS},
+            'tech_code': DbMeteringPointTechnology.tech_code,
+            'fuel_code': DbMeteringPointTechnology.fuel_code,
+        }
+
+        statement = select(*columns.values()) \
+            .select_from(DbMeteringPointDelegate) \
+            .join(
+                DbMeteringPoint,
+                DbMeteringPoint.gsrn == DbMeteringPointDelegate.gsrn) \
+            .outerjoin(
+                DbMeteringPointAddress,
+                DbMeteringPointAddress.gsrn == DbMeteringPoint.gsrn) \
+            .outerjoin(
+                DbMeteringPointTechnology,
+                DbMeteringPointTechnology.gsrn == DbMeteringPoint.gsrn)
+
+        if condition is not None:
+            statement = statement.where(condition)
+
+        return list(columns), statement
+
+    # -- Statistics ----------------------------------------------------------
+
+    def count_meteringpoints_by_group(
+            self,
+            session: db.Session,
+            condition: Optional[ColumnElement] = None,
+    ) -> Dict[TStatisticsKey, int]:
+        """
+        Count MeteringPoints per group in meteringpoint_statistics.
+
+        Counts all MeteringPoints, or only those matching condition,
+        which may refer to DbMeteringPoint and DbMeteringPointTechnology.
+        Counts are computed from the actual tables.
+        """
+        groups = (
+            DbMeteringPoint.sector,
+            DbMeteringPoint.type,
+            DbMeteringPointTechnology.tech_code,
+            DbMeteringPointTechnology.fuel_code,
+        )
+
+        query = session.query(*groups, func.count()) \
+            .select_from(DbMeteringPoint) \
+            .outerjoin(
+                DbMeteringPointTechnology,
+                DbMeteringPointTechnology.gsrn == DbMeteringPoint.gsrn) \
+            .group_by(*groups)
+
+        if condition is not None:
+            query = query.filter(condition)
+
+        counts = Counter()
+
+        for sector, type, tech_code, fuel_code, count in query:
+            key = (
+                sector or '',
+                type.name if type else '',
+                tech_code or '',
+                fuel_code or '',
+            )
+            counts[key] += count
+
+        return counts
+
+    def rebuild_statistics(self, session: db.Session):
+        """Recount meteringpoint_statistics from scratch."""
+
+        session.execute(delete(DbMeteringPointStatistics.__table__))
+
+        self._add_statistics(
+            session=session,
+            deltas=self.count_meteringpoints_by_group(session),
+        )
+
+    @contextmanager
+    def _maintain_statistics(
+            self,
+            session: db.Session,
+            condition: ColumnElement,
+    ):
+        """
+        Update meteringpoint_statistics with changes made within the block.
+
+        MeteringPoints matching condition are counted per group before
+        and after the block, and the differences are added to the
+        statistics, so only the affected MeteringPoints are counted.
+        Condition must match the same MeteringPoints before and after
+        (ie. by GSRN).
+
+        Groups only depend on the rows of the MeteringPoints themselves,
+        which are changed by one worker at a time (messages are
+        partitioned by GSRN), so concurrent transactions can not change
+        the counted rows between counting before and after.
+        """
+        before = self.count_meteringpoints_by_group(session, condition)
+
+        yield
+
+        after = self.count_meteringpoints_by_group(session, condition)
+
+        self._add_statistics(
+            session=session,
+            deltas={
+                key: after[key] - before[key]
+                for key in before.keys() | after.keys()
+            },
+        )
+
+    def _add_statistics(
+            self,
+            session: db.Session,
+            deltas: Dict[TStatisticsKey, int],
+    ):
+        """
+        Add to the counts of groups in meteringpoint_statistics.
+
+        Issues a single INSERT ... ON CONFLICT statement. Deltas are
+        added to the slot of the current database connection, so
+        concurrent transactions (on other connections) mostly update
+        different rows instead of waiting for each other. Groups are
+        updated in a consistent order to avoid deadlocks between
+        concurrent transactions using the same slot.
+        """
+        table = DbMeteringPointStatistics.__table__
+        slot = func.pg_backend_pid() % STATISTICS_SLOTS
+
+        rows = [
+            {
+                'sector': sector,
+                'type': type,
+                'tech_code': tech_code,
+                'fuel_code': fuel_code,
+                'slot': slot,
+                'count': delta,
+            }
+            for (sector, type, tech_code, fuel_code), delta
+            in sorted(deltas.items())
+            if delta
+        ]
+
+        if not rows:
+            return
+
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                'sector', 'type', 'tech_code', 'fuel_code', 'slot'],
+            set_={'count': table.c.count + statement.excluded.count},
+        )
+
+        session.execute(statement)
+
+    # -- Helpers -------------------------------------------------------------
+
+    def _upsert(
+            self,
+            session: db.Session,
+            model: Type[db.ModelBase],
+            rows: Dict[Any, Dict[str, Any]],
+            index_elements: List[str],
+            skip_deleted: bool = False,
+    ):
+        """
+        Insert rows, or update them if they already exist and changed.
+
+        Issues a single INSERT ... ON CONFLICT statement (see
+        on_conflict_update_changed()). The number of rows written and
+        skipped is added to write_counter.
+
+        If skip_deleted is True, rows are skipped if their GSRN has a
+        tombstone for the table which is not older than the row's
+        event_timestamp (see _delete_versioned()).
+
+        Rows are mapped by their primary key, and instances of the same
+        rows already loaded into the session are expired afterwards,
+        so they are refreshed the next time they are accessed.
+        """
+
+        if not rows:
+            return
+
+        table = model.__table__
+        data = list(rows.values())
+
+        if skip_deleted:
+            statement = insert(table).from_select(
+                names=list(data[0].keys()),
+                select=self._select_not_deleted(table, data),
+            )
+        else:
+            statement = insert(table).values(data)
+
+        statement = on_conflict_update_changed(
+            statement=statement,
+            table=table,
+            columns=data[0].keys(),
+            index_elements=index_elements,
+        )
+
+        result = session.execute(statement)
+
+        self.write_counter.add(
+            table=table.name,
+            written=result.rowcount,
+            skipped=len(data) - result.rowcount,
+        )
+
+        for key in rows:
+            instance = session.identity_map.get(identity_key(model, key))
+            if instance is not None:
+                session.expire(instance)
+
+    def _delete_versioned(
+            self,
+            session: db.Session,
+            model: Type[db.ModelBase],
+            gsrn: List[str],
+            timestamps: TTimestamps,
+    ):
+        """
+        Delete rows for any of the provided GSRNs in a single statement.
+
+        Rows are only deleted if their event_timestamp is not newer
+        than the timestamp of the GSRN. GSRNs without a timestamp are
+        always deleted. Instances of the rows are removed from the session.
+
+        A tombstone is kept with the latest timestamp each GSRN has been
+        deleted at, so older events, which are received later, can not
+        recreate the rows (see _upsert()).
+        """
+
+        if not gsrn:
+            return
+
+        table = model.__table__
+
+        events = values(
+            column('gsrn', String),
+            column('event_timestamp', DateTime(timezone=True)),
+            name='events',
+        ).data([(g, timestamps.get(g)) for g in gsrn])
+
+        event_timestamp = cast(
+            events.c.event_timestamp, DateTime(timezone=True))
+
+        statement = delete(table) \
+            .where(table.c.gsrn == events.c.gsrn) \
+            .where(or_(
+                event_timestamp.is_(None),
+                table.c.event_timestamp.is_(None),
+                table.c.event_timestamp <= event_timestamp,
+            ))
+
+        session.execute(statement)
+
+        self._add_tombstones(
+            session=session,
+            tables=[table],
+            timestamps={g: timestamps[g] for g in gsrn if timestamps.get(g)},
+        )
+
+        for g in gsrn:
+            instance = session.identity_map.get(identity_key(model, g))
+            if instance is not None:
+                session.expunge(instance)
+
+    def _add_tombstones(
+            self,
+            session: db.Session,
+            tables: List[Table],
+            timestamps: TTimestamps,
+    ):
+        """
+        Keep the timestamps GSRNs were deleted from tables at.
+
+        Issues a single statement. Existing tombstones are only updated
+        to newer timestamps (see is_deleted()).
+        """
+
+        if not timestamps:
+            return
+
+        tombstones = DbMeteringPointTombstone.__table__
+
+        statement = insert(tombstones).values([
+            {
+                'table_name': table_name,
+                'gsrn': gsrn,
+                'event_timestamp': timestamp,
+            }
+            for table_name in sorted(table.name for table in tables)
+            for gsrn, timestamp in sorted(timestamps.items())
+        ])
+
+        excluded = statement.excluded
+
+        statement = statement.on_conflict_do_update(
+            index_elements=['table_name', 'gsrn'],
+            set_={'event_timestamp': excluded.event_timestamp},
+            where=tombstones.c.event_timestamp < excluded.event_timestamp,
+        )
+
+        session.execute(statement)
+
+    def _select_not_deleted(
+            self,
+            table: Table,
+            data: List[Dict[str, Any]],
+    ) -> Select:
+        """
+        Select rows, except those deleted by an event not older than them.
+
+        Rows without an event_timestamp are always selected.
+        """
+        names = list(data[0].keys())
+
+        rows = values(
+            *(column(name, table.c[name].type) for name in names),
+            name='rows',
+        ).data([tuple(row[name] for name in names) for row in data])
+
+        # Columns of NULLs only are otherwise typed as text
+        columns = {
+            name: cast(rows.c[name], table.c[name].type)
+            for name in names
+        }
+
+        deleted = is_deleted(
+            table=table,
+            gsrn=columns['gsrn'],
+            event_timestamp=columns['event_timestamp'],
+        )
+
+        return select(*columns.values()).where(~deleted)
+
 
 # -- Singletons --------------------------------------------------------------
 
 
-controller = DatabaseController()
+controller = DatabaseController(
+    subject_read_model=SUBJECT_READ_MODEL_ENABLED,
+)
@@ -1,9 +1,570 @@
+import logging
+from time import monotonic, perf_counter
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock, local
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from sqlalchemy import engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
 from origin.sql import SqlEngine
 
-from .config import SQL_URI, SQL_POOL_SIZE
+from .config import (
+    SQL_URI,
+    SQL_POOL_SIZE,
+    SQL_MAX_OVERFLOW,
+    SQL_POOL_TIMEOUT,
+    SQL_POOL_PRE_PING,
+    SQL_POOL_RECYCLE,
+    SQL_API_POOL_SIZE,
+    SQL_API_MAX_OVERFLOW,
+    SQL_CONSUMER_POOL_SIZE,
+    SQL_CONSUMER_MAX_OVERFLOW,
+    SQL_REPLICA_URI,
+    SQL_REPLICA_MAX_LAG,
+    SQL_REPLICA_LAG_CHECK_INTERVAL,
+    SQL_PROFILING_ENABLED,
+    SQL_SLOW_STATEMENT_THRESHOLD,
+    SQL_REPEATED_STATEMENT_THRESHOLD,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Logs profiles of SQL statements (see SqlProfiler)
+profiler_logger = logging.getLogger(f'{__name__}.profiler')
+
+
+@dataclass
+class PoolProfile:
+    """Connection pool settings for a type of process."""
+
+    # Number of connections to keep open
+    size: int
+
+    # Number of connections to open beyond size under load
+    max_overflow: int
+
+    # Max time (in seconds) to wait for a connection
+    timeout: float
+
+    # Whether to test connections for liveness before using them
+    pre_ping: bool
+
+    # Recycle connections after this number of seconds (-1 never)
+    recycle: int
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of connection pool statistics."""
+
+    # Configured number of connections to keep open
+    size: int
+
+    # Number of idle connections in the pool
+    checked_in: int
+
+    # Number of connections currently in use
+    checked_out: int
+
+    # Number of connections currently open beyond size
+    overflow: int
+
+    # Total number of connections checked out of the pool
+    checkouts: int
+
+    # Total time (in seconds) spent waiting for connections
+    wait_time: float
+
+    # Longest time (in seconds) spent waiting for a single connection
+    wait_time_max: float
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool which keeps count of checkouts and time spent waiting."""
+
+    def __init__(self, *args, **kwargs):
+        super(TimedQueuePool, self).__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.wait_time_max = 0.0
+        self._stats_lock = Lock()
+
+    def _do_get(self):
+        """Check out a connection, measuring the time it takes."""
+
+        started = monotonic()
+
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        finally:
+            elapsed = monotonic() - started
+
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time += elapsed
+                self.wait_time_max = max(self.wait_time_max, elapsed)
+
+
+class StatementCounter(object):
+    """
+    Counts SQL statements executed by each thread, on any Engine.
+
+    Only counts once started, so processes which do not need it do
+    not spend time on it. Statements are counted when sent to the
+    database, so ORM changes are counted when flushed.
+    """
+
+    def __init__(self):
+        self._local = local()
+
+    @property
+    def count(self) -> int:
+        """Return number of statements executed by the current thread."""
+
+        return getattr(self._local, 'count', 0)
+
+    def start(self):
+        """Start counting statements (if not already counting)."""
+
+        if not event.contains(
+                engine.Engine, 'before_cursor_execute', self._on_execute):
+            event.listen(
+                engine.Engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        """Count a statement executed by the current thread."""
+
+        self._local.count = self.count + 1
+
+
+@dataclass
+class SqlProfile:
+    """Statements executed within a unit of work (request or message)."""
+
+    # Name of the unit of work, for instance 'GET /details'
+    name: str
+
+    # Number of statements executed
+    statements: int = 0
+
+    # Time (in seconds) spent executing statements
+    duration: float = 0.0
+
+    # Number of times each statement was executed
+    executions: Dict[str, int] = field(default_factory=Counter)
+
+    def get_repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Return statements executed at least threshold times."""
+
+        return [
+            (statement, count)
+            for statement, count in self.executions.items()
+            if count >= threshold
+        ]
+
+
+class SqlProfiler(object):
+    """
+    Profiles SQL statements executed by each thread, on any Engine.
+
+    Only profiles once started (see SQL_PROFILING_ENABLED), as timing
+    every statement costs. Statements slower than slow_threshold are
+    logged with their EXPLAIN plan. Statements executed within a unit
+    of work (see begin() and end()) are counted and timed, and logged
+    when the unit of work ends, along with statements executed at
+    least repeat_threshold times, which are likely N+1 queries.
+
+    Units of work can be nested, in which case statements count
+    towards the innermost one only.
+    """
+
+    # Prefixes of statements which can be EXPLAINed
+    EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+    def __init__(self, slow_threshold: float, repeat_threshold: int):
+        self.slow_threshold = slow_threshold
+        self.repeat_threshold = repeat_threshold
+        self.started = False
+        self._local = local()
+
+    @property
+    def _profiles(self) -> List[SqlProfile]:
+        """Units of work in progress in the current thread."""
+
+        if not hasattr(self._local, 'profiles'):
+            self._local.profiles = []
+
+        return self._local.profiles
+
+    def start(self):
+        """Start profiling statements (if not already profiling)."""
+
+        if self.started:
+            return
+
+        # Makes profiles visible, even if logging is not configured
+        if profiler_logger.level == logging.NOTSET:
+            profiler_logger.setLevel(logging.INFO)
+        if not profiler_logger.hasHandlers():
+            profiler_logger.addHandler(logging.StreamHandler())
+
+        event.listen(
+            engine.Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(
+            engine.Engine, 'after_cursor_execute', self._after_execute)
+
+        self.started = True
+
+    def stop(self):
+        """Stop profiling statements."""
+
+        if not self.started:
+            return
+
+        event.remove(
+            engine.Engine, 'before_cursor_execute', self._before_execute)
+        event.remove(
+            engine.Engine, 'after_cursor_execute', self._after_execute)
+
+        self.started = False
+
+    def begin(self, name: str):
+        """Begin a unit of work in the current thread (if profiling)."""
+
+        if self.started:
+            self._profiles.append(SqlProfile(name=name))
+
+    def end(self) -> Optional[SqlProfile]:
+        """
+        End the current unit of work in the current thread, and log it.
+
+        :returns: The profile of the unit of work, or None if none
+        """
+        if not self.started or not self._profiles:
+            return None
+
+        profile = self._profiles.pop()
+
+        profiler_logger.info(
+            'SQL profile of %s: %d statements in %.1f ms',
+            profile.name, profile.statements, profile.duration * 1000)
+
+        for statement, count in profile.get_repeated(self.repeat_threshold):
+            profiler_logger.warning(
+                'Statement executed %d times in %s (N+1 queries?): %s',
+                count, profile.name, statement)
+
+        return profile
 
+    @contextmanager
+    def unit_of_work(self, name: str) -> Iterator[None]:
+        """Profile statements executed within the context as a unit."""
 
-db = SqlEngine(
+        self.begin(name)
+
+        try:
+            yield
+        finally:
+            self.end()
+
+    def explain(
+            self,
+            conn: engine.Connection,
+            statement: str,
+            parameters: Any,
+    ) -> str:
+        """
+        Return the EXPLAIN plan of a statement.
+
+        The plan is queried on the same connection (and transaction) as
+        the statement was executed on, within a SAVEPOINT, so failing
+        to explain it does not abort the transaction.
+        """
+        if not statement.lstrip().upper().startswith(self.EXPLAINABLE):
+            return '(not explainable)'
+
+        cursor = conn.connection.cursor()
+
+        try:
+            cursor.execute('SAVEPOINT explain_statement')
+
+            try:
+                cursor.execute(f'EXPLAIN {statement}', parameters)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            except Exception:
+                cursor.execute('ROLLBACK TO SAVEPOINT explain_statement')
+                raise
+
+            cursor.execute('RELEASE SAVEPOINT explain_statement')
+
+            return plan
+        except Exception as e:
+            return f'(EXPLAIN failed: {e})'
+        finally:
+            cursor.close()
+
+    def _before_execute(self, *args, **kwargs):
+        """Start timing a statement."""
+
+        self._local.started = perf_counter()
+
+    def _after_execute(
+            self,
+            conn: engine.Connection,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool,
+    ):
+        """Record a statement, and log it if slow."""
+
+        # Statement began executing before profiling was started
+        if not hasattr(self._local, 'started'):
+            return
+
+        elapsed = perf_counter() - self._local.started
+        profile = self._profiles[-1] if self._profiles else None
+
+        if profile is not None:
+            profile.statements += 1
+            profile.duration += elapsed
+            profile.executions[statement] += 1
+
+        if elapsed >= self.slow_threshold:
+            profiler_logger.warning(
+                'Slow statement (%.1f ms) in %s: %s\n%s',
+                elapsed * 1000,
+                profile.name if profile is not None else 'no unit of work',
+                statement,
+                '(executemany)' if executemany
+                else self.explain(conn, statement, parameters))
+
+
+class PooledSqlEngine(SqlEngine):
+    """
+    SqlEngine with a configurable, instrumented connection pool.
+
+    The pool is configured by a PoolProfile, which can be replaced
+    (before the engine is used) by processes with different workloads.
+    """
+
+    def __init__(self, uri: str, pool: PoolProfile):
+        super(PooledSqlEngine, self).__init__(uri=uri, pool_size=pool.size)
+        self.pool = pool
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Parameter settings for the Engine instance."""
+
+        return {
+            'echo': False,
+            'poolclass': TimedQueuePool,
+            'pool_size': self.pool.size,
+            'max_overflow': self.pool.max_overflow,
+            'pool_timeout': self.pool.timeout,
+            'pool_pre_ping': self.pool.pre_ping,
+            'pool_recycle': self.pool.recycle,
+        }
+
+    def use_pool(self, pool: PoolProfile):
+        """
+        Use another pool profile.
+
+        Disposes of the current engine (if any), so a new one is created
+        with the new pool settings on next use.
+        """
+        self.pool = pool
+        self.pool_size = pool.size
+
+        if self._engine is not None:
+            self._engine.dispose()
+
+        self._uri = None
+        self._engine = None
+
+    @property
+    def pooled_engine(self) -> engine.Engine:
+        """Engine which connections are pooled by this SqlEngine."""
+
+        return self.engine
+
+    def pool_stats(self) -> PoolStats:
+        """Return a snapshot of statistics for the connection pool."""
+
+        pool: TimedQueuePool = self.pooled_engine.pool
+
+        return PoolStats(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            checkouts=pool.checkouts,
+            wait_time=pool.wait_time,
+            wait_time_max=pool.wait_time_max,
+        )
+
+
+class ReplicaSqlEngine(PooledSqlEngine):
+    """
+    SqlEngine for read-only sessions, preferably on a read replica.
+
+    Falls back to the primary when no replica is configured, when the
+    replica lags more than max_lag seconds behind the primary, or when
+    the lag can not be determined. The lag is checked at most once
+    every check_interval seconds. Sessions are read-only regardless
+    of which database they are bound to.
+    """
+
+    LAG_QUERY = text(
+        'SELECT CASE '
+        'WHEN NOT pg_is_in_recovery() THEN 0 '
+        'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE COALESCE(EXTRACT(EPOCH FROM '
+        'now() - pg_last_xact_replay_timestamp()), 0) '
+        'END'
+    )
+
+    def __init__(
+            self,
+            uri: str,
+            pool: PoolProfile,
+            primary: SqlEngine,
+            max_lag: float,
+            check_interval: float,
+    ):
+        super(ReplicaSqlEngine, self).__init__(uri=uri, pool=pool)
+        self.primary = primary
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._is_fresh = False
+        self._checked_at: Optional[float] = None
+        self._check_lock = Lock()
+
+    @property
+    def replica_engine(self) -> engine.Engine:
+        """Engine connected to the read replica."""
+
+        return super(ReplicaSqlEngine, self).engine
+
+    @property
+    def pooled_engine(self) -> engine.Engine:
+        """Engine connected to the read replica (the primary has its own)."""
+
+        return self.replica_engine
+
+    @property
+    def engine(self) -> engine.Engine:
+        """Read-only Engine for the replica, or the primary if stale."""
+
+        if self.uri and self.is_fresh():
+            target = self.replica_engine
+        else:
+            target = self.primary.engine
+
+        return target.execution_options(postgresql_readonly=True)
+
+    def replica_lag(self) -> float:
+        """Return the replication lag of the replica in seconds."""
+
+        with self.replica_engine.connect() as conn:
+            return float(conn.execute(self.LAG_QUERY).scalar())
+
+    def is_check_due(self) -> bool:
+        """Check whether it is time to check the lag again."""
+
+        return self._checked_at is None \
+            or monotonic() - self._checked_at >= self.check_interval
+
+    def is_fresh(self) -> bool:
+        """
+        Check whether the replica lags at most max_lag seconds behind.
+
+        Only one thread checks the lag at a time. Other threads do not
+        wait for it, but use the result of the previous check.
+        """
+        if self.is_check_due() and self._check_lock.acquire(blocking=False):
+            try:
+                if self.is_check_due():
+                    self._check_lag()
+            finally:
+                self._check_lock.release()
+
+        return self._is_fresh
+
+    def _check_lag(self):
+        """Check the lag of the replica, and whether it is fresh."""
+
+        self._checked_at = monotonic()
+
+        try:
+            lag = self.replica_lag()
+        except SQLAlchemyError:
+            logger.exception('Failed to check replication lag')
+            self._is_fresh = False
+        else:
+            self._is_fresh = lag <= self.max_lag
+
+            if not self._is_fresh:
+                logger.warning(
+                    'Replica lags %.1f seconds behind, '
+                    'reading from primary', lag)
+
+
+# -- Pool profiles -----------------------------------------------------------
+
+
+DEFAULT_POOL = PoolProfile(
+    size=SQL_POOL_SIZE,
+    max_overflow=SQL_MAX_OVERFLOW,
+    timeout=SQL_POOL_TIMEOUT,
+    pre_ping=SQL_POOL_PRE_PING,
+    recycle=SQL_POOL_RECYCLE,
+)
+
+API_POOL = PoolProfile(
+    size=SQL_API_POOL_SIZE,
+    max_overflow=SQL_API_MAX_OVERFLOW,
+    timeout=SQL_POOL_TIMEOUT,
+    pre_ping=SQL_POOL_PRE_PING,
+    recycle=SQL_POOL_RECYCLE,
+)
+
+CONSUMER_POOL = PoolProfile(
+    size=SQL_CONSUMER_POOL_SIZE,
+    max_overflow=SQL_CONSUMER_MAX_OVERFLOW,
+    timeout=SQL_POOL_TIMEOUT,
+    pre_ping=SQL_POOL_PRE_PING,
+    recycle=SQL_POOL_RECYCLE,
+)
+
+
+# -- Singletons --------------------------------------------------------------
+
+
+db = PooledSqlEngine(
     uri=SQL_URI,
-    pool_size=SQL_POOL_SIZE,
+    pool=DEFAULT_POOL,
+)
+
+read_db = ReplicaSqlEngine(
+    uri=SQL_REPLICA_URI,
+    pool=API_POOL,
+    primary=db,
+    max_lag=SQL_REPLICA_MAX_LAG,
+    check_interval=SQL_REPLICA_LAG_CHECK_INTERVAL,
 )
+
+statement_counter = StatementCounter()
+
+sql_profiler = SqlProfiler(
+    slow_threshold=SQL_SLOW_STATEMENT_THRESHOLD,
+    repeat_threshold=SQL_REPEATED_STATEMENT_THRESHOLD,
+)
+
+if SQL_PROFILING_ENABLED:
+    sql_profiler.start()
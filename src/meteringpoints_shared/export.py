@@ -0,0 +1,226 @@
+"""
+Exports MeteringPoints from the database.
+
+Usage:
+
+    python -m meteringpoints_shared.export [--format ndjson|csv]
+
+Writes all MeteringPoints (optionally filtered) with their addresses
+and technologies, ordered by GSRN, to a file (or stdout). MeteringPoints
+are fetched from the database in batches using a server-side cursor,
+and written one at a time, so memory usage does not depend on the
+number of MeteringPoints exported.
+
+NDJSON exports contain one MeteringPoint per line, serialized the same
+way as by the API. CSV exports have the same columns as CSV snapshots
+(see meteringpoints_consumer.snapshot), except for subjects.
+"""
+import io
+import sys
+import csv
+import argparse
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional
+
+from origin.serialize import json_serializer
+from origin.models.meteringpoints import MeteringPoint, MeteringPointType
+
+from .db import db, read_db
+from .queries import MeteringPointQuery, TechnologyQuery
+from .technologies import technology_catalogue
+from .controller import ADDRESS_FIELDS
+from .config import EXPORT_BATCH_SIZE
+from .models import MeteringPointFilters, DbMeteringPoint
+
+
+class ExportFormat(Enum):
+    """Formats MeteringPoints can be exported in."""
+
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+# Columns of CSV exports
+CSV_COLUMNS = (
+    'gsrn',
+    'type',
+    'sector',
+    *ADDRESS_FIELDS,
+    'tech_code',
+    'fuel_code',
+)
+
+# MIME types of exports, mapped by format
+MIME_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+def iter_meteringpoints(
+        session: db.Session,
+        filters: Optional[MeteringPointFilters] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[DbMeteringPoint]:
+    """
+    Iterate all MeteringPoints, optionally filtered, ordered by GSRN.
+
+    Results are streamed from the database (using a server-side cursor)
+    batch_size rows at a time, instead of loading all of them at once.
+    """
+    query = MeteringPointQuery(session)
+
+    if filters is not None:
+        query = query.apply_filters(filters)
+
+    return iter(
+        query.order_by(DbMeteringPoint.gsrn)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+
+def iter_ndjson(meteringpoints: Iterable[DbMeteringPoint]) -> Iterator[str]:
+    """Format MeteringPoints as NDJSON, yielding one line at a time."""
+
+    for meteringpoint in meteringpoints:
+        data = json_serializer.serialize(meteringpoint, schema=MeteringPoint)
+        yield data.decode() + '\n'
+
+
+def iter_csv(meteringpoints: Iterable[DbMeteringPoint]) -> Iterator[str]:
+    """Format MeteringPoints as CSV, yielding one line at a time."""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def _line(row: Iterable[Optional[str]]) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    yield _line(CSV_COLUMNS)
+
+    for meteringpoint in meteringpoints:
+        address = meteringpoint.address
+        technology = meteringpoint.technology_codes
+
+        yield _line((
+            meteringpoint.gsrn,
+            meteringpoint.type.value if meteringpoint.type else None,
+            meteringpoint.sector,
+            *(getattr(address, f, None) for f in ADDRESS_FIELDS),
+            getattr(technology, 'tech_code', None),
+            getattr(technology, 'fuel_code', None),
+        ))
+
+
+FORMATTERS = {
+    ExportFormat.NDJSON: iter_ndjson,
+    ExportFormat.CSV: iter_csv,
+}
+
+
+def export_meteringpoints(
+        session: db.Session,
+        format: ExportFormat,
+        filters: Optional[MeteringPointFilters] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[str]:
+    """
+    Export MeteringPoints, optionally filtered, in the provided format.
+
+    Yields the export in chunks (lines) as they are fetched from the
+    database, so the session must stay open until fully consumed.
+
+    Technologies of MeteringPoints are resolved from the technology
+    catalogue, which is (re)loaded using session first if stale, as
+    exports also run outside of the API (see main()).
+    """
+    technology_catalogue.refresh(lambda: TechnologyQuery(session).all())
+
+    return FORMATTERS[format](iter_meteringpoints(
+        session=session,
+        filters=filters,
+        batch_size=batch_size,
+    ))
+
+
+# -- Command line ------------------------------------------------------------
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    """Parse command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog='python -m meteringpoints_shared.export',
+        description='Export MeteringPoints.',
+    )
+
+    parser.add_argument(
+        '--format',
+        type=ExportFormat,
+        choices=list(ExportFormat),
+        default=ExportFormat.NDJSON,
+        help='Export format (default: ndjson)',
+    )
+    parser.add_argument(
+        '--output',
+        default='-',
+        help="Path to write export to, or '-' for stdout (default)",
+    )
+    parser.add_argument(
+        '--gsrn',
+        action='append',
+        help='Only export MeteringPoints with this GSRN (repeatable)',
+    )
+    parser.add_argument(
+        '--type',
+        type=MeteringPointType,
+        choices=list(MeteringPointType),
+        help='Only export MeteringPoints of this type',
+    )
+    parser.add_argument(
+        '--sector',
+        action='append',
+        help='Only export MeteringPoints in this sector (repeatable)',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=EXPORT_BATCH_SIZE,
+        help='Number of MeteringPoints to fetch at a time '
+             f'(default: {EXPORT_BATCH_SIZE})',
+    )
+
+    return parser.parse_args(args)
+
+
+def main(args: List[str]):
+    """Export MeteringPoints from the read replica (if configured)."""
+
+    args = parse_args(args)
+
+    filters = MeteringPointFilters(
+        gsrn=args.gsrn,
+        type=args.type,
+        sector=args.sector,
+    )
+
+    if args.output == '-':
+        stream = sys.stdout
+    else:
+        stream = open(args.output, 'w', newline='', encoding='utf-8')
+
+    with stream, read_db.make_session() as session:
+        stream.writelines(export_meteringpoints(
+            session=session,
+            format=args.format,
+            filters=filters,
+            batch_size=args.batch_size,
+        ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,313 @@
+"""
+Prometheus metrics shared by the API and the consumer.
+
+Metrics are registered in the default registry of prometheus_client.
+When running multiple processes (PROMETHEUS_MULTIPROC_DIR is set),
+prometheus_client shares counters, gauges and histograms between them
+through files in that directory, and generate_metrics() aggregates
+them. Statistics which are only known by the process itself (like
+its connection pools) are written to those files too, when calling
+write_process_metrics(), and are summed across processes.
+"""
+from threading import Lock
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Tuple, Type, Union
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    generate_latest,
+)
+from prometheus_client.core import (
+    Metric,
+    GaugeMetricFamily,
+    CounterMetricFamily,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from .db import PooledSqlEngine, db, read_db
+from .cache import TTLCache
+from .config import PROMETHEUS_MULTIPROC_DIR
+
+
+class ProcessCollector(ABC):
+    """
+    Collects statistics which are only known by the current process.
+
+    Statistics are read when collected (scraped), so they cost nothing
+    in between. Gauges are summed across processes, unless another
+    mode is specified in multiprocess_modes (by metric name).
+    """
+
+    # Multiprocess mode of gauges (see prometheus_client.Gauge)
+    multiprocess_modes: Dict[str, str] = {}
+
+    def describe(self) -> List[Metric]:
+        """Describe no metrics, so they are not collected when registered."""
+
+        return []
+
+    def collect(self) -> Iterator[Metric]:
+        """Collect metrics."""
+
+        yield from self.collect_metrics()
+
+    @abstractmethod
+    def collect_metrics(self) -> Iterable[Metric]:
+        """Collect metrics."""
+
+
+class PoolCollector(ProcessCollector):
+    """
+    Collects statistics of database connection pools.
+
+    The read replica is only included if one is configured, otherwise
+    read-only sessions use the primary pool.
+    """
+
+    multiprocess_modes = {
+        'meteringpoints_db_pool_wait_seconds_max': 'max',
+    }
+
+    def get_engines(self) -> Iterator[Tuple[str, PooledSqlEngine]]:
+        """Return engines with a pool of their own, and their names."""
+
+        yield 'primary', db
+
+        if read_db.uri:
+            yield 'replica', read_db
+
+    def collect_metrics(self) -> Iterable[Metric]:
+        """Collect metrics."""
+
+        label_names = ['pool']
+
+        size = GaugeMetricFamily(
+            'meteringpoints_db_pool_size',
+            'Configured number of connections to keep open',
+            labels=label_names)
+        checked_out = GaugeMetricFamily(
+            'meteringpoints_db_pool_checked_out',
+            'Number of connections currently in use',
+            labels=label_names)
+        checked_in = GaugeMetricFamily(
+            'meteringpoints_db_pool_checked_in',
+            'Number of idle connections in the pool',
+            labels=label_names)
+        overflow = GaugeMetricFamily(
+            'meteringpoints_db_pool_overflow',
+            'Number of connections currently open beyond the size',
+            labels=label_names)
+        checkouts = CounterMetricFamily(
+            'meteringpoints_db_pool_checkouts',
+            'Number of connections checked out of the pool',
+            labels=label_names)
+        wait_time = CounterMetricFamily(
+            'meteringpoints_db_pool_wait_seconds',
+            'Time spent waiting for connections',
+            labels=label_names)
+        wait_time_max = GaugeMetricFamily(
+            'meteringpoints_db_pool_wait_seconds_max',
+            'Longest time spent waiting for a single connection',
+            labels=label_names)
+
+        for pool, engine in self.get_engines():
+            stats = engine.pool_stats()
+            label_values = [pool]
+
+            size.add_metric(label_values, stats.size)
+            checked_out.add_metric(label_values, stats.checked_out)
+            checked_in.add_metric(label_values, stats.checked_in)
+            overflow.add_metric(label_values, stats.overflow)
+            checkouts.add_metric(label_values, stats.checkouts)
+            wait_time.add_metric(label_values, stats.wait_time)
+            wait_time_max.add_metric(label_values, stats.wait_time_max)
+
+        return (
+            size,
+            checked_out,
+            checked_in,
+            overflow,
+            checkouts,
+            wait_time,
+            wait_time_max,
+        )
+
+
+class CacheCollector(ProcessCollector):
+    """Collects statistics of in-process caches."""
+
+    def __init__(self):
+        self.caches: Dict[str, TTLCache] = {}
+
+    def add(self, name: str, cache: TTLCache):
+        """Collect statistics of a cache by name."""
+
+        self.caches[name] = cache
+
+    def collect_metrics(self) -> Iterable[Metric]:
+        """Collect metrics."""
+
+        label_names = ['cache']
+
+        hits = CounterMetricFamily(
+            'meteringpoints_cache_hits',
+            'Number of lookups which found a cached value',
+            labels=label_names)
+        misses = CounterMetricFamily(
+            'meteringpoints_cache_misses',
+            'Number of lookups which found no (unexpired) cached value',
+            labels=label_names)
+        entries = GaugeMetricFamily(
+            'meteringpoints_cache_entries',
+            'Number of cached entries (including expired ones)',
+            labels=label_names)
+
+        for name, cache in self.caches.items():
+            label_values = [name]
+
+            hits.add_metric(label_values, cache.hits)
+            misses.add_metric(label_values, cache.misses)
+            entries.add_metric(label_values, len(cache))
+
+        return hits, misses, entries
+
+
+class MultiProcessWriter(object):
+    """
+    Writes metrics collected by ProcessCollectors to prometheus_client.
+
+    When running multiple processes, prometheus_client writes metrics to
+    files shared by them, so statistics of each process are aggregated
+    with those of the others, rather than only reporting those of the
+    process which is scraped. Counters are incremented by how much they
+    increased since they were last written.
+    """
+
+    def __init__(self, registry: CollectorRegistry = None):
+        self.registry = registry
+        self.metrics: Dict[str, Union[Counter, Gauge]] = {}
+        self.written: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        self.lock = Lock()
+
+    def write(self, collector: ProcessCollector):
+        """Write the current metrics of a collector."""
+
+        with self.lock:
+            for family in collector.collect():
+                for sample in family.samples:
+                    if family.type == 'counter':
+                        self._write_counter(family, sample)
+                    else:
+                        self._write_gauge(collector, family, sample)
+
+    def _write_counter(self, family: Metric, sample: Tuple):
+        """Increment a counter by how much it increased."""
+
+        if not sample.name.endswith('_total'):
+            return
+
+        key = (sample.name, tuple(sample.labels.values()))
+        written = self.written.get(key, 0)
+
+        # Statistics are reset when recreating a pool
+        if sample.value >= written:
+            increase = sample.value - written
+        else:
+            increase = sample.value
+
+        self.written[key] = sample.value
+
+        self._get_metric(Counter, family, sample) \
+            .labels(**sample.labels) \
+            .inc(increase)
+
+    def _write_gauge(
+            self,
+            collector: ProcessCollector,
+            family: Metric,
+            sample: Tuple,
+    ):
+        """Set a gauge."""
+
+        mode = collector.multiprocess_modes.get(family.name, 'livesum')
+
+        self._get_metric(Gauge, family, sample, multiprocess_mode=mode) \
+            .labels(**sample.labels) \
+            .set(sample.value)
+
+    def _get_metric(
+            self,
+            metric_type: Union[Type[Counter], Type[Gauge]],
+            family: Metric,
+            sample: Tuple,
+            **kwargs,
+    ) -> Union[Counter, Gauge]:
+        """Return the metric to write a sample to, creating it if needed."""
+
+        if family.name not in self.metrics:
+            self.metrics[family.name] = metric_type(
+                name=family.name,
+                documentation=family.documentation,
+                labelnames=list(sample.labels),
+                registry=self.registry,
+                **kwargs,
+            )
+
+        return self.metrics[family.name]
+
+
+def register_cache(name: str, cache: TTLCache):
+    """Include statistics of a cache in generated metrics."""
+
+    cache_collector.add(name, cache)
+
+
+def register_collector(collector: ProcessCollector):
+    """Register a ProcessCollector to include in generated metrics."""
+
+    if collector not in process_collectors:
+        REGISTRY.register(collector)
+        process_collectors.append(collector)
+
+
+def write_process_metrics():
+    """
+    Write statistics of the current process to the shared files.
+
+    Does nothing unless running multiple processes. Statistics of a
+    process only change while it is working, so calling this after each
+    unit of work keeps them up to date.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        for collector in process_collectors:
+            process_writer.write(collector)
+
+
+def generate_metrics() -> bytes:
+    """Return metrics (of all processes) in the Prometheus text format."""
+
+    if PROMETHEUS_MULTIPROC_DIR:
+        write_process_metrics()
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry)
+
+
+# -- Singletons --------------------------------------------------------------
+
+
+# Collectors of statistics which are only known by the current process
+process_collectors: List[ProcessCollector] = []
+
+cache_collector = CacheCollector()
+
+process_writer = MultiProcessWriter()
+
+register_collector(PoolCollector())
+register_collector(cache_collector)
@@ -5,11 +5,12 @@ from dataclasses import dataclass, field
 from sqlalchemy.orm import relationship
 
 from origin.serialize import Serializable
-from origin.models.tech import TechnologyType
-from origin.models.common import ResultOrdering
+from origin.models.tech import Technology, TechnologyType
+from origin.models.common import Address, ResultOrdering
 from origin.models.meteringpoints import MeteringPointType
 
 from .db import db
+from .technologies import technology_catalogue
 
 
 # -- Common models -----------------------------------------------------------
@@ -45,11 +46,18 @@ class DbMeteringPoint(db.ModelBase):
     __table_args__ = (
         sa.PrimaryKeyConstraint('gsrn'),
         sa.UniqueConstraint('gsrn'),
+
+        # For filtering, and paginating in order (see MeteringPointQuery)
+        sa.Index('ix_meteringpoint_sector_gsrn', 'sector', 'gsrn'),
+        sa.Index('ix_meteringpoint_type_gsrn', 'type', 'gsrn'),
     )
 
     gsrn = sa.Column(sa.String(), index=True, nullable=False)
-    sector = sa.Column(sa.String(), index=True)
-    type = sa.Column(sa.Enum(MeteringPointType), index=True)
+    sector = sa.Column(sa.String())
+    type = sa.Column(sa.Enum(MeteringPointType))
+
+    # Time the latest applied event was published; older events are skipped
+    event_timestamp = sa.Column(sa.DateTime(timezone=True))
 
     # -- Relationships -------------------------------------------------------
 
@@ -61,22 +69,28 @@ class DbMeteringPoint(db.ModelBase):
         lazy='joined',
     )
 
-    # TODO Rewrite this?
-    technology = relationship(
-        'DbTechnology',
+    technology_codes = relationship(
+        'DbMeteringPointTechnology',
         primaryjoin='foreign(DbMeteringPoint.gsrn) == DbMeteringPointTechnology.gsrn',  # noqa: E501
-        secondary='meteringpoint_technology',
-        secondaryjoin=(
-            'and_('
-            'foreign(DbMeteringPointTechnology.tech_code) == DbTechnology.tech_code,'  # noqa: E501
-            'foreign(DbMeteringPointTechnology.fuel_code) == DbTechnology.fuel_code'  # noqa: E501
-            ')'
-        ),
         uselist=False,
         viewonly=True,
         lazy='joined',
     )
 
+    @property
+    def technology(self) -> Optional[Technology]:
+        """
+        The MeteringPoint's Technology, if it has any.
+
+        Resolved by its codes from the in-memory technology catalogue
+        instead of joining the technology table.
+        """
+        if self.technology_codes is not None:
+            return technology_catalogue.get(
+                tech_code=self.technology_codes.tech_code,
+                fuel_code=self.technology_codes.fuel_code,
+            )
+
 
 class DbMeteringPointAddress(db.ModelBase):
     """SQL representation of a (physical) address for a MeteringPoint."""
@@ -99,6 +113,9 @@ class DbMeteringPointAddress(db.ModelBase):
     municipality_code = sa.Column(sa.String())
     location_description = sa.Column(sa.String())
 
+    # Time the latest applied event was published; older events are skipped
+    event_timestamp = sa.Column(sa.DateTime(timezone=True))
+
 
 class DbMeteringPointTechnology(db.ModelBase):
     """SQL representation of technology codes for a MeteringPoint."""
@@ -113,6 +130,28 @@ class DbMeteringPointTechnology(db.ModelBase):
     tech_code = sa.Column(sa.String())
     fuel_code = sa.Column(sa.String())
 
+    # Time the latest applied event was published; older events are skipped
+    event_timestamp = sa.Column(sa.DateTime(timezone=True))
+
+
+class DbMeteringPointTombstone(db.ModelBase):
+    """
+    Time the latest applied event deleted a MeteringPoint's data.
+
+    Has a row per GSRN and table which data has been deleted from by a
+    timestamped event, so events older than the deletion are skipped
+    instead of recreating the deleted row (see DatabaseController).
+    """
+
+    __tablename__ = 'meteringpoint_tombstone'
+    __table_args__ = (
+        sa.PrimaryKeyConstraint('table_name', 'gsrn'),
+    )
+
+    table_name = sa.Column(sa.String(), nullable=False)
+    gsrn = sa.Column(sa.String(), nullable=False)
+    event_timestamp = sa.Column(sa.DateTime(timezone=True), nullable=False)
+
 
 class DbMeteringPointDelegate(db.ModelBase):
     """TODO."""
@@ -120,12 +159,108 @@ class DbMeteringPointDelegate(db.ModelBase):
     __tablename__ = 'meteringpoint_delegate'
     __table_args__ = (
         sa.PrimaryKeyConstraint('gsrn', 'subject'),
+        sa.Index('ix_meteringpoint_delegate_subject_gsrn', 'subject', 'gsrn'),
     )
 
     gsrn = sa.Column(sa.String(), index=True, nullable=False)
     subject = sa.Column(sa.String())
 
 
+class DbSubjectMeteringPoint(db.ModelBase):
+    """
+    Denormalized MeteringPoint accessible by a subject (read model).
+
+    Has a row per delegate, with the MeteringPoint and its address and
+    technology codes copied into it, so MeteringPoints accessible by a
+    subject can be listed without joining other tables. Maintained by
+    DatabaseController if enabled (see SUBJECT_READ_MODEL_ENABLED).
+    """
+
+    __tablename__ = 'subject_meteringpoint'
+    __table_args__ = (
+        sa.PrimaryKeyConstraint('subject', 'gsrn'),
+
+        # For paginating in order (see MeteringPointQuery)
+        sa.Index(
+            'ix_subject_meteringpoint_subject_sector_gsrn',
+            'subject', 'sector', 'gsrn',
+        ),
+        sa.Index(
+            'ix_subject_meteringpoint_subject_type_gsrn',
+            'subject', 'type', 'gsrn',
+        ),
+    )
+
+    subject = sa.Column(sa.String(), nullable=False)
+    gsrn = sa.Column(sa.String(), nullable=False)
+    sector = sa.Column(sa.String())
+    type = sa.Column(sa.Enum(MeteringPointType))
+    street_code = sa.Column(sa.String())
+    street_name = sa.Column(sa.String())
+    building_number = sa.Column(sa.String())
+    floor_id = sa.Column(sa.String())
+    room_id = sa.Column(sa.String())
+    post_code = sa.Column(sa.String())
+    city_name = sa.Column(sa.String())
+    city_sub_division_name = sa.Column(sa.String())
+    municipality_code = sa.Column(sa.String())
+    location_description = sa.Column(sa.String())
+    tech_code = sa.Column(sa.String())
+    fuel_code = sa.Column(sa.String())
+
+    @property
+    def address(self) -> Optional[Address]:
+        """The MeteringPoint's address, if any of its fields are known."""
+
+        fields = {
+            f: getattr(self, f)
+            for f in Address.__dataclass_fields__
+        }
+
+        if any(v is not None for v in fields.values()):
+            return Address(**fields)
+
+    @property
+    def technology(self) -> Optional[Technology]:
+        """The MeteringPoint's Technology, if it has any."""
+
+        if self.tech_code is not None or self.fuel_code is not None:
+            return technology_catalogue.get(
+                tech_code=self.tech_code,
+                fuel_code=self.fuel_code,
+            )
+
+
+class DbMeteringPointStatistics(db.ModelBase):
+    """
+    Number of MeteringPoints per sector, type and technology codes.
+
+    Maintained incrementally by DatabaseController whenever MeteringPoints
+    or their technology codes change. Groups without a sector, type or
+    technology codes have an empty string instead of NULL, as they are
+    part of the primary key. Types are stored by name.
+
+    Counts are grouped by technology codes rather than technology type,
+    so changing a Technology does not change any counts; technology
+    types are joined when reading (see MeteringPointStatisticsQuery).
+    Each group is split into a number of slots, which are summed when
+    reading, so concurrent transactions rarely update the same row.
+    """
+
+    __tablename__ = 'meteringpoint_statistics'
+    __table_args__ = (
+        sa.PrimaryKeyConstraint(
+            'sector', 'type', 'tech_code', 'fuel_code', 'slot'),
+    )
+
+    sector = sa.Column(sa.String(), nullable=False)
+    type = sa.Column(sa.String(), nullable=False)
+    tech_code = sa.Column(sa.String(), nullable=False)
+    fuel_code = sa.Column(sa.String(), nullable=False)
+    slot = sa.Column(sa.SmallInteger(), nullable=False)
+    count = sa.Column(sa.BigInteger(), nullable=False)
+
+
 class DbTechnology(db.ModelBase):
     """SQL representation of a Technology."""
 
@@ -1,5 +1,10 @@
-from typing import List
-from sqlalchemy import orm, asc, desc, and_
+import json
+import base64
+import binascii
+from enum import Enum
+from typing import Callable, List, Optional, Tuple, Any
+from sqlalchemy import orm, asc, desc, and_, true, tuple_
+from sqlalchemy import func, cast, BigInteger
 
 from origin.sql import SqlQuery
 from origin.models.meteringpoints import MeteringPointType
@@ -12,6 +17,8 @@ from .models import (
     DbMeteringPointTechnology,
     DbMeteringPointAddress,
     DbMeteringPointDelegate,
+    DbMeteringPointStatistics,
+    DbSubjectMeteringPoint,
     DbTechnology,
 )
 
@@ -22,8 +29,16 @@ from .models import (
 class MeteringPointQuery(SqlQuery):
     """Query DbMeteringPoint."""
 
+    class InvalidCursor(Exception):
+        """Raised when a pagination cursor can not be decoded."""
+
+        pass
+
+    # Model to query; must have gsrn, sector and type columns
+    model = DbMeteringPoint
+
     def _get_base_query(self) -> orm.Query:
-        return self.session.query(DbMeteringPoint)
+        return self.session.query(self.model)
 
     def apply_filters(
             self,
@@ -49,9 +64,9 @@ class MeteringPointQuery(SqlQuery):
         """Apply provided ordering."""
 
         fields = {
-            MeteringPointOrderingKeys.GSRN: DbMeteringPoint.gsrn,
-            MeteringPointOrderingKeys.TYPE: DbMeteringPoint.type,
-            MeteringPointOrderingKeys.SECTOR: DbMeteringPoint.sector,
+            MeteringPointOrderingKeys.GSRN: self.model.gsrn,
+            MeteringPointOrderingKeys.TYPE: self.model.type,
+            MeteringPointOrderingKeys.SECTOR: self.model.sector,
         }
 
         if ordering.asc:
@@ -61,6 +76,71 @@ class MeteringPointQuery(SqlQuery):
         else:
             raise RuntimeError('Should NOT have happened')
 
+    def paginate(
+            self,
+            ordering: Optional[MeteringPointOrdering],
+            cursor: Optional[str],
+            limit: int,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Return a single page of results using keyset pagination.
+
+        Results are ordered by the ordering key (if any) and then GSRN,
+        the same way as by apply_ordering(). The returned cursor is opaque
+        to clients and encodes the ordering key and GSRN of the last
+        result. It must be passed to fetch the next page, and is None
+        when there are no more results. Pages are read in order from an
+        index on the ordering key and GSRN (see models), so fetching a
+        page costs the same no matter how deep into the results it is.
+
+        :param ordering: Ordering of results, or None to order by GSRN
+        :param cursor: Cursor returned with the previous page, if any
+        :param limit: Max number of results in the page
+        :raises InvalidCursor: If the cursor can not be decoded
+        """
+        if ordering is not None and ordering.key is not None:
+            key = ordering.key
+            direction = desc if ordering.desc else asc
+        else:
+            key = MeteringPointOrderingKeys.GSRN
+            direction = asc
+
+        segments = _get_keyset_segments(self.model, key, direction)
+
+        if cursor is not None:
+            first, values = _decode_cursor(cursor, key, segments)
+        else:
+            first, values = 0, None
+
+        # Results (and the segment they are from) until the page is full
+        results: List[Tuple[int, Any]] = []
+
+        for segment in range(first, len(segments)):
+            condition, columns = segments[segment]
+            query = self.query.filter(condition)
+
+            if segment == first and values is not None:
+                if direction is asc:
+                    query = query.filter(tuple_(*columns) > tuple_(*values))
+                else:
+                    query = query.filter(tuple_(*columns) < tuple_(*values))
+
+            results.extend((segment, result) for result in query
+                           .order_by(*(direction(c) for c in columns))
+                           .limit(limit + 1 - len(results))
+                           .all())
+
+            if len(results) > limit:
+                break
+
+        if len(results) > limit:
+            segment, last = results[limit - 1]
+            next_cursor = _encode_cursor(key, segment, segments, last)
+        else:
+            next_cursor = None
+
+        return [result for _, result in results[:limit]], next_cursor
+
     def has_gsrn(self, gsrn: str) -> 'MeteringPointQuery':
         """
         TODO.
@@ -68,7 +148,7 @@ class MeteringPointQuery(SqlQuery):
         Filters query; only include MeteringPoint with the
         provided gsrn.
         """
-        return self.filter(DbMeteringPoint.gsrn == gsrn)
+        return self.filter(self.model.gsrn == gsrn)
 
     def has_any_gsrn(self, gsrn: List[str]) -> 'MeteringPointQuery':
         """
@@ -77,7 +157,7 @@ class MeteringPointQuery(SqlQuery):
         Filters query; only include MeteringPoints with any of
         the provided gsrn.
         """
-        return self.filter(DbMeteringPoint.gsrn.in_(gsrn))
+        return self.filter(self.model.gsrn.in_(gsrn))
 
     def is_type(self, type: MeteringPointType) -> 'MeteringPointQuery':
         """
@@ -86,7 +166,7 @@ class MeteringPointQuery(SqlQuery):
         Filters query; only include MeteringPoints with the
         provided type.
         """
-        return self.filter(DbMeteringPoint.type == type)
+        return self.filter(self.model.type == type)
 
     def in_sector(self, sector: str) -> 'MeteringPointQuery':
         """
@@ -95,7 +175,7 @@ class MeteringPointQuery(SqlQuery):
         Filters query; only include MeteringPoints within the
         provided sector.
         """
-        return self.filter(DbMeteringPoint.sector == sector)
+        return self.filter(self.model.sector == sector)
 
     def in_any_sector(self, sector: List[str]) -> 'MeteringPointQuery':
         """
@@ -104,7 +184,7 @@ class MeteringPointQuery(SqlQuery):
         Filters query; only include MeteringPoints within any of the
         provided sectors.
         """
-        return self.filter(DbMeteringPoint.sector.in_(sector))
+        return self.filter(self.model.sector.in_(sector))
 
     def is_accessible_by(self, subject: str) -> 'MeteringPointQuery':
         """TODO."""
@@ -112,12 +192,103 @@ class MeteringPointQuery(SqlQuery):
         return self.__class__(
             session=self.session,
             query=self.query.join(DbMeteringPointDelegate, and_(
-                DbMeteringPointDelegate.gsrn == DbMeteringPoint.gsrn,
+                DbMeteringPointDelegate.gsrn == self.model.gsrn,
                 DbMeteringPointDelegate.subject == subject,
             )),
         )
 
 
+def _get_keyset_segments(
+        model: Any,
+        key: MeteringPointOrderingKeys,
+        direction: Callable[[Any], Any],
+) -> List[Tuple[Any, List[Any]]]:
+    """
+    Return segments of results to page through, in order.
+
+    Each segment is a filter and the columns to order by (and compare)
+    within it, ending with GSRN to make the ordering unique. NULLs can
+    not be compared, so MeteringPoints without a type or sector are a
+    segment of their own, ordered last (or first when descending).
+    """
+    if key is MeteringPointOrderingKeys.GSRN:
+        return [(true(), [model.gsrn])]
+    elif key is MeteringPointOrderingKeys.TYPE:
+        column = model.type
+    elif key is MeteringPointOrderingKeys.SECTOR:
+        column = model.sector
+    else:
+        raise RuntimeError('Should NOT have happened')
+
+    segments = [
+        (column.isnot(None), [column, model.gsrn]),
+        (column.is_(None), [model.gsrn]),
+    ]
+
+    return segments if direction is asc else segments[::-1]
+
+
+def _encode_cursor(
+        key: MeteringPointOrderingKeys,
+        segment: int,
+        segments: List[Tuple[Any, List[Any]]],
+        meteringpoint: Any,
+) -> str:
+    """Encode an opaque cursor pointing at a MeteringPoint."""
+
+    values = [getattr(meteringpoint, c.key) for c in segments[segment][1]]
+
+    data = json.dumps({
+        'key': key.value,
+        'segment': segment,
+        'values': [v.name if isinstance(v, Enum) else v for v in values],
+    })
+
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_cursor(
+        cursor: str,
+        key: MeteringPointOrderingKeys,
+        segments: List[Tuple[Any, List[Any]]],
+) -> Tuple[int, List[str]]:
+    """Decode segment and values of keyset columns from a cursor."""
+
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        segment = data['segment']
+        values = data['values']
+        valid = data['key'] == key.value \
+            and segment in range(len(segments)) \
+            and isinstance(values, list) \
+            and len(values) == len(segments[segment][1]) \
+            and all(isinstance(v, str) for v in values)
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        valid = False
+
+    if not valid:
+        raise MeteringPointQuery.InvalidCursor(cursor)
+
+    return segment, values
+
+
+class SubjectMeteringPointQuery(MeteringPointQuery):
+    """
+    Query DbSubjectMeteringPoint (read model).
+
+    Supports the same filters, ordering and pagination as
+    MeteringPointQuery, but filtering by subject does not join
+    any other tables.
+    """
+
+    model = DbSubjectMeteringPoint
+
+    def is_accessible_by(self, subject: str) -> 'SubjectMeteringPointQuery':
+        """Only include MeteringPoints accessible by subject."""
+
+        return self.filter(DbSubjectMeteringPoint.subject == subject)
+
+
 class MeteringPointAddressQuery(SqlQuery):
     """Query DbMeteringPointAddress."""
 
@@ -131,6 +302,11 @@ class MeteringPointAddressQuery(SqlQuery):
 
         return self.filter(DbMeteringPointAddress.gsrn == gsrn)
 
+    def has_any_gsrn(self, gsrn: List[str]) -> 'MeteringPointAddressQuery':
+        """Filter query; only include rows with any of the gsrn."""
+
+        return self.filter(DbMeteringPointAddress.gsrn.in_(gsrn))
+
 
 class MeteringPointTechnologyQuery(SqlQuery):
     """Query DbMeteringPointTechnology."""
@@ -145,6 +321,11 @@ class MeteringPointTechnologyQuery(SqlQuery):
 
         return self.filter(DbMeteringPointTechnology.gsrn == gsrn)
 
+    def has_any_gsrn(self, gsrn: List[str]) -> 'MeteringPointTechnologyQuery':
+        """Filter query; only include rows with any of the gsrn."""
+
+        return self.filter(DbMeteringPointTechnology.gsrn.in_(gsrn))
+
 
 class DelegateQuery(SqlQuery):
     """Query MeteringPointDelegate."""
@@ -165,6 +346,43 @@ class DelegateQuery(SqlQuery):
         return self.filter(DbMeteringPointDelegate.subject == subject)
 
 
+# -- Statistics --------------------------------------------------------------
+
+
+class MeteringPointStatisticsQuery(SqlQuery):
+    """
+    Query number of MeteringPoints per sector, type and technology type.
+
+    Sums the slots of each group in DbMeteringPointStatistics, and joins
+    the technology type of its codes. Rows have sector, type (name),
+    technology_type (TechnologyType or None) and count.
+    """
+
+    count = cast(func.sum(DbMeteringPointStatistics.count), BigInteger)
+
+    def _get_base_query(self) -> orm.Query:
+        """TODO."""
+
+        groups = (
+            DbMeteringPointStatistics.sector,
+            DbMeteringPointStatistics.type,
+            DbTechnology.type.label('technology_type'),
+        )
+
+        return self.session.query(*groups, self.count.label('count')) \
+            .outerjoin(DbTechnology, and_(
+                DbTechnology.tech_code == DbMeteringPointStatistics.tech_code,
+                DbTechnology.fuel_code == DbMeteringPointStatistics.fuel_code,
+            )) \
+            .group_by(*groups) \
+            .order_by(*groups)
+
+    def is_not_empty(self) -> 'MeteringPointStatisticsQuery':
+        """Only include groups with any MeteringPoints."""
+
+        return self.__class__(self.session, self.query.having(self.count > 0))
+
+
 # -- Technologies ------------------------------------------------------------
 
 
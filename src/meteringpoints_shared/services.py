@@ -0,0 +1,71 @@
+import requests
+from typing import Any
+from functools import cached_property
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    HTTP_POOL_SIZE,
+    HTTP_POOL_BLOCK,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
+
+
+class HttpClient(object):
+    """
+    Shared HTTP client for calling upstream services.
+
+    Connections are kept alive in a bounded pool per host, so TCP/TLS
+    setup is not paid on every request. When all pooled connections are
+    in use, requests either wait for one (pool_block) or open a temporary
+    connection. Requests which don't specify a timeout get the configured
+    connect and read timeouts.
+    """
+
+    def __init__(
+            self,
+            pool_size: int,
+            connect_timeout: float,
+            read_timeout: float,
+            pool_block: bool = False,
+    ):
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    @cached_property
+    def session(self) -> requests.Session:
+        """HTTP session with a bounded connection pool."""
+
+        adapter = HTTPAdapter(
+            pool_maxsize=self.pool_size,
+            pool_block=self.pool_block,
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        return session
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request."""
+
+        kwargs.setdefault('timeout', (
+            self.connect_timeout,
+            self.read_timeout,
+        ))
+
+        return self.session.get(url, **kwargs)
+
+
+# -- Singletons --------------------------------------------------------------
+
+
+http_client = HttpClient(
+    pool_size=HTTP_POOL_SIZE,
+    connect_timeout=HTTP_CONNECT_TIMEOUT,
+    read_timeout=HTTP_READ_TIMEOUT,
+    pool_block=HTTP_POOL_BLOCK,
+)
@@ -0,0 +1,100 @@
+from time import monotonic
+from threading import Lock
+from typing import Callable, Dict, Iterable, Tuple, Optional
+
+from origin.models.tech import Technology
+
+from .config import TECHNOLOGY_CATALOGUE_TTL
+
+
+class TechnologyCatalogue(object):
+    """
+    In-memory catalogue of Technologies, mapped by their codes.
+
+    The technology table is small and rarely changes, so it is loaded
+    into memory in its entirety instead of being joined whenever
+    MeteringPoints are queried. Looking up Technologies never touches
+    the database; instead, the catalogue must be (re)loaded explicitly
+    using refresh(), for instance before handling each request, which
+    only loads it if it has not been loaded within ttl seconds (0 never
+    reloads). Processes which listen for technology changes on the
+    Message Bus can keep it up-to-date using set() and remove().
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._technologies: Dict[Tuple[str, str], Technology] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = Lock()
+        self._refresh_lock = Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        """Check whether the catalogue must be (re)loaded before use."""
+
+        if self._loaded_at is None:
+            return True
+        elif self.ttl > 0:
+            return monotonic() - self._loaded_at >= self.ttl
+        else:
+            return False
+
+    def load(self, technologies: Iterable[Technology]):
+        """Replace all Technologies in the catalogue."""
+
+        technologies = {
+            (t.tech_code, t.fuel_code): Technology(
+                tech_code=t.tech_code,
+                fuel_code=t.fuel_code,
+                type=t.type,
+            )
+            for t in technologies
+        }
+
+        with self._lock:
+            self._technologies = technologies
+            self._loaded_at = monotonic()
+
+    def refresh(self, get_technologies: Callable[[], Iterable[Technology]]):
+        """Load Technologies from get_technologies() if stale."""
+
+        if self.is_stale:
+            with self._refresh_lock:
+                if self.is_stale:
+                    self.load(get_technologies())
+
+    def get(self, tech_code: str, fuel_code: str) -> Optional[Technology]:
+        """Return a Technology by its codes, or None if it does not exist."""
+
+        return self._technologies.get((tech_code, fuel_code))
+
+    def set(self, technology: Technology):
+        """Add or replace a Technology."""
+
+        key = (technology.tech_code, technology.fuel_code)
+
+        with self._lock:
+            self._technologies = {**self._technologies, key: technology}
+
+    def remove(self, tech_code: str, fuel_code: str):
+        """Remove a Technology by its codes, if it exists."""
+
+        with self._lock:
+            self._technologies = {
+                key: technology
+                for key, technology in self._technologies.items()
+                if key != (tech_code, fuel_code)
+            }
+
+    def invalidate(self):
+        """Forget all Technologies, so they are loaded again on next use."""
+
+        with self._lock:
+            self._technologies = {}
+            self._loaded_at = None
+
+
+# -- Singletons --------------------------------------------------------------
+
+
+technology_catalogue = TechnologyCatalogue(ttl=TECHNOLOGY_CATALOGUE_TTL)
@@ -0,0 +1,45 @@
+"""Add meteringpoint_statistics
+
+Revision ID: 3b9e4f1a7c52
+Revises: 8d3f0b6e2c17
+Create Date: 2026-10-18 14:27:03.118214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e4f1a7c52'
+down_revision = '8d3f0b6e2c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('meteringpoint_statistics',
+    sa.Column('sector', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('tech_code', sa.String(), nullable=False),
+    sa.Column('fuel_code', sa.String(), nullable=False),
+    sa.Column('slot', sa.SmallInteger(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('sector', 'type', 'tech_code', 'fuel_code', 'slot')
+    )
+
+    # Count existing MeteringPoints (types are stored by enum name)
+    op.execute(
+        'INSERT INTO meteringpoint_statistics '
+        '(sector, type, tech_code, fuel_code, slot, count) '
+        'SELECT COALESCE(m.sector, \'\'), '
+        'COALESCE(UPPER(m.type::text), \'\'), '
+        'COALESCE(mt.tech_code, \'\'), '
+        'COALESCE(mt.fuel_code, \'\'), 0, COUNT(*) '
+        'FROM meteringpoint m '
+        'LEFT JOIN meteringpoint_technology mt ON mt.gsrn = m.gsrn '
+        'GROUP BY 1, 2, 3, 4'
+    )
+
+
+def downgrade():
+    op.drop_table('meteringpoint_statistics')
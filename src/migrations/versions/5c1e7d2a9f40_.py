@@ -0,0 +1,24 @@
+"""Add (subject, gsrn) index to meteringpoint_delegate
+
+Revision ID: 5c1e7d2a9f40
+Revises: 0a35bff916bc
+Create Date: 2026-10-18 09:12:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7d2a9f40'
+down_revision = '0a35bff916bc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_meteringpoint_delegate_subject_gsrn', 'meteringpoint_delegate', ['subject', 'gsrn'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_meteringpoint_delegate_subject_gsrn', table_name='meteringpoint_delegate')
@@ -0,0 +1,35 @@
+"""Add indexes for paginating metering points by sector and type
+
+Revision ID: 7f2b9c4e1d08
+Revises: e41c6a9d0b83
+Create Date: 2026-10-18 18:20:13.604718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f2b9c4e1d08'
+down_revision = 'e41c6a9d0b83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Replace single column indexes, which are prefixes of the new ones
+    op.drop_index('ix_meteringpoint_type', table_name='meteringpoint')
+    op.drop_index('ix_meteringpoint_sector', table_name='meteringpoint')
+    op.create_index('ix_meteringpoint_sector_gsrn', 'meteringpoint', ['sector', 'gsrn'], unique=False)
+    op.create_index('ix_meteringpoint_type_gsrn', 'meteringpoint', ['type', 'gsrn'], unique=False)
+    op.create_index('ix_subject_meteringpoint_subject_sector_gsrn', 'subject_meteringpoint', ['subject', 'sector', 'gsrn'], unique=False)
+    op.create_index('ix_subject_meteringpoint_subject_type_gsrn', 'subject_meteringpoint', ['subject', 'type', 'gsrn'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_subject_meteringpoint_subject_type_gsrn', table_name='subject_meteringpoint')
+    op.drop_index('ix_subject_meteringpoint_subject_sector_gsrn', table_name='subject_meteringpoint')
+    op.drop_index('ix_meteringpoint_type_gsrn', table_name='meteringpoint')
+    op.drop_index('ix_meteringpoint_sector_gsrn', table_name='meteringpoint')
+    op.create_index('ix_meteringpoint_sector', 'meteringpoint', ['sector'], unique=False)
+    op.create_index('ix_meteringpoint_type', 'meteringpoint', ['type'], unique=False)
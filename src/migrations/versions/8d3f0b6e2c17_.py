@@ -0,0 +1,28 @@
+"""Add event_timestamp to meteringpoint, address and technology
+
+Revision ID: 8d3f0b6e2c17
+Revises: 5c1e7d2a9f40
+Create Date: 2026-10-18 11:02:19.541876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f0b6e2c17'
+down_revision = '5c1e7d2a9f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('meteringpoint', sa.Column('event_timestamp', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('meteringpoint_address', sa.Column('event_timestamp', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('meteringpoint_technology', sa.Column('event_timestamp', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('meteringpoint_technology', 'event_timestamp')
+    op.drop_column('meteringpoint_address', 'event_timestamp')
+    op.drop_column('meteringpoint', 'event_timestamp')
@@ -0,0 +1,29 @@
+"""Add meteringpoint_tombstone
+
+Revision ID: b6d2e8f1a3c9
+Revises: 7f2b9c4e1d08
+Create Date: 2026-10-18 19:42:51.270386
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2e8f1a3c9'
+down_revision = '7f2b9c4e1d08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('meteringpoint_tombstone',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('gsrn', sa.String(), nullable=False),
+    sa.Column('event_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('table_name', 'gsrn')
+    )
+
+
+def downgrade():
+    op.drop_table('meteringpoint_tombstone')
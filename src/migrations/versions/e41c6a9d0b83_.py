@@ -0,0 +1,44 @@
+"""Add subject_meteringpoint read model
+
+Revision ID: e41c6a9d0b83
+Revises: 3b9e4f1a7c52
+Create Date: 2026-10-18 16:05:47.902315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41c6a9d0b83'
+down_revision = '3b9e4f1a7c52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populated by "python -m meteringpoints_consumer.rebuild" once enabled
+    op.create_table('subject_meteringpoint',
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('gsrn', sa.String(), nullable=False),
+    sa.Column('sector', sa.String(), nullable=True),
+    sa.Column('type', postgresql.ENUM('production', 'consumption', name='energydirection', create_type=False), nullable=True),
+    sa.Column('street_code', sa.String(), nullable=True),
+    sa.Column('street_name', sa.String(), nullable=True),
+    sa.Column('building_number', sa.String(), nullable=True),
+    sa.Column('floor_id', sa.String(), nullable=True),
+    sa.Column('room_id', sa.String(), nullable=True),
+    sa.Column('post_code', sa.String(), nullable=True),
+    sa.Column('city_name', sa.String(), nullable=True),
+    sa.Column('city_sub_division_name', sa.String(), nullable=True),
+    sa.Column('municipality_code', sa.String(), nullable=True),
+    sa.Column('location_description', sa.String(), nullable=True),
+    sa.Column('tech_code', sa.String(), nullable=True),
+    sa.Column('fuel_code', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('subject', 'gsrn')
+    )
+
+
+def downgrade():
+    op.drop_table('subject_meteringpoint')
@@ -5,9 +5,12 @@ https://docs.pytest.org/en/2.7.3/plugins.html?highlight=re#conftest-py-plugins
 import os
 import sys
 import pytest
+from typing import Iterator
 from unittest.mock import patch
 from flask.testing import FlaskClient
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, orm, text
+from sqlalchemy.engine import make_url
 from testcontainers.postgres import PostgresContainer
 
 from origin.tokens import TokenEncoder
@@ -21,23 +24,157 @@ sys.path.append(src_dir)
 
 
 from meteringpoints_api.app import create_app  # noqa: E402
-from meteringpoints_shared.db import db  # noqa: E402
+from meteringpoints_shared.db import db, read_db  # noqa: E402
+from meteringpoints_shared.technologies import technology_catalogue  # noqa: E402, E501
 from meteringpoints_shared.config import INTERNAL_TOKEN_SECRET  # noqa: E402
 
 
+# -- Database ----------------------------------------------------------------
+
+# Connection string of an existing PostgreSQL server to run tests against
+# (for instance in CI). If not set, a container is started per test run
+# (or per worker when running tests in parallel with pytest-xdist)
+TEST_SQL_URI = os.environ.get('TEST_SQL_URI', '')
+
+# Schema to create tables in, one per pytest-xdist worker
+TEST_SCHEMA = f'test_{os.environ.get("PYTEST_XDIST_WORKER", "main")}'
+
+
+def pytest_configure(config):
+    """Register markers."""
+
+    config.addinivalue_line(
+        'markers',
+        'fresh_db: run test against a freshly created database where '
+        'commits are real, instead of rolling back its transaction. '
+        'Required by tests which access the database from other threads.',
+    )
+
+
+def with_schema(uri: str, schema: str) -> str:
+    """Return connection string which uses schema as search path."""
+
+    url = make_url(uri).update_query_dict({
+        'options': f'-csearch_path={schema}',
+    })
+
+    return url.render_as_string(hide_password=False)
+
+
+def create_schema():
+    """(Re)create the test schema and its tables from scratch."""
+
+    with db.engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA {TEST_SCHEMA}'))
+
+    db.ModelBase.metadata.create_all(db.engine)
+
+
+def get_tables_with_rows() -> Iterator[str]:
+    """Yield names of tables which have any rows."""
+
+    with db.engine.connect() as conn:
+        for table in db.ModelBase.metadata.sorted_tables:
+            if conn.execute(text(
+                    f'SELECT EXISTS (SELECT 1 FROM {table.name})')).scalar():
+                yield table.name
+
+
+@pytest.fixture(scope='session')
+def database() -> Iterator[str]:
+    """
+    Create the test schema once per test run (or worker).
+
+    Starts a PostgreSQL container, unless TEST_SQL_URI is set, and
+    points the application at this worker's schema in it.
+
+    :returns: The connection string
+    """
+    if TEST_SQL_URI:
+        yield from _use_database(TEST_SQL_URI)
+    else:
+        with PostgresContainer('postgres:13.4') as psql:
+            yield from _use_database(psql.get_connection_url())
+
+
+def _use_database(uri: str) -> Iterator[str]:
+    """Point the application at the test schema in database at uri."""
+
+    uri = with_schema(uri, TEST_SCHEMA)
+
+    with patch('meteringpoints_shared.db.db.uri', new=uri):
+        create_schema()
+        yield uri
+
+
 @pytest.fixture(scope='function')
-def session():
-    """TODO."""
+def session(request, database: str) -> Iterator[db.Session]:
+    """
+    Database session for a test, isolated from other tests.
+
+    The test runs inside a transaction which is rolled back afterwards.
+    Sessions made by db.make_session() and read_db.make_session() take
+    part in the same transaction, so code under test sees the same data.
+    Commits (and rollbacks) only release (or roll back to) a SAVEPOINT.
+
+    Tests marked with fresh_db instead get a freshly created schema
+    where commits are real, which is recreated again afterwards.
+    """
+
+    # Technologies are loaded from this test's database
+    technology_catalogue.invalidate()
+
+    if request.node.get_closest_marker('fresh_db'):
+        yield from _fresh_session()
+    else:
+        yield from _transactional_session()
+
+
+def _fresh_session() -> Iterator[db.Session]:
+    """Yield session for a freshly created schema."""
+
+    create_schema()
+
+    try:
+        with db.make_session() as session:
+            yield session
+    finally:
+        create_schema()
+
+
+def _transactional_session() -> Iterator[db.Session]:
+    """Yield session in a transaction which is rolled back afterwards."""
+
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    session_class = orm.sessionmaker(bind=connection, expire_on_commit=False)
+
+    @event.listens_for(session_class, 'after_transaction_create')
+    def begin_savepoint(session, session_transaction):
+        # Each session transaction gets a SAVEPOINT of its own to commit
+        # or roll back (see SessionTransaction._connection_for_bind())
+        if session_transaction.parent is None and transaction.is_active:
+            connection.begin_nested()
+
+    session = session_class()
 
-    with PostgresContainer('postgres:13.4') as psql:
-        with patch('meteringpoints_shared.db.db.uri', new=psql.get_connection_url()):  # noqa: E501
+    try:
+        with patch.object(db, 'make_session', new=session_class), \
+                patch.object(read_db, 'make_session', new=session_class):
+            yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
 
-            # Apply migrations
-            db.ModelBase.metadata.create_all(db.engine)
+    tables = list(get_tables_with_rows())
 
-            # Create session
-            with db.session_class() as session:
-                yield session
+    if tables:
+        create_schema()
+        pytest.fail(
+            f'Test committed rows to {", ".join(tables)} outside of its '
+            f'transaction (from another thread?). Mark it with fresh_db.')
 
 
 @pytest.fixture(scope='module')
@@ -0,0 +1,80 @@
+import pytest
+from flask.testing import FlaskClient
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointDelegate,
+)
+
+
+@pytest.fixture(scope='function')
+def seed(session: db.Session, token_subject: str):
+    """Seed the database with MeteringPoints and delegates."""
+
+    session.begin()
+
+    for i in range(3):
+        session.add(DbMeteringPoint(gsrn=f'gsrn{i}', sector='DK1'))
+        session.add(DbMeteringPointAddress(
+            gsrn=f'gsrn{i}',
+            street_name=f'street{i}',
+        ))
+
+    # Subject has access to gsrn0 and gsrn1, but not gsrn2
+    session.add(DbMeteringPointDelegate(gsrn='gsrn0', subject=token_subject))
+    session.add(DbMeteringPointDelegate(gsrn='gsrn1', subject=token_subject))
+    session.add(DbMeteringPointDelegate(gsrn='gsrn2', subject='other'))
+
+    session.commit()
+
+
+@pytest.mark.usefixtures('seed')
+class TestGetMeteringPointDetailsBatch:
+    """Tests POST /details/batch."""
+
+    def test__should_return_result_for_each_gsrn_in_requested_order(
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.post(
+            path='/details/batch',
+            json={'gsrn': ['gsrn1', 'gsrn2', 'unknown', 'gsrn0']},
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+
+        results = res.json['results']
+
+        assert [r['gsrn'] for r in results] == \
+               ['gsrn1', 'gsrn2', 'unknown', 'gsrn0']
+        assert [r['success'] for r in results] == [True, False, False, True]
+
+        assert results[0]['meteringpoint']['gsrn'] == 'gsrn1'
+        assert results[0]['meteringpoint']['address']['street_name'] == \
+               'street1'
+        assert results[1].get('meteringpoint') is None
+
+    def test__too_many_gsrn__should_return_status_400(
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        res = client.post(
+            path='/details/batch',
+            json={'gsrn': [f'gsrn{i}' for i in range(100000)]},
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        assert res.status_code == 400
@@ -0,0 +1,141 @@
+import json
+import pytest
+from flask.testing import FlaskClient
+from datetime import datetime, timezone, timedelta
+
+from origin.tokens import TokenEncoder
+from origin.models.auth import InternalToken
+from origin.models.tech import TechnologyType
+from origin.models.meteringpoints import MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointTechnology,
+    DbTechnology,
+)
+
+
+@pytest.fixture(scope='function')
+def seed(session: db.Session):
+    """Seed the database with MeteringPoints."""
+
+    session.begin()
+
+    session.add(DbTechnology(
+        tech_code='T010101',
+        fuel_code='F01010101',
+        type=TechnologyType.SOLAR,
+    ))
+
+    for i, sector in enumerate(('DK1', 'DK2', 'DK1')):
+        session.add(DbMeteringPoint(
+            gsrn=f'gsrn{i}',
+            type=MeteringPointType.PRODUCTION,
+            sector=sector,
+        ))
+        session.add(DbMeteringPointAddress(
+            gsrn=f'gsrn{i}',
+            street_name=f'street{i}',
+        ))
+        session.add(DbMeteringPointTechnology(
+            gsrn=f'gsrn{i}',
+            tech_code='T010101',
+            fuel_code='F01010101',
+        ))
+
+    session.commit()
+
+
+@pytest.fixture(scope='function')
+def export_token_encoded(token_encoder: TokenEncoder[InternalToken]) -> str:
+    """Return an encoded token with the export scope."""
+
+    return token_encoder.encode(InternalToken(
+        issued=datetime.now(tz=timezone.utc),
+        expires=datetime.now(tz=timezone.utc) + timedelta(days=1),
+        actor='foo',
+        subject='bar',
+        scope=['meteringpoints.export'],
+    ))
+
+
+@pytest.mark.usefixtures('seed')
+class TestExportMeteringPoints:
+    """Tests POST /export."""
+
+    def test__format_ndjson__should_return_all_meteringpoints_one_per_line(
+            self,
+            client: FlaskClient,
+            export_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.post(
+            path='/export',
+            json={'format': 'ndjson'},
+            headers={'Authorization': f'Bearer: {export_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+        assert res.mimetype == 'application/x-ndjson'
+
+        meteringpoints = [json.loads(line) for line in res.data.splitlines()]
+
+        assert [mp['gsrn'] for mp in meteringpoints] == \
+               ['gsrn0', 'gsrn1', 'gsrn2']
+        assert meteringpoints[1]['sector'] == 'DK2'
+        assert meteringpoints[1]['address']['street_name'] == 'street1'
+        assert meteringpoints[1]['technology']['tech_code'] == 'T010101'
+
+    def test__format_csv_with_filters__should_return_filtered_meteringpoints(  # noqa: E501
+            self,
+            client: FlaskClient,
+            export_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.post(
+            path='/export',
+            json={'format': 'csv', 'filters': {'sector': ['DK1']}},
+            headers={'Authorization': f'Bearer: {export_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+        assert res.mimetype == 'text/csv'
+
+        lines = res.data.decode().splitlines()
+
+        assert lines[0].startswith('gsrn,type,sector,street_code,')
+        assert lines[1].startswith('gsrn0,production,DK1,,street0,')
+        assert lines[1].endswith(',T010101,F01010101')
+        assert lines[2].startswith('gsrn2,')
+        assert len(lines) == 3
+
+    def test__token_without_export_scope__should_return_status_401(
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.post(
+            path='/export',
+            json={},
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 401
@@ -0,0 +1,148 @@
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+from prometheus_client import REGISTRY
+
+from meteringpoints_shared.db import db
+from meteringpoints_api.metrics import Phase, phase
+
+
+def get_sample(name: str, **labels: str) -> float:
+    """Return the current value of a sample (0 if it does not exist)."""
+
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestGetMetrics:
+    """Tests GET /metrics."""
+
+    def test__should_return_metrics_in_prometheus_text_format(
+            self,
+            session: db.Session,
+            client: FlaskClient,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.get('/metrics')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+        assert res.content_type.startswith('text/plain; version=0.0.4')
+
+        body = res.get_data(as_text=True)
+
+        assert '# TYPE meteringpoints_api_request_duration_seconds histogram' in body  # noqa: E501
+        assert '# TYPE meteringpoints_api_phase_duration_seconds histogram' in body  # noqa: E501
+        assert 'meteringpoints_db_pool_size{pool="primary"}' in body
+        assert 'meteringpoints_cache_hits_total{cache="details"}' in body
+        assert 'meteringpoints_cache_misses_total{cache="user_info"}' in body
+
+
+class TestRequestMetrics:
+    """Tests measuring requests to endpoints."""
+
+    def test__should_measure_request_and_its_phases_by_endpoint(
+            self,
+            session: db.Session,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        def _get_samples():
+            return {
+                'requests': get_sample(
+                    'meteringpoints_api_requests_total',
+                    method='GET', endpoint='/details', status='200'),
+                'duration': get_sample(
+                    'meteringpoints_api_request_duration_seconds_count',
+                    method='GET', endpoint='/details'),
+                **{
+                    p.value: get_sample(
+                        'meteringpoints_api_phase_duration_seconds_count',
+                        endpoint='/details', phase=p.value)
+                    for p in Phase
+                },
+            }
+
+        before = _get_samples()
+
+        # -- Act -------------------------------------------------------------
+
+        # GSRN is not cached, so it is looked up in the database
+        res = client.get(
+            path='/details',
+            query_string={'gsrn': str(uuid4())},
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        after = _get_samples()
+
+        assert res.status_code == 200
+        assert {k: after[k] - before[k] for k in after} == {
+            'requests': 1,
+            'duration': 1,
+            'auth': 1,
+            'db': 1,
+            'upstream': 0,
+            'serialize': 1,
+        }
+        assert get_sample(
+            'meteringpoints_api_requests_in_flight',
+            method='GET', endpoint='/details') == 0
+
+    def test__unauthorized__should_count_request_by_status(
+            self,
+            client: FlaskClient,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        before = get_sample(
+            'meteringpoints_api_requests_total',
+            method='GET', endpoint='/details', status='401')
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.get('/details', query_string={'gsrn': 'gsrn1'})
+
+        # -- Assert ----------------------------------------------------------
+
+        after = get_sample(
+            'meteringpoints_api_requests_total',
+            method='GET', endpoint='/details', status='401')
+
+        assert res.status_code == 401
+        assert after - before == 1
+
+    def test__phase__outside_request__should_not_measure_anything(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        def _count_phases() -> float:
+            return sum(
+                sample.value
+                for metric in REGISTRY.collect()
+                for sample in metric.samples
+                if sample.name == 'meteringpoints_api_phase_duration_seconds_count'  # noqa: E501
+            )
+
+        before = _count_phases()
+
+        # -- Act -------------------------------------------------------------
+
+        with phase(Phase.DB):
+            pass
+
+        # -- Assert ----------------------------------------------------------
+
+        assert _count_phases() == before
@@ -16,6 +16,10 @@ TEndpoint = Tuple[str, str, List[str], Optional[Dict[str, Any]]]
 @pytest.fixture(params=[
     # ('GET', '/list', ['meteringpoints.read'], None),   # This test scope could be usefull in the future.  # noqa: E501
     ('GET', '/details', ['meteringpoints.read'], {'gsrn': '12345'}),
+    ('POST', '/details/batch', ['meteringpoints.read'], None),
+    ('POST', '/search', ['meteringpoints.read'], None),
+    ('POST', '/export', ['meteringpoints.export'], None),
+    ('GET', '/statistics', ['meteringpoints.statistics'], None),
 ])
 def endpoint(request) -> TEndpoint:
     """Return (method, path, required scopes, query string)."""
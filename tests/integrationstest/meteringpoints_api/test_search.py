@@ -0,0 +1,218 @@
+import pytest
+from unittest.mock import patch
+from flask.testing import FlaskClient
+
+from origin.models.tech import TechnologyType
+from origin.models.meteringpoints import MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.controller import controller
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointTechnology,
+    DbMeteringPointDelegate,
+    DbTechnology,
+)
+
+
+@pytest.fixture(scope='function')
+def seed(session: db.Session, token_subject: str):
+    """Seed the database with MeteringPoints and delegates."""
+
+    session.begin()
+
+    session.add(DbTechnology(
+        tech_code='T010101',
+        fuel_code='F01010101',
+        type=TechnologyType.SOLAR,
+    ))
+
+    for i, sector in enumerate(('DK1', 'DK2', 'DK1')):
+        session.add(DbMeteringPoint(
+            gsrn=f'gsrn{i}',
+            type=MeteringPointType.PRODUCTION,
+            sector=sector,
+        ))
+        session.add(DbMeteringPointAddress(
+            gsrn=f'gsrn{i}',
+            street_name=f'street{i}',
+        ))
+        session.add(DbMeteringPointTechnology(
+            gsrn=f'gsrn{i}',
+            tech_code='T010101',
+            fuel_code='F01010101',
+        ))
+
+    # Subject has access to gsrn0 and gsrn1, but not gsrn2
+    session.add(DbMeteringPointDelegate(gsrn='gsrn0', subject=token_subject))
+    session.add(DbMeteringPointDelegate(gsrn='gsrn1', subject=token_subject))
+    session.add(DbMeteringPointDelegate(gsrn='gsrn2', subject='other'))
+
+    session.commit()
+
+
+@pytest.mark.usefixtures('seed')
+class TestSearchMeteringPoints:
+    """Tests POST /search."""
+
+    def test__no_filters__should_return_accessible_meteringpoints_with_details(  # noqa: E501
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.post(
+            path='/search',
+            json={},
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+
+        meteringpoints = res.json['meteringpoints']
+
+        assert [mp['gsrn'] for mp in meteringpoints] == ['gsrn0', 'gsrn1']
+        assert meteringpoints[0]['address']['street_name'] == 'street0'
+        assert meteringpoints[0]['technology']['type'] == 'solar'
+
+    def test__filters_and_ordering__should_return_filtered_and_ordered_meteringpoints(  # noqa: E501
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.post(
+            path='/search',
+            json={
+                'filters': {'sector': ['DK1', 'DK2']},
+                'ordering': {'key': 'sector', 'order': 'desc'},
+            },
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+        assert [mp['gsrn'] for mp in res.json['meteringpoints']] == \
+               ['gsrn1', 'gsrn0']
+
+    def test__limit_provided__should_return_pages_with_next_cursor(
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        headers = {'Authorization': f'Bearer: {valid_token_encoded}'}
+
+        # -- Act -------------------------------------------------------------
+
+        res1 = client.post(path='/search', json={'limit': 1}, headers=headers)
+
+        res2 = client.post(
+            path='/search',
+            json={'limit': 1, 'cursor': res1.json['next_cursor']},
+            headers=headers,
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert [mp['gsrn'] for mp in res1.json['meteringpoints']] == ['gsrn0']
+        assert [mp['gsrn'] for mp in res2.json['meteringpoints']] == ['gsrn1']
+        assert res1.json['next_cursor'] is not None
+        assert res2.json.get('next_cursor') is None
+
+    @pytest.mark.parametrize('body', (
+        {'limit': 0},
+        {'limit': 1000000},
+        {'cursor': 'invalid'},
+    ))
+    def test__invalid_limit_or_cursor__should_return_status_400(
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+            body: dict,
+    ):
+        """TODO."""
+
+        res = client.post(
+            path='/search',
+            json=body,
+            headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+        )
+
+        assert res.status_code == 400
+
+
+@pytest.mark.usefixtures('seed')
+class TestGetMeteringPointListFromDatabase:
+    """Tests GET /list when listing from the local database."""
+
+    def test__should_return_accessible_meteringpoints(
+            self,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('meteringpoints_api.endpoints.LIST_FROM_DATABASE', True):
+            res = client.get(
+                path='/list',
+                headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+            )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+        assert [mp['gsrn'] for mp in res.json['meteringpoints']] == \
+               ['gsrn0', 'gsrn1']
+
+
+@pytest.mark.usefixtures('seed')
+class TestSearchMeteringPointsFromSubjectReadModel:
+    """Tests POST /search when listing from the subject read model."""
+
+    def test__should_return_accessible_meteringpoints_with_details(
+            self,
+            session: db.Session,
+            client: FlaskClient,
+            valid_token_encoded: str,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        with patch.object(controller, 'subject_read_model', True):
+            controller.rebuild_subject_meteringpoints(session)
+            session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('meteringpoints_api.endpoints.SUBJECT_READ_MODEL_ENABLED', True):  # noqa: E501
+            res = client.post(
+                path='/search',
+                json={'limit': 1, 'ordering': {'key': 'gsrn', 'order': 'desc'}},  # noqa: E501
+                headers={'Authorization': f'Bearer: {valid_token_encoded}'},
+            )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+
+        meteringpoints = res.json['meteringpoints']
+
+        assert [mp['gsrn'] for mp in meteringpoints] == ['gsrn1']
+        assert meteringpoints[0]['address']['street_name'] == 'street1'
+        assert meteringpoints[0]['technology']['type'] == 'solar'
+        assert res.json['next_cursor'] is not None
@@ -0,0 +1,73 @@
+from flask.testing import FlaskClient
+from datetime import datetime, timezone, timedelta
+
+from origin.tokens import TokenEncoder
+from origin.models.auth import InternalToken
+from origin.models.tech import Technology, TechnologyType, TechnologyCodes
+from origin.models.meteringpoints import MeteringPoint, MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.controller import controller
+
+
+class TestGetMeteringPointStatistics:
+    """Tests GET /statistics."""
+
+    def test__should_return_number_of_meteringpoints_per_group(
+            self,
+            session: db.Session,
+            client: FlaskClient,
+            token_encoder: TokenEncoder[InternalToken],
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        controller.set_technologies(session=session, technologies=[
+            Technology(tech_code='T1', fuel_code='F1',
+                       type=TechnologyType.SOLAR),
+        ])
+        controller.set_meteringpoints(session=session, meteringpoints=[
+            MeteringPoint(gsrn=f'gsrn{i}', sector='DK1',
+                          type=MeteringPointType.PRODUCTION)
+            for i in range(3)
+        ] + [
+            MeteringPoint(gsrn='gsrn3'),
+        ])
+        controller.set_meteringpoint_technologies(session=session, technologies=[  # noqa: E501
+            (f'gsrn{i}', TechnologyCodes(tech_code='T1', fuel_code='F1'))
+            for i in range(2)
+        ])
+        session.commit()
+
+        token = token_encoder.encode(InternalToken(
+            issued=datetime.now(tz=timezone.utc),
+            expires=datetime.now(tz=timezone.utc) + timedelta(days=1),
+            actor='foo',
+            subject='bar',
+            scope=['meteringpoints.statistics'],
+        ))
+
+        # -- Act -------------------------------------------------------------
+
+        res = client.get(
+            path='/statistics',
+            headers={'Authorization': f'Bearer: {token}'},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert res.status_code == 200
+        assert res.json['total'] == 4
+
+        groups = {
+            (g.get('sector'), g.get('type'), g.get('technology_type')):
+            g['count']
+            for g in res.json['groups']
+        }
+
+        assert groups == {
+            ('DK1', 'production', 'solar'): 2,
+            ('DK1', 'production', None): 1,
+            (None, None, None): 1,
+        }
@@ -0,0 +1,135 @@
+import pytest
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.models import DbMeteringPointDelegate
+from meteringpoints_shared.queries import MeteringPointQuery, DelegateQuery
+from meteringpoints_api.details import details_cache, access_cache
+
+from benchmarks.__main__ import parse_args, run
+from benchmarks.scenarios import percentile, summarize
+
+
+class TestSummarize:
+    """Tests percentile() and summarize()."""
+
+    @pytest.mark.parametrize('p, expected', (
+        (1, 1),
+        (50, 50),
+        (99, 99),
+        (100, 100),
+    ))
+    def test__percentile__should_return_nearest_rank(self, p, expected):
+        """TODO."""
+
+        assert percentile(list(range(1, 101)), p) == expected
+
+    def test__summarize__should_return_latencies_in_milliseconds(self):
+        """TODO."""
+
+        result = summarize('name', [0.003, 0.001, 0.002], {'a': 'b'})
+
+        assert result.unit == 'ms'
+        assert result.labels == {'a': 'b'}
+        assert result.metrics['samples'] == 3
+        assert result.metrics['min'] == pytest.approx(1)
+        assert result.metrics['p50'] == pytest.approx(2)
+        assert result.metrics['max'] == pytest.approx(3)
+
+    def test__summarize__no_durations__should_return_zero_samples(self):
+        """TODO."""
+
+        assert summarize('name', []).metrics == {'samples': 0}
+
+
+@pytest.fixture(scope='function')
+def reset_caches():
+    """Leave the caches used by the benchmarks empty, with no hits."""
+
+    yield
+
+    for cache in (details_cache, access_cache):
+        cache.clear()
+        cache.hits = 0
+        cache.misses = 0
+
+
+@pytest.mark.usefixtures('reset_caches')
+class TestRun:
+    """Tests running the benchmarks with small volumes."""
+
+    def test__should_seed_database_and_return_results_for_all_scenarios(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        args = parse_args([
+            '--meteringpoints', '200',
+            '--subjects', '10',
+            '--delegates-per-meteringpoint', '2',
+            '--skew', '2',
+            '--requests', '5',
+            '--repeat', '2',
+            '--pages', '2',
+            '--page-size', '10',
+            '--messages', '20',
+            '--batch-size', '5',
+        ])
+
+        # -- Act -------------------------------------------------------------
+
+        report = run(args)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert {(r['name'], r['labels'].get('subject')) for r in report['results']} == {  # noqa: E501
+            ('details.cold', 'max'),
+            ('details.warm', 'max'),
+            ('list.first_page', 'max'),
+            ('list.next_page', 'max'),
+            ('details.cold', 'median'),
+            ('details.warm', 'median'),
+            ('list.first_page', 'median'),
+            ('list.next_page', 'median'),
+            ('consumer.dispatcher', None),
+            ('consumer.batch_dispatcher', None),
+        }
+
+        assert report['subjects']['max']['delegates'] > \
+               report['subjects']['median']['delegates']
+
+        for result in report['results']:
+            assert result['metrics'].get('samples', 1) > 0
+
+        # MeteringPoints created by the consumer are deleted again
+        assert MeteringPointQuery(session).count() == 200
+        assert not DelegateQuery(session) \
+            .filter(DbMeteringPointDelegate.gsrn.like('58%')) \
+            .count()
+
+    def test__database_already_seeded__should_exit_unless_reset(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        args = parse_args(['--meteringpoints', '10', '--scenario', 'list'])
+
+        run(args)
+
+        # -- Act + Assert ----------------------------------------------------
+
+        with pytest.raises(SystemExit):
+            run(args)
+
+        run(parse_args([
+            '--meteringpoints', '20',
+            '--scenario', 'list',
+            '--reset',
+        ]))
+
+        assert MeteringPointQuery(session).count() == 20
@@ -0,0 +1,339 @@
+import pytest
+from unittest.mock import patch
+from origin.bus import Message, messages as m
+from origin.models.common import Address
+from origin.models.tech import Technology, TechnologyType
+from origin.models.meteringpoints import MeteringPoint
+from origin.models.delegates import MeteringPointDelegate
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointDelegate,
+)
+from meteringpoints_shared.queries import DelegateQuery
+from meteringpoints_shared.technologies import technology_catalogue
+from meteringpoints_api.app import refresh_technology_catalogue
+from meteringpoints_api.listener import dispatcher
+from meteringpoints_api.details import (
+    details_cache,
+    access_cache,
+    get_meteringpoint_details,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start each test with empty caches."""
+
+    details_cache.clear()
+    access_cache.clear()
+
+
+@pytest.fixture(scope='function')
+def caching_enabled():
+    """Cache details and access decisions, as when listening on the bus."""
+
+    with patch.object(details_cache, 'ttl', 300), \
+            patch.object(access_cache, 'ttl', 300):
+        yield
+
+
+@pytest.fixture(scope='function')
+def seed(session: db.Session):
+    """Seed the database with a MeteringPoint and a delegate."""
+
+    session.begin()
+    session.add(DbMeteringPoint(gsrn='gsrn1', sector='DK1'))
+    session.add(DbMeteringPointAddress(gsrn='gsrn1', street_name='street1'))
+    session.add(DbMeteringPointDelegate(gsrn='gsrn1', subject='subject1'))
+    session.commit()
+
+
+def delete_all(session: db.Session):
+    """Delete all seeded rows from the database."""
+
+    session.query(DbMeteringPoint).delete()
+    session.query(DbMeteringPointAddress).delete()
+    session.query(DbMeteringPointDelegate).delete()
+    session.commit()
+
+
+@pytest.mark.usefixtures('seed')
+class TestGetMeteringPointDetailsDefaultConfig:
+    """
+    Tests get_meteringpoint_details() with the default configuration.
+
+    The API does not listen on the bus by default, so nothing would
+    invalidate cached details or access decisions.
+    """
+
+    def test__delegate_revoked__should_deny_access_immediately(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        session.query(DbMeteringPointDelegate).delete()
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert meteringpoint is None
+
+    def test__delegate_granted__should_allow_access_immediately(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        get_meteringpoint_details(
+            session=session,
+            subject='subject2',
+            gsrn='gsrn1',
+        )
+
+        session.add(DbMeteringPointDelegate(gsrn='gsrn1', subject='subject2'))
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject2',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert meteringpoint.gsrn == 'gsrn1'
+
+
+@pytest.mark.usefixtures('seed', 'caching_enabled')
+class TestGetMeteringPointDetails:
+    """Tests get_meteringpoint_details() when caching is enabled."""
+
+    def test__has_access__should_return_detached_meteringpoint(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert isinstance(meteringpoint, MeteringPoint)
+        assert meteringpoint.gsrn == 'gsrn1'
+        assert meteringpoint.sector == 'DK1'
+        assert meteringpoint.address.street_name == 'street1'
+
+    def test__has_no_access__should_return_none(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject2',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert meteringpoint is None
+
+    def test__cached__should_not_query_database_again(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        delete_all(session)
+
+        # -- Act -------------------------------------------------------------
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert meteringpoint.gsrn == 'gsrn1'
+        assert details_cache.hits == 1
+        assert access_cache.hits == 1
+
+    @pytest.mark.parametrize('msg', (
+        m.MeteringPointUpdate(meteringpoint=MeteringPoint(gsrn='gsrn1')),
+        m.MeteringPointAddressUpdate(gsrn='gsrn1', address=Address()),
+        m.MeteringPointTechnologyUpdate(gsrn='gsrn1', codes=None),
+        m.MeteringPointRemoved(gsrn='gsrn1'),
+    ))
+    def test__meteringpoint_changed__should_invalidate_cached_details(
+            self,
+            msg: Message,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        # -- Act -------------------------------------------------------------
+
+        dispatcher(msg)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert details_cache.get('gsrn1') is None
+
+    def test__delegate_revoked__should_invalidate_cached_access(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        session.query(DbMeteringPointDelegate).delete()
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        dispatcher(m.MeteringPointDelegateRevoked(
+            delegate=MeteringPointDelegate(gsrn='gsrn1', subject='subject1'),
+        ))
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert meteringpoint is None
+
+    def test__delegate_revoked_while_reading_access__should_not_cache_access(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        exists = DelegateQuery.exists
+
+        def _exists_then_revoked(query: DelegateQuery) -> bool:
+            has_access = exists(query)
+
+            # Revoked, and invalidated, after access has been read
+            session.query(DbMeteringPointDelegate).delete()
+            session.commit()
+
+            dispatcher(m.MeteringPointDelegateRevoked(
+                delegate=MeteringPointDelegate(
+                    gsrn='gsrn1', subject='subject1'),
+            ))
+
+            return has_access
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(DelegateQuery, 'exists', _exists_then_revoked):
+            in_flight = get_meteringpoint_details(
+                session=session,
+                subject='subject1',
+                gsrn='gsrn1',
+            )
+
+        meteringpoint = get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert in_flight.gsrn == 'gsrn1'
+        assert meteringpoint is None
+
+    def test__technology_updated__should_update_catalogue_and_clear_cached_details(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        get_meteringpoint_details(
+            session=session,
+            subject='subject1',
+            gsrn='gsrn1',
+        )
+
+        refresh_technology_catalogue()
+
+        technology = Technology(
+            tech_code='T1',
+            fuel_code='F1',
+            type=TechnologyType.WIND,
+        )
+
+        # -- Act -------------------------------------------------------------
+
+        dispatcher(m.TechnologyUpdate(technology=technology))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert details_cache.get('gsrn1') is None
+        assert technology_catalogue.get('T1', 'F1') == technology
@@ -0,0 +1,183 @@
+import pytest
+from unittest.mock import patch, Mock
+
+from meteringpoints_api.upstream import (
+    user_info_cache,
+    gsrn_cache,
+    get_user_info,
+    get_gsrn_by_tin,
+    invalidate_subject,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start and end each test with empty caches."""
+
+    user_info_cache.clear()
+    gsrn_cache.clear()
+    yield
+    user_info_cache.clear()
+    gsrn_cache.clear()
+
+
+@pytest.fixture(scope='function')
+def caching_enabled():
+    """Cache user infos and GSRN numbers, as when listening on the bus."""
+
+    with patch.object(user_info_cache, 'ttl', 300), \
+            patch.object(gsrn_cache, 'ttl', 60):
+        yield
+
+
+@pytest.fixture(scope='function')
+def context() -> Mock:
+    """Context of a client authorized as subject1."""
+
+    context = Mock()
+    context.token.subject = 'subject1'
+    context.internal_token_encoded = 'token'
+    return context
+
+
+def respond(json, on_request=None):
+    """Return a fake upstream GET, calling on_request() before responding."""
+
+    def _get(*args, **kwargs):
+        if on_request is not None:
+            on_request()
+
+        response = Mock()
+        response.json.return_value = json
+        return response
+
+    return _get
+
+
+class TestUpstreamDefaultConfig:
+    """Tests upstream caches with default configuration (no bus listener)."""
+
+    def test__should_not_cache_user_info_or_gsrn(self, context: Mock):
+        """TODO."""
+
+        with patch('meteringpoints_api.upstream.http_client') as http_client:
+            http_client.get.side_effect = respond([{'gsrn': 'gsrn1'}])
+
+            get_gsrn_by_tin('tin1', context)
+            get_gsrn_by_tin('tin1', context)
+
+        assert http_client.get.call_count == 2
+        assert not user_info_cache.enabled
+        assert not gsrn_cache.enabled
+
+
+@pytest.mark.usefixtures('caching_enabled')
+class TestInvalidateSubject:
+    """Tests invalidate_subject()."""
+
+    def test__should_invalidate_user_info_and_gsrn_for_subject_only(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        user_info_cache.set('subject1', {'tin': 'tin1'})
+        user_info_cache.set('subject2', {'tin': 'tin2'})
+        gsrn_cache.set('tin1', ['gsrn1'])
+        gsrn_cache.set('tin2', ['gsrn2'])
+
+        # -- Act -------------------------------------------------------------
+
+        invalidate_subject('subject1')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert user_info_cache.peek('subject1') is None
+        assert gsrn_cache.peek('tin1') is None
+        assert user_info_cache.peek('subject2') == {'tin': 'tin2'}
+        assert gsrn_cache.peek('tin2') == ['gsrn2']
+
+    def test__user_info_has_expired__should_invalidate_gsrn(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        with patch('meteringpoints_shared.cache.monotonic', return_value=0):
+            user_info_cache.set('subject1', {'tin': 'tin1'})
+
+        gsrn_cache.set('tin1', ['gsrn1'])
+
+        hits, misses = user_info_cache.hits, user_info_cache.misses
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('meteringpoints_shared.cache.monotonic', return_value=1e9):
+            invalidate_subject('subject1')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert gsrn_cache.peek('tin1') is None
+        assert user_info_cache.hits == hits
+        assert user_info_cache.misses == misses
+
+    def test__invalidated_while_reading_user_info__should_not_cache_user_info(  # noqa: E501
+            self,
+            context: Mock,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        def _revoked():
+            invalidate_subject('subject1')
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('meteringpoints_api.upstream.http_client') as http_client:
+            http_client.get.side_effect = respond({'tin': 'tin1'}, _revoked)
+            user_info = get_user_info(context)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert user_info == {'tin': 'tin1'}
+        assert user_info_cache.peek('subject1') is None
+
+    @pytest.mark.parametrize('user_info_cached', (True, False))
+    def test__invalidated_while_reading_gsrn__should_not_cache_gsrn(
+            self,
+            context: Mock,
+            user_info_cached: bool,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        if user_info_cached:
+            user_info_cache.set('subject1', {'tin': 'tin1'})
+
+        def _revoked():
+            invalidate_subject('subject1')
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('meteringpoints_api.upstream.http_client') as http_client:
+            http_client.get.side_effect = respond(
+                [{'gsrn': 'gsrn1'}], _revoked)
+
+            gsrn = get_gsrn_by_tin('tin1', context)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert gsrn == ['gsrn1']
+        assert gsrn_cache.peek('tin1') is None
+
+    def test__not_invalidated_while_reading__should_cache_gsrn(
+            self,
+            context: Mock,
+    ):
+        """TODO."""
+
+        with patch('meteringpoints_api.upstream.http_client') as http_client:
+            http_client.get.side_effect = respond([{'gsrn': 'gsrn1'}])
+            get_gsrn_by_tin('tin1', context)
+
+        assert gsrn_cache.peek('tin1') == ['gsrn1']
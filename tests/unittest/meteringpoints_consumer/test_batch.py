@@ -0,0 +1,272 @@
+from datetime import datetime, timedelta, timezone
+from origin.bus import messages as m
+from origin.models.common import Address
+from origin.models.tech import TechnologyCodes
+from origin.models.meteringpoints import MeteringPoint, MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.queries import (
+    MeteringPointQuery,
+    MeteringPointAddressQuery,
+    MeteringPointTechnologyQuery,
+)
+from meteringpoints_shared.bus import set_message_timestamp
+from meteringpoints_consumer.batch import MessageBatchDispatcher
+from meteringpoints_consumer.handlers import dispatcher, batch_dispatcher
+
+
+class TestMessageBatchDispatcher:
+    """Tests MessageBatchDispatcher."""
+
+    def test__consecutive_messages_of_same_type__should_dispatch_in_groups_and_preserve_order(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        calls = []
+
+        def handler(msgs, session):
+            calls.append(msgs)
+
+        dispatcher = MessageBatchDispatcher({
+            m.MeteringPointRemoved: handler,
+            m.MeteringPointAddressUpdate: handler,
+        })
+
+        msg1 = m.MeteringPointRemoved(gsrn='gsrn1')
+        msg2 = m.MeteringPointRemoved(gsrn='gsrn2')
+        msg3 = m.MeteringPointAddressUpdate(gsrn='gsrn1', address=None)
+        msg4 = m.MeteringPointTechnologyUpdate(gsrn='gsrn1', codes=None)
+        msg5 = m.MeteringPointRemoved(gsrn='gsrn3')
+
+        # -- Act -------------------------------------------------------------
+
+        dispatcher([msg1, msg2, msg3, msg4, msg5], session=session)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert calls == [[msg1, msg2], [msg3], [msg5]]
+
+
+class TestBatchHandlers:
+    """Tests batch handlers applied through batch_dispatcher."""
+
+    def test__meteringpoint_update__should_upsert_meteringpoints_and_associated_data(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        address = Address(street_name='street', city_name='city')
+        codes = TechnologyCodes(tech_code='T010101', fuel_code='F01010101')
+
+        messages = [
+            m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                gsrn='gsrn1',
+                type=MeteringPointType.CONSUMPTION,
+                sector='DK1',
+            )),
+            m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                gsrn='gsrn2',
+                type=MeteringPointType.PRODUCTION,
+                sector='DK2',
+                address=address,
+                technology=codes,
+            )),
+            m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                gsrn='gsrn1',
+                type=MeteringPointType.PRODUCTION,
+                sector='DK2',
+            )),
+        ]
+
+        # -- Act -------------------------------------------------------------
+
+        batch_dispatcher(messages)
+
+        # -- Assert ----------------------------------------------------------
+
+        gsrn1 = MeteringPointQuery(session).has_gsrn('gsrn1').one()
+        gsrn2 = MeteringPointQuery(session).has_gsrn('gsrn2').one()
+
+        # Last update for gsrn1 wins
+        assert gsrn1.type is MeteringPointType.PRODUCTION
+        assert gsrn1.sector == 'DK2'
+
+        assert gsrn2.type is MeteringPointType.PRODUCTION
+        assert gsrn2.sector == 'DK2'
+        assert gsrn2.address.street_name == 'street'
+        assert gsrn2.address.city_name == 'city'
+
+        assert not MeteringPointAddressQuery(session) \
+            .has_gsrn('gsrn1') \
+            .exists()
+
+        technology = MeteringPointTechnologyQuery(session) \
+            .has_gsrn('gsrn2') \
+            .one()
+
+        assert technology.tech_code == 'T010101'
+        assert technology.fuel_code == 'F01010101'
+
+    def test__meteringpoint_update__latest_omits_address_and_technology__should_keep_earlier_values_like_single_dispatch(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        address = Address(street_name='street', city_name='city')
+        codes = TechnologyCodes(tech_code='T010101', fuel_code='F01010101')
+
+        def updates(gsrn):
+            return [
+                m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                    gsrn=gsrn,
+                    type=MeteringPointType.PRODUCTION,
+                    sector='DK1',
+                    address=address,
+                    technology=codes,
+                )),
+                m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                    gsrn=gsrn,
+                    type=MeteringPointType.PRODUCTION,
+                    sector='DK2',
+                )),
+            ]
+
+        # -- Act -------------------------------------------------------------
+
+        batch_dispatcher(updates('gsrn1'))
+
+        for msg in updates('gsrn2'):
+            dispatcher(msg)
+
+        # -- Assert ----------------------------------------------------------
+
+        for gsrn in ('gsrn1', 'gsrn2'):
+            meteringpoint = MeteringPointQuery(session).has_gsrn(gsrn).one()
+
+            assert meteringpoint.sector == 'DK2'
+            assert meteringpoint.address.street_name == 'street'
+            assert meteringpoint.address.city_name == 'city'
+            assert meteringpoint.technology_codes.tech_code == 'T010101'
+            assert meteringpoint.technology_codes.fuel_code == 'F01010101'
+
+    def test__address_update__latest_address_is_none__should_delete_address(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        messages = [
+            m.MeteringPointAddressUpdate(
+                gsrn='gsrn1',
+                address=Address(street_name='street1'),
+            ),
+            m.MeteringPointAddressUpdate(
+                gsrn='gsrn2',
+                address=Address(street_name='street2'),
+            ),
+            m.MeteringPointAddressUpdate(
+                gsrn='gsrn1',
+                address=None,
+            ),
+        ]
+
+        # -- Act -------------------------------------------------------------
+
+        batch_dispatcher(messages)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert not MeteringPointAddressQuery(session) \
+            .has_gsrn('gsrn1') \
+            .exists()
+
+        address = MeteringPointAddressQuery(session) \
+            .has_gsrn('gsrn2') \
+            .one()
+
+        assert address.street_name == 'street2'
+
+    def test__address_update__reordered_and_replayed__should_apply_latest_published_address(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        t1 = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        t2 = t1 + timedelta(seconds=1)
+
+        msg1 = m.MeteringPointAddressUpdate(
+            gsrn='gsrn1',
+            address=Address(street_name='street1'),
+        )
+        msg2 = m.MeteringPointAddressUpdate(
+            gsrn='gsrn1',
+            address=Address(street_name='street2'),
+        )
+
+        set_message_timestamp(msg1, t1)
+        set_message_timestamp(msg2, t2)
+
+        # -- Act -------------------------------------------------------------
+
+        # Newer message received before older, in the same batch
+        batch_dispatcher([msg2, msg1])
+
+        # Older message replayed, in a batch of its own
+        batch_dispatcher([msg1])
+        dispatcher(msg1)
+
+        # -- Assert ----------------------------------------------------------
+
+        address = MeteringPointAddressQuery(session) \
+            .has_gsrn('gsrn1') \
+            .one()
+
+        assert address.street_name == 'street2'
+        assert address.event_timestamp == t2
+
+    def test__meteringpoint_removed__stale_update_redelivered__should_not_recreate_meteringpoint(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        t1 = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        t2 = t1 + timedelta(seconds=1)
+
+        update = m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+            gsrn='gsrn1',
+            sector='DK1',
+        ))
+        removed = m.MeteringPointRemoved(gsrn='gsrn1')
+
+        set_message_timestamp(update, t1)
+        set_message_timestamp(removed, t2)
+
+        # -- Act -------------------------------------------------------------
+
+        batch_dispatcher([update, removed])
+
+        # Update redelivered, in a batch of its own
+        batch_dispatcher([update])
+        dispatcher(update)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert not MeteringPointQuery(session).exists()
@@ -0,0 +1,197 @@
+import pytest
+from unittest.mock import Mock, patch
+from kafka import TopicPartition
+from prometheus_client import REGISTRY
+
+from origin.bus import messages as m
+from origin.models.meteringpoints import MeteringPoint
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.bus import BatchMessageBroker, batch_broker
+from meteringpoints_consumer.batch import MessageBatchDispatcher
+from meteringpoints_consumer.workers import PartitionedBatchHandler
+from meteringpoints_consumer.handlers import dispatcher, batch_dispatcher
+
+
+def get_sample(name: str, **labels: str) -> float:
+    """Return the current value of a sample (0 if it does not exist)."""
+
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def get_samples(message_type: str):
+    """Return current values of samples for a message type."""
+
+    return {
+        'messages': get_sample(
+            'meteringpoints_consumer_messages_total',
+            type=message_type),
+        'failed': get_sample(
+            'meteringpoints_consumer_messages_failed_total',
+            type=message_type),
+        'handled': get_sample(
+            'meteringpoints_consumer_handler_duration_seconds_count',
+            type=message_type),
+        'statements': get_sample(
+            'meteringpoints_consumer_statements_total',
+            type=message_type),
+    }
+
+
+class TestMessageMetrics:
+    """Tests measuring messages handled by dispatchers."""
+
+    def test__dispatcher__should_measure_message_by_type(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        before = get_samples('MeteringPointUpdate')
+
+        # -- Act -------------------------------------------------------------
+
+        dispatcher(m.MeteringPointUpdate(
+            meteringpoint=MeteringPoint(gsrn='gsrn1'),
+        ))
+
+        # -- Assert ----------------------------------------------------------
+
+        after = get_samples('MeteringPointUpdate')
+
+        assert after['messages'] - before['messages'] == 1
+        assert after['failed'] - before['failed'] == 0
+        assert after['handled'] - before['handled'] == 1
+        assert after['statements'] - before['statements'] > 0
+
+    def test__batch_dispatcher__should_measure_groups_of_messages_by_type(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        before_removed = get_samples('MeteringPointRemoved')
+        before_address = get_samples('MeteringPointAddressUpdate')
+
+        # -- Act -------------------------------------------------------------
+
+        batch_dispatcher([
+            m.MeteringPointRemoved(gsrn='gsrn1'),
+            m.MeteringPointRemoved(gsrn='gsrn2'),
+            m.MeteringPointAddressUpdate(gsrn='gsrn3', address=None),
+        ])
+
+        # -- Assert ----------------------------------------------------------
+
+        after_removed = get_samples('MeteringPointRemoved')
+        after_address = get_samples('MeteringPointAddressUpdate')
+
+        assert after_removed['messages'] - before_removed['messages'] == 2
+        assert after_removed['handled'] - before_removed['handled'] == 1
+        assert after_removed['statements'] > before_removed['statements']
+        assert after_address['messages'] - before_address['messages'] == 1
+        assert after_address['handled'] - before_address['handled'] == 1
+
+    def test__handler_fails__should_count_messages_as_failed(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        def handler(msgs, session):
+            raise RuntimeError('Failed')
+
+        uut = MessageBatchDispatcher({m.TechnologyRemoved: handler})
+
+        before = get_samples('TechnologyRemoved')
+
+        # -- Act -------------------------------------------------------------
+
+        with pytest.raises(RuntimeError):
+            uut([m.TechnologyRemoved(codes=None)])
+
+        # -- Assert ----------------------------------------------------------
+
+        after = get_samples('TechnologyRemoved')
+
+        assert after['messages'] - before['messages'] == 0
+        assert after['failed'] - before['failed'] == 1
+
+
+class TestBatchMetrics:
+    """Tests measuring batches handled by PartitionedBatchHandler."""
+
+    def test__should_measure_size_of_batch(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = PartitionedBatchHandler(handler=Mock(), workers=2)
+
+        count_before = get_sample('meteringpoints_consumer_batch_size_count')
+        sum_before = get_sample('meteringpoints_consumer_batch_size_sum')
+
+        # -- Act -------------------------------------------------------------
+
+        uut([m.MeteringPointRemoved(gsrn=f'gsrn{i}') for i in range(5)])
+
+        # -- Assert ----------------------------------------------------------
+
+        count_after = get_sample('meteringpoints_consumer_batch_size_count')
+        sum_after = get_sample('meteringpoints_consumer_batch_size_sum')
+
+        assert count_after - count_before == 1
+        assert sum_after - sum_before == 5
+
+
+class TestLag:
+    """Tests lag of partitions consumed by BatchMessageBroker."""
+
+    def test__update_lag__should_return_lag_of_fetched_partitions(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        fetched = TopicPartition('meteringpoints', 0)
+        not_fetched = TopicPartition('meteringpoints', 1)
+
+        consumer = Mock()
+        consumer.assignment.return_value = {fetched, not_fetched}
+        consumer.highwater.side_effect = \
+            lambda tp: 100 if tp == fetched else None
+        consumer.position.return_value = 60
+
+        uut = BatchMessageBroker(
+            group='group',
+            servers=[],
+            serializer=Mock(),
+        )
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(BatchMessageBroker, '_kafka_consumer', consumer):
+            uut.update_lag()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert uut.lag == {('meteringpoints', 0): 40}
+
+    def test__lag__should_be_exposed_as_metric(self):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(batch_broker, 'lag', {('meteringpoints', 3): 7}):
+            value = get_sample(
+                'meteringpoints_consumer_lag',
+                topic='meteringpoints', partition='3')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert value == 7
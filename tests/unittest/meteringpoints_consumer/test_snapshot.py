@@ -0,0 +1,292 @@
+import io
+import json
+import pytest
+from datetime import datetime, timezone
+from origin.models.common import Address
+from origin.models.tech import TechnologyCodes
+from origin.models.meteringpoints import MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.controller import controller
+from meteringpoints_shared.queries import (
+    MeteringPointQuery,
+    MeteringPointAddressQuery,
+    MeteringPointTechnologyQuery,
+    DelegateQuery,
+)
+from meteringpoints_consumer.snapshot import (
+    SnapshotRecord,
+    import_snapshot,
+    read_ndjson,
+    read_csv,
+    parse_args,
+)
+
+
+T1 = datetime(2021, 1, 1, tzinfo=timezone.utc)
+T2 = datetime(2021, 1, 2, tzinfo=timezone.utc)
+
+
+class TestReadSnapshot:
+    """Tests read_ndjson() and read_csv()."""
+
+    def test__read_ndjson__should_return_records(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        stream = io.StringIO('\n'.join((
+            json.dumps({
+                'gsrn': 'gsrn1',
+                'type': 'consumption',
+                'sector': 'DK1',
+                'address': {'street_name': 'street'},
+                'technology': {'tech_code': 'T', 'fuel_code': 'F'},
+                'subjects': ['subject1', 'subject2'],
+            }),
+            '',
+            json.dumps({'gsrn': 'gsrn2'}),
+        )))
+
+        # -- Act -------------------------------------------------------------
+
+        records = list(read_ndjson(stream))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert records == [
+            SnapshotRecord(
+                gsrn='gsrn1',
+                type=MeteringPointType.CONSUMPTION,
+                sector='DK1',
+                address=Address(street_name='street'),
+                technology=TechnologyCodes(tech_code='T', fuel_code='F'),
+                subjects=['subject1', 'subject2'],
+            ),
+            SnapshotRecord(gsrn='gsrn2'),
+        ]
+
+    def test__read_csv__should_return_records(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        stream = io.StringIO(
+            'gsrn,type,sector,street_name,tech_code,fuel_code,subjects\n'
+            'gsrn1,production,DK2,street,T,F,subject1;subject2\n'
+            'gsrn2,,,,,,\n'
+        )
+
+        # -- Act -------------------------------------------------------------
+
+        records = list(read_csv(stream))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert records == [
+            SnapshotRecord(
+                gsrn='gsrn1',
+                type=MeteringPointType.PRODUCTION,
+                sector='DK2',
+                address=Address(street_name='street'),
+                technology=TechnologyCodes(tech_code='T', fuel_code='F'),
+                subjects=['subject1', 'subject2'],
+            ),
+            SnapshotRecord(gsrn='gsrn2'),
+        ]
+
+    @pytest.mark.parametrize('path, expected_format', (
+        ('snapshot.ndjson', 'ndjson'),
+        ('snapshot.JSONL', 'ndjson'),
+        ('snapshot.csv', 'csv'),
+    ))
+    def test__parse_args__should_infer_format_from_extension(
+            self,
+            path: str,
+            expected_format: str,
+    ):
+        """TODO."""
+
+        assert parse_args([path]).format == expected_format
+
+
+class TestImportSnapshot:
+    """Tests import_snapshot()."""
+
+    def test__should_import_meteringpoints_and_associated_data(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        records = [
+            SnapshotRecord(
+                gsrn=f'gsrn{i}',
+                type=MeteringPointType.CONSUMPTION,
+                sector='DK1',
+                address=Address(street_name=f'street{i}'),
+                technology=TechnologyCodes(tech_code='T', fuel_code='F'),
+                subjects=[f'subject{i}', 'subject-all'],
+            )
+            for i in range(25)
+        ]
+
+        # -- Act -------------------------------------------------------------
+
+        result = import_snapshot(
+            session=session,
+            records=records,
+            timestamp=T1,
+            chunk_size=10,
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert result.records == 25
+        assert result.written == {
+            'meteringpoint': 25,
+            'meteringpoint_address': 25,
+            'meteringpoint_technology': 25,
+            'meteringpoint_delegate': 50,
+        }
+
+        meteringpoint = MeteringPointQuery(session).has_gsrn('gsrn7').one()
+
+        assert meteringpoint.type is MeteringPointType.CONSUMPTION
+        assert meteringpoint.sector == 'DK1'
+        assert meteringpoint.event_timestamp == T1
+        assert meteringpoint.address.street_name == 'street7'
+
+        assert MeteringPointTechnologyQuery(session) \
+            .has_gsrn('gsrn7') \
+            .one() \
+            .tech_code == 'T'
+
+        assert DelegateQuery(session).has_subject('subject-all').count() == 25
+        assert DelegateQuery(session).has_subject('subject7').count() == 1
+
+    def test__same_gsrn_occurs_more_than_once__last_occurrence_should_win(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        records = [
+            SnapshotRecord(
+                gsrn='gsrn1',
+                sector=f'sector{i}',
+                address=Address(street_name=f'street{i}'),
+                subjects=['subject1'],
+            )
+            for i in range(5)
+        ]
+
+        # -- Act -------------------------------------------------------------
+
+        import_snapshot(session=session, records=records, chunk_size=2)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert MeteringPointQuery(session).one().sector == 'sector4'
+        assert MeteringPointAddressQuery(session).one().street_name == 'street4'  # noqa: E501
+        assert DelegateQuery(session).count() == 1
+
+    def test__reimport__should_update_changed_rows_only(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        import_snapshot(session=session, records=[
+            SnapshotRecord(gsrn='gsrn1', sector='DK1'),
+            SnapshotRecord(gsrn='gsrn2', sector='DK1'),
+        ])
+
+        # -- Act -------------------------------------------------------------
+
+        result = import_snapshot(session=session, records=[
+            SnapshotRecord(gsrn='gsrn1', sector='DK1'),
+            SnapshotRecord(gsrn='gsrn2', sector='DK2'),
+        ])
+
+        # -- Assert ----------------------------------------------------------
+
+        assert result.written['meteringpoint'] == 1
+
+        assert {mp.gsrn: mp.sector for mp in MeteringPointQuery(session)} == {
+            'gsrn1': 'DK1',
+            'gsrn2': 'DK2',
+        }
+
+    def test__rows_updated_by_newer_events__should_not_be_overwritten(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        controller.set_meteringpoint_address(
+            session=session,
+            gsrn='gsrn1',
+            address=Address(street_name='newer'),
+            timestamp=T2,
+        )
+
+        # -- Act -------------------------------------------------------------
+
+        import_snapshot(session=session, timestamp=T1, records=[
+            SnapshotRecord(gsrn='gsrn1', address=Address(street_name='older')),
+        ])
+
+        # -- Assert ----------------------------------------------------------
+
+        assert MeteringPointAddressQuery(session).one().street_name == 'newer'
+
+    def test__rows_deleted_by_newer_events__should_not_be_recreated(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        codes = TechnologyCodes(tech_code='T', fuel_code='F')
+
+        controller.delete_meteringpoint_address(
+            session=session, gsrn='gsrn1', timestamp=T2)
+        controller.delete_meteringpoint_technology(
+            session=session, gsrn='gsrn1', timestamp=T2)
+        controller.delete_meteringpoint(
+            session=session, gsrn='gsrn2', timestamp=T2)
+
+        # -- Act -------------------------------------------------------------
+
+        result = import_snapshot(session=session, timestamp=T1, records=[
+            SnapshotRecord(
+                gsrn='gsrn1',
+                address=Address(street_name='older'),
+                technology=codes,
+            ),
+            SnapshotRecord(
+                gsrn='gsrn2',
+                address=Address(street_name='older'),
+                technology=codes,
+            ),
+        ])
+
+        # -- Assert ----------------------------------------------------------
+
+        assert result.written['meteringpoint'] == 1
+        assert result.written['meteringpoint_address'] == 0
+        assert result.written['meteringpoint_technology'] == 0
+
+        assert [mp.gsrn for mp in MeteringPointQuery(session)] == ['gsrn1']
+        assert not MeteringPointAddressQuery(session).exists()
+        assert not MeteringPointTechnologyQuery(session).exists()
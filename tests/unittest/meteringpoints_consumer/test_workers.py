@@ -0,0 +1,197 @@
+import pytest
+from threading import Lock
+from origin.bus import messages as m
+from origin.models.tech import Technology, TechnologyType
+from origin.models.delegates import MeteringPointDelegate
+from origin.models.meteringpoints import MeteringPoint
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.queries import (
+    MeteringPointQuery,
+    MeteringPointStatisticsQuery,
+)
+from meteringpoints_consumer.handlers import batch_dispatcher
+from meteringpoints_consumer.workers import (
+    PartitionedBatchHandler,
+    get_partition_key,
+    get_worker,
+)
+
+
+class TestGetPartitionKey:
+    """Tests get_partition_key()."""
+
+    @pytest.mark.parametrize('msg, expected_key', (
+        (m.MeteringPointUpdate(meteringpoint=MeteringPoint(gsrn='gsrn1')), 'gsrn1'),  # noqa: E501
+        (m.MeteringPointRemoved(gsrn='gsrn1'), 'gsrn1'),
+        (m.MeteringPointAddressUpdate(gsrn='gsrn1', address=None), 'gsrn1'),
+        (m.MeteringPointTechnologyUpdate(gsrn='gsrn1', codes=None), 'gsrn1'),
+        (m.MeteringPointDelegateGranted(delegate=MeteringPointDelegate(subject='s', gsrn='gsrn1')), 'gsrn1'),  # noqa: E501
+        (m.MeteringPointDelegateRevoked(delegate=MeteringPointDelegate(subject='s', gsrn='gsrn1')), 'gsrn1'),  # noqa: E501
+        (m.TechnologyUpdate(technology=Technology(tech_code='T', fuel_code='F', type=TechnologyType.SOLAR)), 'T/F'),  # noqa: E501
+    ))
+    def test__should_return_expected_key(self, msg, expected_key):
+        """TODO."""
+
+        assert get_partition_key(msg) == expected_key
+
+    def test__messages_with_same_gsrn__should_be_assigned_same_worker(self):
+        """TODO."""
+
+        msg1 = m.MeteringPointRemoved(gsrn='gsrn1')
+        msg2 = m.MeteringPointAddressUpdate(gsrn='gsrn1', address=None)
+
+        for workers in range(1, 10):
+            assert get_worker(msg1, workers) == get_worker(msg2, workers)
+
+
+class TestPartitionedBatchHandler:
+    """Tests PartitionedBatchHandler."""
+
+    def test__should_handle_all_messages_and_preserve_order_per_gsrn(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        handled = []
+        lock = Lock()
+
+        def handler(msgs):
+            with lock:
+                handled.append(msgs)
+
+        messages = [
+            m.MeteringPointAddressUpdate(gsrn=f'gsrn{i % 20}', address=None)
+            for i in range(200)
+        ]
+
+        uut = PartitionedBatchHandler(handler=handler, workers=4)
+
+        # -- Act -------------------------------------------------------------
+
+        uut(messages)
+        uut.shutdown()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert 1 < len(handled) <= 4
+        assert sorted(map(id, sum(handled, []))) == sorted(map(id, messages))
+
+        for partition in handled:
+            for gsrn in {msg.gsrn for msg in partition}:
+                assert [msg for msg in partition if msg.gsrn == gsrn] == \
+                       [msg for msg in messages if msg.gsrn == gsrn]
+
+    def test__worker_fails__should_raise_exception(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        def handler(msgs):
+            if any(msg.gsrn == 'gsrn3' for msg in msgs):
+                raise RuntimeError('Failed')
+
+        messages = [
+            m.MeteringPointRemoved(gsrn=f'gsrn{i}')
+            for i in range(20)
+        ]
+
+        uut = PartitionedBatchHandler(handler=handler, workers=4)
+
+        # -- Act + Assert ----------------------------------------------------
+
+        with pytest.raises(RuntimeError):
+            uut(messages)
+
+        uut.shutdown()
+
+    @pytest.mark.fresh_db
+    def test__batch_dispatcher__should_apply_last_update_per_gsrn(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        messages = [
+            m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                gsrn=f'gsrn{i % 10}',
+                sector=f'sector{i}',
+            ))
+            for i in range(100)
+        ]
+
+        uut = PartitionedBatchHandler(handler=batch_dispatcher, workers=4)
+
+        # -- Act -------------------------------------------------------------
+
+        uut(messages)
+        uut.shutdown()
+
+        # -- Assert ----------------------------------------------------------
+
+        meteringpoints = MeteringPointQuery(session).all()
+
+        assert len(meteringpoints) == 10
+        assert {mp.gsrn: mp.sector for mp in meteringpoints} == {
+            f'gsrn{i}': f'sector{90 + i}' for i in range(10)
+        }
+
+    @pytest.mark.fresh_db
+    def test__partition_fails__should_apply_redelivered_batch_once(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        messages = [
+            m.MeteringPointUpdate(meteringpoint=MeteringPoint(
+                gsrn=f'gsrn{i % 10}',
+                sector=f'sector{i % 3}',
+            ))
+            for i in range(30)
+        ]
+
+        messages.append(m.MeteringPointRemoved(gsrn='gsrn0'))
+        messages.append(m.MeteringPointRemoved(gsrn='gsrn3'))
+
+        def fail_gsrn3(msgs):
+            if any(msg.gsrn == 'gsrn3' for msg in msgs
+                   if isinstance(msg, m.MeteringPointRemoved)):
+                raise RuntimeError('Failed')
+            batch_dispatcher(msgs)
+
+        first_delivery = PartitionedBatchHandler(
+            handler=fail_gsrn3, workers=4)
+
+        redelivery = PartitionedBatchHandler(
+            handler=batch_dispatcher, workers=4)
+
+        # -- Act -------------------------------------------------------------
+
+        # Other partitions are committed, but the batch's offset is not
+        with pytest.raises(RuntimeError):
+            first_delivery(messages)
+
+        first_delivery.shutdown()
+
+        redelivery(messages)
+        redelivery.shutdown()
+
+        # -- Assert ----------------------------------------------------------
+
+        meteringpoints = MeteringPointQuery(session).all()
+        statistics = MeteringPointStatisticsQuery(session).is_not_empty()
+
+        assert {mp.gsrn: mp.sector for mp in meteringpoints} == {
+            f'gsrn{i}': f'sector{(20 + i) % 3}'
+            for i in (1, 2, 4, 5, 6, 7, 8, 9)
+        }
+        assert {row.sector: row.count for row in statistics} == {
+            'sector0': 3,
+            'sector1': 3,
+            'sector2': 2,
+        }
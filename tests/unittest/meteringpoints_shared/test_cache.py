@@ -0,0 +1,175 @@
+import pytest
+from unittest.mock import patch
+
+from meteringpoints_shared.cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests TTLCache."""
+
+    def test__get__key_is_cached__should_return_value_and_count_hit(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set('foo', 'bar')
+
+        assert cache.get('foo') == 'bar'
+        assert cache.hits == 1
+        assert cache.misses == 0
+
+    def test__get__key_is_not_cached__should_return_none_and_count_miss(
+            self,
+    ):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+
+        assert cache.get('foo') is None
+        assert cache.hits == 0
+        assert cache.misses == 1
+
+    def test__get__entry_has_expired__should_return_none(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+
+        with patch('meteringpoints_shared.cache.monotonic', return_value=0):
+            cache.set('foo', 'bar')
+
+        with patch('meteringpoints_shared.cache.monotonic', return_value=61):
+            assert cache.get('foo') is None
+
+        assert len(cache) == 0
+
+    def test__set__cache_is_full__should_evict_least_recently_used(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set('key1', 'value1')
+        cache.set('key2', 'value2')
+        cache.get('key1')
+        cache.set('key3', 'value3')
+
+        assert cache.get('key1') == 'value1'
+        assert cache.get('key2') is None
+        assert cache.get('key3') == 'value3'
+
+    @pytest.mark.parametrize('max_size, ttl', ((0, 60), (10, 0)))
+    def test__set__caching_is_disabled__should_not_cache(
+            self,
+            max_size: int,
+            ttl: int,
+    ):
+        """TODO."""
+
+        cache = TTLCache(max_size=max_size, ttl=ttl)
+        cache.set('foo', 'bar')
+
+        assert cache.get('foo') is None
+
+    def test__get_or_set__should_only_invoke_factory_on_miss(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return 'bar'
+
+        assert cache.get_or_set('foo', factory) == 'bar'
+        assert cache.get_or_set('foo', factory) == 'bar'
+        assert len(calls) == 1
+
+    def test__peek__entry_has_expired__should_return_value_and_not_count(
+            self,
+    ):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+
+        with patch('meteringpoints_shared.cache.monotonic', return_value=0):
+            cache.set('foo', 'bar')
+
+        with patch('meteringpoints_shared.cache.monotonic', return_value=61):
+            assert cache.peek('foo') == 'bar'
+
+        assert cache.peek('baz') is None
+        assert cache.hits == 0
+        assert cache.misses == 0
+
+    def test__invalidate__should_remove_only_key(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set('key1', 'value1')
+        cache.set('key2', 'value2')
+
+        cache.invalidate('key1')
+
+        assert cache.get('key1') is None
+        assert cache.get('key2') == 'value2'
+
+    def test__invalidate_where__should_remove_only_matching_keys(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set(('subject1', 'gsrn1'), True)
+        cache.set(('subject2', 'gsrn1'), False)
+        cache.set(('subject1', 'gsrn2'), True)
+
+        cache.invalidate_where(lambda key: key[1] == 'gsrn1')
+
+        assert len(cache) == 1
+        assert cache.get(('subject1', 'gsrn2')) is True
+
+    def test__get_or_set__key_invalidated_while_reading__should_return_but_not_cache_value(  # noqa: E501
+            self,
+    ):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+
+        def _read(key):
+            def _factory():
+                # Invalidated after reading, before the value is cached
+                cache.invalidate('key1')
+                return f'{key}-old'
+            return _factory
+
+        assert cache.get_or_set('key1', _read('key1')) == 'key1-old'
+        assert cache.get_or_set('key2', _read('key2')) == 'key2-old'
+
+        assert cache.get('key1') is None
+        assert cache.get('key2') == 'key2-old'
+        assert cache.get_or_set('key1', lambda: 'key1-new') == 'key1-new'
+        assert cache.get('key1') == 'key1-new'
+
+    def test__get_or_set__cleared_while_reading__should_not_cache_value(
+            self,
+    ):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+
+        def _factory():
+            cache.clear()
+            return 'value'
+
+        assert cache.get_or_set('key', _factory) == 'value'
+        assert cache.get('key') is None
+
+    def test__hit_rate__should_return_ratio_of_hits_to_lookups(self):
+        """TODO."""
+
+        cache = TTLCache(max_size=10, ttl=60)
+
+        assert cache.hit_rate == 0
+
+        cache.set('foo', 'bar')
+        cache.get('foo')
+        cache.get('foo')
+        cache.get('foo')
+        cache.get('baz')
+
+        assert cache.hit_rate == 0.75
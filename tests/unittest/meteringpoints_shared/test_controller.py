@@ -1,18 +1,24 @@
 import pytest
 from typing import Union
+from collections import Counter
+from sqlalchemy import text
+from datetime import datetime, timedelta, timezone
 
 from meteringpoints_shared.db import db
 from origin.models.common import Address
 from origin.models.tech import \
     Technology, TechnologyType, TechnologyCodes
+from origin.models.meteringpoints import MeteringPoint, MeteringPointType
 
-from meteringpoints_shared.controller import controller
+from meteringpoints_shared.controller import controller, DatabaseController
 from meteringpoints_shared.models import (
     DbMeteringPoint,
     DbTechnology,
     DbMeteringPointAddress,
     DbMeteringPointDelegate,
     DbMeteringPointTechnology,
+    DbMeteringPointStatistics,
+    DbSubjectMeteringPoint,
 )
 from meteringpoints_shared.queries import (
     MeteringPointQuery,
@@ -20,9 +26,15 @@ from meteringpoints_shared.queries import (
     MeteringPointTechnologyQuery,
     DelegateQuery,
     TechnologyQuery,
+    MeteringPointStatisticsQuery,
 )
 
 
+T1 = datetime(2021, 1, 1, tzinfo=timezone.utc)
+T2 = T1 + timedelta(seconds=1)
+T3 = T2 + timedelta(seconds=1)
+
+
 class TestDatabaseControllerMeteringPoints:
     """Tests methods regarding MeteringPoints."""
 
@@ -80,6 +92,182 @@ class TestDatabaseControllerMeteringPoints:
         assert meteringpoint.gsrn == 'gsrn321'
         assert db_meteringpoint.gsrn == 'gsrn321'
 
+    def test__set_meteringpoints__should_create_new_and_update_existing_meteringpoints(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbMeteringPoint(gsrn='gsrn1'))
+        session.add(DbMeteringPoint(gsrn='gsrn3'))
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.set_meteringpoints(
+            session=session,
+            meteringpoints=[
+                MeteringPoint(
+                    gsrn='gsrn1',
+                    type=MeteringPointType.PRODUCTION,
+                    sector='DK1',
+                ),
+                MeteringPoint(
+                    gsrn='gsrn2',
+                    type=MeteringPointType.CONSUMPTION,
+                    sector='DK2',
+                ),
+            ],
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        gsrn1 = MeteringPointQuery(session).has_gsrn('gsrn1').one()
+        gsrn2 = MeteringPointQuery(session).has_gsrn('gsrn2').one()
+        gsrn3 = MeteringPointQuery(session).has_gsrn('gsrn3').one()
+
+        assert gsrn1.type is MeteringPointType.PRODUCTION
+        assert gsrn1.sector == 'DK1'
+        assert gsrn2.type is MeteringPointType.CONSUMPTION
+        assert gsrn2.sector == 'DK2'
+        assert gsrn3.type is None
+        assert gsrn3.sector is None
+
+    def test__set_meteringpoints__with_timestamps__should_skip_stale_updates(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbMeteringPoint(gsrn='gsrn1', sector='DK1', event_timestamp=T2))  # noqa: E501
+        session.add(DbMeteringPoint(gsrn='gsrn2', sector='DK1', event_timestamp=T1))  # noqa: E501
+        session.add(DbMeteringPoint(gsrn='gsrn3', sector='DK1', event_timestamp=T2))  # noqa: E501
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.set_meteringpoints(
+            session=session,
+            meteringpoints=[
+                MeteringPoint(gsrn='gsrn1', sector='DK2'),
+                MeteringPoint(gsrn='gsrn2', sector='DK2'),
+                MeteringPoint(gsrn='gsrn3', sector='DK2'),
+            ],
+            timestamps={'gsrn1': T1, 'gsrn2': T2},
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        gsrn1 = MeteringPointQuery(session).has_gsrn('gsrn1').one()
+        gsrn2 = MeteringPointQuery(session).has_gsrn('gsrn2').one()
+        gsrn3 = MeteringPointQuery(session).has_gsrn('gsrn3').one()
+
+        # Stale update is skipped
+        assert gsrn1.sector == 'DK1'
+        assert gsrn1.event_timestamp == T2
+
+        # Newer update is applied
+        assert gsrn2.sector == 'DK2'
+        assert gsrn2.event_timestamp == T2
+
+        # Update without timestamp is applied, keeping the timestamp
+        assert gsrn3.sector == 'DK2'
+        assert gsrn3.event_timestamp == T2
+
+    def test__set_meteringpoints__unchanged_newer_update_then_older_change__should_skip_older_change(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        def set_sector(sector, timestamp):
+            session.begin()
+            controller.set_meteringpoints(
+                session=session,
+                meteringpoints=[MeteringPoint(gsrn='gsrn1', sector=sector)],
+                timestamps={'gsrn1': timestamp},
+            )
+            session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        set_sector('DK1', T1)
+        set_sector('DK1', T3)  # Unchanged, but newer
+        set_sector('DK2', T2)  # Changed, but older than the previous
+
+        # -- Assert ----------------------------------------------------------
+
+        meteringpoint = MeteringPointQuery(session).has_gsrn('gsrn1').one()
+
+        assert meteringpoint.sector == 'DK1'
+        assert meteringpoint.event_timestamp == T3
+
+    def test__set_meteringpoints__data_is_unchanged__should_not_update_rows(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbMeteringPoint(gsrn='gsrn1', sector='DK1'))
+        session.add(DbMeteringPoint(gsrn='gsrn2', sector='DK1'))
+        session.commit()
+
+        def get_xmin():
+            return dict(session.execute(text(
+                'SELECT gsrn, xmin::text FROM meteringpoint')).all())
+
+        xmin_before = get_xmin()
+        written_before = controller.write_counter.written['meteringpoint']
+        skipped_before = controller.write_counter.skipped['meteringpoint']
+
+        # -- Act -------------------------------------------------------------
+
+        session.commit()
+        session.begin()
+
+        controller.set_meteringpoints(
+            session=session,
+            meteringpoints=[
+                MeteringPoint(gsrn='gsrn1', sector='DK1'),
+                MeteringPoint(gsrn='gsrn2', sector='DK2'),
+                MeteringPoint(gsrn='gsrn3', sector='DK3'),
+            ],
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        xmin_after = get_xmin()
+
+        # Unchanged row is not updated (same row version)
+        assert xmin_after['gsrn1'] == xmin_before['gsrn1']
+        assert xmin_after['gsrn2'] != xmin_before['gsrn2']
+
+        assert controller.write_counter.written['meteringpoint'] == \
+               written_before + 2
+        assert controller.write_counter.skipped['meteringpoint'] == \
+               skipped_before + 1
+
     def test__delete_meteringpoint__should_delete_meteringpoint_and_associated_data(  # noqa: E501
             self,
             session: db.Session,
@@ -151,6 +339,112 @@ class TestDatabaseControllerMeteringPoints:
             .has_gsrn('gsrn2') \
             .exists()
 
+    def test__delete_meteringpoints__should_delete_all_provided_meteringpoints_and_associated_data(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+
+        for gsrn in ('gsrn1', 'gsrn2', 'gsrn3'):
+            session.add(DbMeteringPoint(gsrn=gsrn))
+            session.add(DbMeteringPointAddress(gsrn=gsrn))
+            session.add(DbMeteringPointTechnology(gsrn=gsrn))
+            session.add(DbMeteringPointDelegate(gsrn=gsrn, subject='subject'))
+
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.delete_meteringpoints(
+            session=session,
+            gsrn=['gsrn1', 'gsrn2'],
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        for query in (MeteringPointQuery,
+                      MeteringPointAddressQuery,
+                      MeteringPointTechnologyQuery,
+                      DelegateQuery):
+
+            assert not query(session).has_gsrn('gsrn1').exists()
+            assert not query(session).has_gsrn('gsrn2').exists()
+            assert query(session).has_gsrn('gsrn3').exists()
+
+    def test__set_meteringpoints__meteringpoint_deleted_by_newer_event__should_not_recreate_meteringpoint(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+
+        controller.set_meteringpoints(
+            session=session,
+            meteringpoints=[
+                MeteringPoint(gsrn='gsrn1', sector='DK1'),
+                MeteringPoint(gsrn='gsrn2', sector='DK1'),
+            ],
+            timestamps={'gsrn1': T1, 'gsrn2': T1},
+        )
+
+        controller.set_meteringpoint_address(
+            session=session,
+            gsrn='gsrn1',
+            address=Address(street_name='street'),
+            timestamp=T1,
+        )
+
+        controller.delete_meteringpoints(
+            session=session,
+            gsrn=['gsrn1', 'gsrn2'],
+            timestamps={'gsrn1': T2, 'gsrn2': T2},
+        )
+
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        # Stale updates redelivered after the delete, and a newer update
+        controller.set_meteringpoints(
+            session=session,
+            meteringpoints=[
+                MeteringPoint(gsrn='gsrn1', sector='stale'),
+                MeteringPoint(gsrn='gsrn2', sector='newer'),
+            ],
+            timestamps={'gsrn1': T1, 'gsrn2': T3},
+        )
+
+        controller.set_meteringpoint_address(
+            session=session,
+            gsrn='gsrn1',
+            address=Address(street_name='stale'),
+            timestamp=T1,
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        meteringpoints = MeteringPointQuery(session).all()
+
+        assert [(mp.gsrn, mp.sector) for mp in meteringpoints] == \
+               [('gsrn2', 'newer')]
+
+        assert not MeteringPointAddressQuery(session).exists()
+
 
 class TestDatabaseControllerMeteringPointAddress:
     """Tests methods regarding MeteringPointAddresses."""
@@ -338,6 +632,85 @@ class TestDatabaseControllerMeteringPointAddress:
             .has_gsrn('gsrn2') \
             .exists()
 
+    def test__delete_meteringpoint_addresses__with_timestamps__should_skip_stale_deletes(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbMeteringPointAddress(gsrn='gsrn1', event_timestamp=T2))
+        session.add(DbMeteringPointAddress(gsrn='gsrn2', event_timestamp=T1))
+        session.add(DbMeteringPointAddress(gsrn='gsrn3', event_timestamp=T2))
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.delete_meteringpoint_addresses(
+            session=session,
+            gsrn=['gsrn1', 'gsrn2', 'gsrn3'],
+            timestamps={'gsrn1': T1, 'gsrn2': T2},
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        remaining = MeteringPointAddressQuery(session).all()
+
+        assert [address.gsrn for address in remaining] == ['gsrn1']
+
+    def test__set_meteringpoint_addresses__address_deleted_by_newer_event__should_not_recreate_address(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbMeteringPointAddress(gsrn='gsrn1', event_timestamp=T1))
+        session.add(DbMeteringPointAddress(gsrn='gsrn2', event_timestamp=T1))
+        session.commit()
+
+        session.begin()
+
+        controller.delete_meteringpoint_addresses(
+            session=session,
+            gsrn=['gsrn1', 'gsrn2'],
+            timestamps={'gsrn1': T2, 'gsrn2': T2},
+        )
+
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        # Stale update replayed after the delete, and a newer update
+        controller.set_meteringpoint_addresses(
+            session=session,
+            addresses=[
+                ('gsrn1', Address(street_name='stale')),
+                ('gsrn2', Address(street_name='newer')),
+            ],
+            timestamps={'gsrn1': T1, 'gsrn2': T3},
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        remaining = MeteringPointAddressQuery(session).all()
+
+        assert [address.gsrn for address in remaining] == ['gsrn2']
+        assert remaining[0].street_name == 'newer'
+        assert remaining[0].event_timestamp == T3
+
 
 class TestDatabaseControllerMeteringPointDelegate:
     """Tests methods regarding MeteringPointDelegates."""
@@ -400,6 +773,43 @@ class TestDatabaseControllerMeteringPointDelegate:
         assert delegate.gsrn == 'gsrn1'
         assert delegate.subject == 'subject1'
 
+    def test__grant_meteringpoint_delegates__some_delegates_already_exists__should_create_missing_delegates(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbMeteringPointDelegate(gsrn='gsrn1', subject='subject1'))
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.grant_meteringpoint_delegates(
+            session=session,
+            delegates=[
+                ('gsrn1', 'subject1'),
+                ('gsrn1', 'subject2'),
+                ('gsrn2', 'subject1'),
+            ],
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        delegates = DelegateQuery(session).all()
+
+        assert sorted((d.gsrn, d.subject) for d in delegates) == [
+            ('gsrn1', 'subject1'),
+            ('gsrn1', 'subject2'),
+            ('gsrn2', 'subject1'),
+        ]
+
     # -- revoke_meteringpoint_delegate() -------------------------------------
 
     def test__revoke_meteringpoint_delegate__should_delete_delegate(
@@ -615,6 +1025,54 @@ class TestDatabaseControllerMeteringPointTechnology:
             .has_gsrn('gsrn2') \
             .exists()
 
+    def test__set_meteringpoint_technology__technology_deleted_by_newer_event__should_not_recreate_technology(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        codes = TechnologyCodes(tech_code='T010101', fuel_code='F01010101')
+
+        session.begin()
+        session.add(DbMeteringPointTechnology(
+            gsrn='gsrn1',
+            tech_code=codes.tech_code,
+            fuel_code=codes.fuel_code,
+            event_timestamp=T1,
+        ))
+        session.commit()
+
+        session.begin()
+
+        controller.delete_meteringpoint_technology(
+            session=session,
+            gsrn='gsrn1',
+            timestamp=T2,
+        )
+
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.set_meteringpoint_technology(
+            session=session,
+            gsrn='gsrn1',
+            technology=codes,
+            timestamp=T1,
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert not MeteringPointTechnologyQuery(session) \
+            .has_gsrn('gsrn1') \
+            .exists()
+
 
 class TestDatabaseControllerTechnology:
     """Tests methods regarding Technologies."""
@@ -674,6 +1132,59 @@ class TestDatabaseControllerTechnology:
         assert db_technology.tech_code == 'T010101'
         assert db_technology.fuel_code == 'F01010101'
 
+    def test__set_technologies__should_create_new_and_update_existing_technologies(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.begin()
+        session.add(DbTechnology(
+            tech_code='T010101',
+            fuel_code='F01010101',
+            type=TechnologyType.COAL,
+        ))
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        session.begin()
+
+        controller.set_technologies(
+            session=session,
+            technologies=[
+                Technology(
+                    tech_code='T010101',
+                    fuel_code='F01010101',
+                    type=TechnologyType.SOLAR,
+                ),
+                Technology(
+                    tech_code='T020202',
+                    fuel_code='F02020202',
+                    type=TechnologyType.WIND,
+                ),
+            ],
+        )
+
+        session.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        technology1 = TechnologyQuery(session) \
+            .has_tech_code('T010101') \
+            .has_fuel_code('F01010101') \
+            .one()
+
+        technology2 = TechnologyQuery(session) \
+            .has_tech_code('T020202') \
+            .has_fuel_code('F02020202') \
+            .one()
+
+        assert technology1.type is TechnologyType.SOLAR
+        assert technology2.type is TechnologyType.WIND
+
     # -- delete_technology() -------------------------------------------------
 
     def test__delete_technology__should_delete_technology(
@@ -712,3 +1223,309 @@ class TestDatabaseControllerTechnology:
             .has_tech_code('T020202') \
             .has_fuel_code('F02020202') \
             .exists()
+
+
+class TestDatabaseControllerStatistics:
+    """Tests maintaining meteringpoint_statistics."""
+
+    def get_statistics(self, session: db.Session):
+        """Return non-empty groups by sector, type and technology type."""
+
+        return {
+            (
+                row.sector,
+                row.type,
+                row.technology_type.name if row.technology_type else '',
+            ): row.count
+            for row in MeteringPointStatisticsQuery(session).is_not_empty()
+        }
+
+    def get_counts(self, session: db.Session):
+        """Return non-empty groups in meteringpoint_statistics."""
+
+        counts = Counter()
+
+        for row in session.query(DbMeteringPointStatistics):
+            key = (row.sector, row.type, row.tech_code, row.fuel_code)
+            counts[key] += row.count
+
+        return {key: count for key, count in counts.items() if count}
+
+    def test__changes__should_be_reflected_incrementally_in_statistics(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        solar = Technology(
+            tech_code='T1', fuel_code='F1', type=TechnologyType.SOLAR)
+        wind = Technology(
+            tech_code='T1', fuel_code='F1', type=TechnologyType.WIND)
+
+        def _assert(expected):
+            assert self.get_statistics(session) == expected
+            assert self.get_counts(session) == \
+                   controller.count_meteringpoints_by_group(session)
+
+        # -- MeteringPoints created ------------------------------------------
+
+        controller.set_technologies(session=session, technologies=[solar])
+
+        controller.set_meteringpoints(session=session, meteringpoints=[
+            MeteringPoint(gsrn='gsrn1', sector='DK1',
+                          type=MeteringPointType.PRODUCTION),
+            MeteringPoint(gsrn='gsrn2', sector='DK1',
+                          type=MeteringPointType.PRODUCTION),
+            MeteringPoint(gsrn='gsrn3', sector='DK2',
+                          type=MeteringPointType.CONSUMPTION),
+        ])
+
+        controller.get_or_create_meteringpoint(session=session, gsrn='gsrn4')
+
+        _assert({
+            ('DK1', 'PRODUCTION', ''): 2,
+            ('DK2', 'CONSUMPTION', ''): 1,
+            ('', '', ''): 1,
+        })
+
+        # -- MeteringPoints updated ------------------------------------------
+
+        controller.set_meteringpoints(session=session, meteringpoints=[
+            MeteringPoint(gsrn='gsrn3', sector='DK1',
+                          type=MeteringPointType.CONSUMPTION),
+        ])
+        controller.set_meteringpoint_technologies(session=session, technologies=[  # noqa: E501
+            ('gsrn1', TechnologyCodes(tech_code='T1', fuel_code='F1')),
+            ('gsrn2', TechnologyCodes(tech_code='T1', fuel_code='F1')),
+        ])
+
+        _assert({
+            ('DK1', 'PRODUCTION', 'SOLAR'): 2,
+            ('DK1', 'CONSUMPTION', ''): 1,
+            ('', '', ''): 1,
+        })
+
+        # -- Technology changed ----------------------------------------------
+
+        controller.set_technologies(session=session, technologies=[wind])
+
+        _assert({
+            ('DK1', 'PRODUCTION', 'WIND'): 2,
+            ('DK1', 'CONSUMPTION', ''): 1,
+            ('', '', ''): 1,
+        })
+
+        # -- Technologies removed --------------------------------------------
+
+        controller.delete_meteringpoint_technology(
+            session=session, gsrn='gsrn1')
+        controller.delete_technology(
+            session=session, tech_code='T1', fuel_code='F1')
+
+        _assert({
+            ('DK1', 'PRODUCTION', ''): 2,
+            ('DK1', 'CONSUMPTION', ''): 1,
+            ('', '', ''): 1,
+        })
+
+        # -- MeteringPoints removed ------------------------------------------
+
+        controller.delete_meteringpoints(
+            session=session, gsrn=['gsrn1', 'gsrn4'])
+
+        _assert({
+            ('DK1', 'PRODUCTION', ''): 1,
+            ('DK1', 'CONSUMPTION', ''): 1,
+        })
+
+    def test__rebuild_statistics__should_recount_all_meteringpoints(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.add(DbMeteringPoint(gsrn='gsrn1', sector='DK1'))
+        session.add(DbMeteringPoint(gsrn='gsrn2', sector='DK1'))
+        session.add(DbMeteringPointStatistics(
+            sector='DK2', type='', tech_code='', fuel_code='', slot=0,
+            count=5))
+        session.flush()
+
+        # -- Act -------------------------------------------------------------
+
+        controller.rebuild_statistics(session)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert self.get_statistics(session) == {('DK1', '', ''): 2}
+
+    @pytest.mark.fresh_db
+    def test__technology_changed_while_meteringpoint_technology_is_set_concurrently__should_count_meteringpoint_once(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        controller.set_technologies(session=session, technologies=[
+            Technology(tech_code='T1', fuel_code='F1',
+                       type=TechnologyType.SOLAR),
+        ])
+        controller.set_meteringpoints(session=session, meteringpoints=[
+            MeteringPoint(gsrn='gsrn1', sector='DK1',
+                          type=MeteringPointType.PRODUCTION),
+        ])
+        session.commit()
+
+        # -- Act -------------------------------------------------------------
+
+        # Interleaved like workers handling MeteringPointTechnologyUpdate
+        # and TechnologyUpdate in separate transactions
+        with db.make_session() as session1, db.make_session() as session2:
+            controller.set_meteringpoint_technology(
+                session=session1,
+                gsrn='gsrn1',
+                technology=TechnologyCodes(tech_code='T1', fuel_code='F1'),
+            )
+
+            controller.set_technologies(session=session2, technologies=[
+                Technology(tech_code='T1', fuel_code='F1',
+                           type=TechnologyType.WIND),
+            ])
+
+            session2.commit()
+            session1.commit()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert self.get_statistics(session) == {
+            ('DK1', 'PRODUCTION', 'WIND'): 1,
+        }
+
+
+class TestDatabaseControllerSubjectReadModel:
+    """Tests maintaining DbSubjectMeteringPoint."""
+
+    def get_read_model(self, session: db.Session):
+        """Return (subject, gsrn, sector, street_name, tech_code) rows."""
+
+        return {
+            (r.subject, r.gsrn, r.sector, r.street_name, r.tech_code)
+            for r in session.query(DbSubjectMeteringPoint)
+        }
+
+    def test__disabled__should_not_maintain_read_model(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        controller.grant_meteringpoint_delegate(
+            session=session, gsrn='gsrn1', subject='subject1')
+        controller.get_or_create_meteringpoint(
+            session=session, gsrn='gsrn1')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert self.get_read_model(session) == set()
+
+    def test__changes__should_be_reflected_in_read_model(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        uut = DatabaseController(subject_read_model=True)
+
+        # -- Delegate granted before MeteringPoint exists --------------------
+
+        uut.grant_meteringpoint_delegates(session=session, delegates=[
+            ('gsrn1', 'subject1'),
+            ('gsrn1', 'subject2'),
+        ])
+
+        assert self.get_read_model(session) == set()
+
+        # -- MeteringPoint, address and technology created -------------------
+
+        uut.set_meteringpoints(session=session, meteringpoints=[
+            MeteringPoint(gsrn='gsrn1', sector='DK1'),
+            MeteringPoint(gsrn='gsrn2', sector='DK2'),
+        ])
+        uut.set_meteringpoint_address(
+            session=session,
+            gsrn='gsrn1',
+            address=Address(street_name='street1'),
+        )
+        uut.set_meteringpoint_technology(
+            session=session,
+            gsrn='gsrn1',
+            technology=TechnologyCodes(tech_code='T1', fuel_code='F1'),
+        )
+
+        assert self.get_read_model(session) == {
+            ('subject1', 'gsrn1', 'DK1', 'street1', 'T1'),
+            ('subject2', 'gsrn1', 'DK1', 'street1', 'T1'),
+        }
+
+        # -- Delegates changed -----------------------------------------------
+
+        uut.grant_meteringpoint_delegate(
+            session=session, gsrn='gsrn2', subject='subject1')
+        uut.revoke_meteringpoint_delegate(
+            session=session, gsrn='gsrn1', subject='subject2')
+
+        assert self.get_read_model(session) == {
+            ('subject1', 'gsrn1', 'DK1', 'street1', 'T1'),
+            ('subject1', 'gsrn2', 'DK2', None, None),
+        }
+
+        # -- Address and technology deleted ----------------------------------
+
+        uut.delete_meteringpoint_address(session=session, gsrn='gsrn1')
+        uut.delete_meteringpoint_technologies(session=session, gsrn=['gsrn1'])
+
+        assert self.get_read_model(session) == {
+            ('subject1', 'gsrn1', 'DK1', None, None),
+            ('subject1', 'gsrn2', 'DK2', None, None),
+        }
+
+        # -- MeteringPoint deleted -------------------------------------------
+
+        uut.delete_meteringpoint(session=session, gsrn='gsrn1')
+
+        assert self.get_read_model(session) == {
+            ('subject1', 'gsrn2', 'DK2', None, None),
+        }
+
+    def test__rebuild_subject_meteringpoints__should_copy_all_accessible_meteringpoints(  # noqa: E501
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.add(DbMeteringPoint(gsrn='gsrn1', sector='DK1'))
+        session.add(DbMeteringPoint(gsrn='gsrn2', sector='DK2'))
+        session.add(DbMeteringPointDelegate(gsrn='gsrn1', subject='subject1'))
+        session.add(DbMeteringPointDelegate(gsrn='gsrn3', subject='subject1'))
+        session.add(DbSubjectMeteringPoint(gsrn='gsrn9', subject='subject9'))
+        session.flush()
+
+        uut = DatabaseController(subject_read_model=True)
+
+        # -- Act -------------------------------------------------------------
+
+        uut.rebuild_subject_meteringpoints(session)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert self.get_read_model(session) == {
+            ('subject1', 'gsrn1', 'DK1', None, None),
+        }
@@ -0,0 +1,445 @@
+import pytest
+import logging
+from threading import Thread
+from unittest.mock import patch
+from sqlalchemy import text
+from sqlalchemy.exc import InternalError, OperationalError
+
+from meteringpoints_shared.db import (
+    db,
+    PoolProfile,
+    PooledSqlEngine,
+    ReplicaSqlEngine,
+    SqlProfiler,
+    StatementCounter,
+    TimedQueuePool,
+)
+
+
+PROFILE = PoolProfile(
+    size=2,
+    max_overflow=1,
+    timeout=5,
+    pre_ping=False,
+    recycle=60,
+)
+
+
+class TestPooledSqlEngine:
+    """Tests PooledSqlEngine."""
+
+    def test__settings__should_reflect_pool_profile(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = PooledSqlEngine(uri='', pool=PROFILE)
+
+        # -- Act -------------------------------------------------------------
+
+        settings = uut.settings
+
+        # -- Assert ----------------------------------------------------------
+
+        assert settings['poolclass'] is TimedQueuePool
+        assert settings['pool_size'] == 2
+        assert settings['max_overflow'] == 1
+        assert settings['pool_timeout'] == 5
+        assert settings['pool_pre_ping'] is False
+        assert settings['pool_recycle'] == 60
+
+    def test__use_pool__should_recreate_engine_with_new_pool_settings(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = PooledSqlEngine(uri=db.uri, pool=PROFILE)
+        engine_before = uut.engine
+
+        # -- Act -------------------------------------------------------------
+
+        uut.use_pool(PoolProfile(
+            size=3,
+            max_overflow=0,
+            timeout=5,
+            pre_ping=True,
+            recycle=-1,
+        ))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert uut.engine is not engine_before
+        assert uut.pool_stats().size == 3
+
+    def test__pool_stats__should_count_connections_and_checkouts(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = PooledSqlEngine(uri=db.uri, pool=PROFILE)
+
+        # -- Act -------------------------------------------------------------
+
+        with uut.engine.connect() as conn1:
+            conn1.execute(text('SELECT 1'))
+
+            with uut.engine.connect() as conn2:
+                conn2.execute(text('SELECT 1'))
+
+                with uut.engine.connect() as conn3:
+                    conn3.execute(text('SELECT 1'))
+
+                    stats_during = uut.pool_stats()
+
+        stats_after = uut.pool_stats()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert stats_during.size == 2
+        assert stats_during.checked_out == 3
+        assert stats_during.overflow == 1
+        assert stats_during.checkouts == 3
+        assert stats_during.wait_time >= 0
+
+        assert stats_after.checked_out == 0
+        assert stats_after.checked_in == 2
+        assert stats_after.overflow == 0
+        assert stats_after.checkouts == 3
+
+
+class TestReplicaSqlEngine:
+    """Tests ReplicaSqlEngine."""
+
+    def create_uut(self, uri: str, max_lag: float = 5) -> ReplicaSqlEngine:
+        """Create a ReplicaSqlEngine with the primary being db."""
+
+        return ReplicaSqlEngine(
+            uri=uri,
+            pool=PROFILE,
+            primary=db,
+            max_lag=max_lag,
+            check_interval=60,
+        )
+
+    def test__no_replica_configured__should_use_primary(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri='')
+
+        # -- Act -------------------------------------------------------------
+
+        engine = uut.engine
+
+        # -- Assert ----------------------------------------------------------
+
+        assert engine.pool is db.engine.pool
+
+    def test__replica_is_fresh__should_use_replica(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri=db.uri)
+
+        # -- Act -------------------------------------------------------------
+
+        engine = uut.engine
+
+        # -- Assert ----------------------------------------------------------
+
+        assert engine.pool is uut.replica_engine.pool
+        assert engine.pool is not db.engine.pool
+
+    def test__replica_lags_behind__should_fall_back_to_primary(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri=db.uri, max_lag=5)
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(uut, 'replica_lag', return_value=6):
+            engine = uut.engine
+
+        # -- Assert ----------------------------------------------------------
+
+        assert engine.pool is db.engine.pool
+
+    def test__lag_check_fails__should_fall_back_to_primary(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri=db.uri)
+
+        error = OperationalError('SELECT', {}, Exception('Unreachable'))
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(uut, 'replica_lag', side_effect=error):
+            engine = uut.engine
+
+        # -- Assert ----------------------------------------------------------
+
+        assert engine.pool is db.engine.pool
+
+    def test__is_fresh__should_only_check_lag_once_per_interval(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri=db.uri)
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(uut, 'replica_lag', return_value=0) as lag_mock:
+            uut.is_fresh()
+            uut.is_fresh()
+            uut.is_fresh()
+
+        # -- Assert ----------------------------------------------------------
+
+        lag_mock.assert_called_once()
+
+    def test__lag_is_being_checked__should_use_previous_result(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri=db.uri)
+
+        with patch.object(uut, 'replica_lag', return_value=0):
+            uut.is_fresh()
+
+        # -- Act -------------------------------------------------------------
+
+        results = []
+
+        def _check_concurrently(*args):
+            thread = Thread(target=lambda: results.append(uut.is_fresh()))
+            thread.start()
+            thread.join(timeout=5)
+            return 10
+
+        with patch.object(uut, 'is_check_due', return_value=True), \
+                patch.object(uut, 'replica_lag') as lag_mock:
+            lag_mock.side_effect = _check_concurrently
+            is_fresh = uut.is_fresh()
+
+        # -- Assert ----------------------------------------------------------
+
+        lag_mock.assert_called_once()
+        assert results == [True]
+        assert is_fresh is False
+
+    def test__session__should_be_read_only(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = self.create_uut(uri='')
+
+        # -- Act + Assert ----------------------------------------------------
+
+        with uut.make_session() as read_session:
+            with pytest.raises(InternalError):
+                read_session.execute(text(
+                    "INSERT INTO meteringpoint (gsrn) VALUES ('gsrn1')"))
+
+
+class TestStatementCounter:
+    """Tests StatementCounter."""
+
+    def test__should_count_statements_executed_by_current_thread_only(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = StatementCounter()
+        uut.start()
+        uut.start()
+
+        # Begins the transaction (and its SAVEPOINT when testing)
+        session.execute(text('SELECT 0'))
+
+        count_before = uut.count
+
+        def _execute_in_other_thread():
+            with db.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+
+        # -- Act -------------------------------------------------------------
+
+        session.execute(text('SELECT 1'))
+        session.execute(text('SELECT 2'))
+
+        thread = Thread(target=_execute_in_other_thread)
+        thread.start()
+        thread.join()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert uut.count - count_before == 2
+
+
+class TestSqlProfiler:
+    """Tests SqlProfiler."""
+
+    @pytest.fixture(scope='function')
+    def profiler(self, session: db.Session):
+        """Start a SqlProfiler, which only logs repeated statements."""
+
+        # Begins the transaction (and its SAVEPOINT when testing)
+        session.execute(text('SELECT 0'))
+
+        profiler = SqlProfiler(slow_threshold=float('inf'), repeat_threshold=3)
+        profiler.start()
+
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+
+    def test__unit_of_work__should_count_statements_and_log_repeated_ones(
+            self,
+            session: db.Session,
+            profiler: SqlProfiler,
+            caplog,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        with caplog.at_level(logging.INFO):
+            profiler.begin('unit')
+
+            for i in range(3):
+                session.execute(text('SELECT :i'), {'i': i})
+
+            session.execute(text('SELECT 1'))
+
+            profile = profiler.end()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert profile.name == 'unit'
+        assert profile.statements == 4
+        assert profile.duration > 0
+        assert profile.get_repeated(3) == [('SELECT %(i)s', 3)]
+
+        assert 'SQL profile of unit: 4 statements' in caplog.text
+        assert 'Statement executed 3 times in unit' in caplog.text
+
+    def test__nested_unit_of_work__should_only_count_statements_once(
+            self,
+            session: db.Session,
+            profiler: SqlProfiler,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        profiler.begin('outer')
+        session.execute(text('SELECT 1'))
+
+        with profiler.unit_of_work('inner'):
+            session.execute(text('SELECT 2'))
+
+        outer = profiler.end()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert outer.statements == 1
+        assert profiler.end() is None
+
+    def test__slow_statement__should_log_statement_with_explain_plan(
+            self,
+            session: db.Session,
+            profiler: SqlProfiler,
+            caplog,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        profiler.slow_threshold = 0
+
+        # -- Act -------------------------------------------------------------
+
+        with caplog.at_level(logging.WARNING):
+            session.execute(text('SELECT 1 AS one'))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert 'Slow statement' in caplog.text
+        assert 'SELECT 1 AS one' in caplog.text
+        assert 'Result' in caplog.text
+
+    def test__explain_fails__should_not_abort_transaction(
+            self,
+            session: db.Session,
+            profiler: SqlProfiler,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        plan = profiler.explain(
+            conn=session.connection(),
+            statement='SELECT * FROM table_which_does_not_exist',
+            parameters={},
+        )
+
+        # -- Assert ----------------------------------------------------------
+
+        assert plan.startswith('(EXPLAIN failed')
+        assert session.execute(text('SELECT 1')).scalar() == 1
+
+    def test__not_started__should_not_profile(self, session: db.Session):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = SqlProfiler(slow_threshold=0, repeat_threshold=1)
+
+        # -- Act -------------------------------------------------------------
+
+        with uut.unit_of_work('unit'):
+            session.execute(text('SELECT 1'))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert uut.end() is None
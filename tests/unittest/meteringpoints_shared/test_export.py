@@ -0,0 +1,158 @@
+import io
+import json
+from unittest.mock import patch
+from origin.models.tech import TechnologyType
+from origin.models.meteringpoints import MeteringPointType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointAddress,
+    DbMeteringPointTechnology,
+    DbTechnology,
+    MeteringPointFilters,
+)
+from meteringpoints_shared.export import (
+    ExportFormat,
+    export_meteringpoints,
+    main,
+)
+
+
+def seed(session: db.Session, count: int):
+    """Add MeteringPoints with addresses in alternating sectors."""
+
+    for i in range(count):
+        session.add(DbMeteringPoint(
+            gsrn=f'gsrn{i:03d}',
+            type=MeteringPointType.CONSUMPTION,
+            sector=f'DK{i % 2 + 1}',
+        ))
+        session.add(DbMeteringPointAddress(
+            gsrn=f'gsrn{i:03d}',
+            street_name=f'street{i}',
+        ))
+
+    session.commit()
+
+
+class TestExportMeteringPoints:
+    """Tests export_meteringpoints()."""
+
+    def test__ndjson__should_stream_all_meteringpoints_in_batches(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        seed(session, 25)
+
+        # -- Act -------------------------------------------------------------
+
+        lines = export_meteringpoints(
+            session=session,
+            format=ExportFormat.NDJSON,
+            batch_size=10,
+        )
+
+        first = next(lines)
+        rest = list(lines)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert json.loads(first)['gsrn'] == 'gsrn000'
+        assert [json.loads(line)['gsrn'] for line in rest] == \
+               [f'gsrn{i:03d}' for i in range(1, 25)]
+        assert json.loads(rest[-1])['address']['street_name'] == 'street24'
+
+    def test__csv_with_filters__should_only_export_matching_meteringpoints(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        seed(session, 5)
+
+        # -- Act -------------------------------------------------------------
+
+        lines = list(export_meteringpoints(
+            session=session,
+            format=ExportFormat.CSV,
+            filters=MeteringPointFilters(sector=['DK2']),
+        ))
+
+        # -- Assert ----------------------------------------------------------
+
+        assert [line.split(',')[0] for line in lines] == \
+               ['gsrn', 'gsrn001', 'gsrn003']
+
+
+class TestMain:
+    """Tests the export command line."""
+
+    def test__should_write_export_to_stdout(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        seed(session, 3)
+
+        stdout = io.StringIO()
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('sys.stdout', new=stdout), patch.object(stdout, 'close'):
+            main(['--format', 'csv', '--sector', 'DK1'])
+
+        # -- Assert ----------------------------------------------------------
+
+        assert stdout.getvalue().splitlines()[1:] == [
+            'gsrn000,consumption,DK1,,street0,,,,,,,,,,',
+            'gsrn002,consumption,DK1,,street2,,,,,,,,,,',
+        ]
+
+    def test__meteringpoints_have_technology__should_export_technology(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        session.add(DbMeteringPoint(gsrn='gsrn000', sector='DK1'))
+        session.add(DbMeteringPointTechnology(
+            gsrn='gsrn000', tech_code='T1', fuel_code='F1'))
+        session.add(DbTechnology(
+            tech_code='T1', fuel_code='F1', type=TechnologyType.SOLAR))
+        session.commit()
+
+        ndjson = io.StringIO()
+        csv = io.StringIO()
+
+        # -- Act -------------------------------------------------------------
+
+        # Outside of the API, which would otherwise load the catalogue
+        with patch('sys.stdout', new=ndjson), patch.object(ndjson, 'close'):
+            main(['--format', 'ndjson'])
+
+        with patch('sys.stdout', new=csv), patch.object(csv, 'close'):
+            main(['--format', 'csv'])
+
+        # -- Assert ----------------------------------------------------------
+
+        assert json.loads(ndjson.getvalue())['technology'] == {
+            'tech_code': 'T1',
+            'fuel_code': 'F1',
+            'type': 'solar',
+        }
+
+        assert csv.getvalue().splitlines()[1:] == [
+            'gsrn000,,DK1,,,,,,,,,,,T1,F1',
+        ]
@@ -0,0 +1,78 @@
+from typing import Iterable
+
+from prometheus_client import CollectorRegistry
+from prometheus_client.core import (
+    Metric,
+    GaugeMetricFamily,
+    CounterMetricFamily,
+)
+
+from meteringpoints_shared.metrics import ProcessCollector, MultiProcessWriter
+
+
+class FakeCollector(ProcessCollector):
+    """Collects a counter and a gauge with values set by tests."""
+
+    def __init__(self):
+        self.count = 0
+        self.value = 0
+
+    def collect_metrics(self) -> Iterable[Metric]:
+        """Collect metrics."""
+
+        count = CounterMetricFamily(
+            'fake_count', 'Fake counter', labels=['name'])
+        value = GaugeMetricFamily(
+            'fake_value', 'Fake gauge', labels=['name'])
+
+        count.add_metric(['a'], self.count)
+        value.add_metric(['a'], self.value)
+
+        return count, value
+
+
+class TestMultiProcessWriter:
+    """Tests MultiProcessWriter."""
+
+    def test__write__should_write_gauges_and_increase_counters(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        registry = CollectorRegistry()
+        collector = FakeCollector()
+        uut = MultiProcessWriter(registry=registry)
+
+        # -- Act -------------------------------------------------------------
+
+        collector.count, collector.value = 3, 10
+        uut.write(collector)
+
+        collector.count, collector.value = 5, 7
+        uut.write(collector)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert registry.get_sample_value('fake_count_total', {'name': 'a'}) == 5  # noqa: E501
+        assert registry.get_sample_value('fake_value', {'name': 'a'}) == 7
+
+    def test__counter_is_reset__should_increase_by_new_value(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        registry = CollectorRegistry()
+        collector = FakeCollector()
+        uut = MultiProcessWriter(registry=registry)
+
+        collector.count = 3
+        uut.write(collector)
+
+        # -- Act -------------------------------------------------------------
+
+        collector.count = 2
+        uut.write(collector)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert registry.get_sample_value('fake_count_total', {'name': 'a'}) == 5  # noqa: E501
@@ -407,6 +407,109 @@ class TestMeteringPointQuery:
         assert len(results) == len(seed_meteringpoints)
         assert [mp.gsrn for mp in results] == gsrn_expected
 
+    @pytest.mark.parametrize('ordering', (
+        None,
+        MeteringPointOrdering(
+            key=MeteringPointOrderingKeys.GSRN,
+            order=Order.DESC,
+        ),
+        MeteringPointOrdering(
+            key=MeteringPointOrderingKeys.TYPE,
+            order=Order.ASC,
+        ),
+        MeteringPointOrdering(
+            key=MeteringPointOrderingKeys.TYPE,
+            order=Order.DESC,
+        ),
+        MeteringPointOrdering(
+            key=MeteringPointOrderingKeys.SECTOR,
+            order=Order.ASC,
+        ),
+        MeteringPointOrdering(
+            key=MeteringPointOrderingKeys.SECTOR,
+            order=Order.DESC,
+        ),
+    ))
+    @pytest.mark.parametrize('limit', (1, 2, 10))
+    def test__paginate__should_return_all_meteringpoints_in_correct_order_across_pages(  # noqa: E501
+            self,
+            session: db.Session,
+            ordering: MeteringPointOrdering,
+            limit: int,
+    ):
+        """
+        TODO.
+
+        :param session: Database session
+        :param ordering: Ordering to paginate by
+        :param limit: Page size
+        """
+
+        # -- Arrange ---------------------------------------------------------
+
+        # MeteringPoints with NULL type and sector
+        session.begin()
+        session.add(DbMeteringPoint(gsrn='gsrn8'))
+        session.add(DbMeteringPoint(gsrn='gsrn9'))
+        session.commit()
+
+        # Types are ordered as declared, and NULLs last (when ascending)
+        types = list(MeteringPointType)
+
+        if ordering is None or ordering.key is MeteringPointOrderingKeys.GSRN:
+            func = lambda mp: mp.gsrn   # noqa: E731
+        elif ordering.key is MeteringPointOrderingKeys.TYPE:
+            func = lambda mp: (mp.type is None, types.index(mp.type) if mp.type else 0, mp.gsrn)  # noqa: E501,E731
+        elif ordering.key is MeteringPointOrderingKeys.SECTOR:
+            func = lambda mp: (mp.sector is None, mp.sector or '', mp.gsrn)  # noqa: E501,E731
+        else:
+            raise RuntimeError('Should not happen')
+
+        gsrn_expected = [mp.gsrn for mp in sorted(
+            MeteringPointQuery(session).all(),
+            key=func,
+            reverse=ordering is not None and ordering.order == Order.DESC,
+        )]
+
+        # -- Act -------------------------------------------------------------
+
+        pages = []
+        cursor = None
+
+        while True:
+            results, cursor = MeteringPointQuery(session) \
+                .paginate(ordering=ordering, cursor=cursor, limit=limit)
+
+            pages.append(results)
+
+            if cursor is None:
+                break
+
+        # -- Assert ----------------------------------------------------------
+
+        assert all(len(page) <= limit for page in pages)
+        assert [mp.gsrn for page in pages for mp in page] == gsrn_expected
+
+    @pytest.mark.parametrize('cursor', (
+        'invalid',
+        'eyJrZXkiOiAic2VjdG9yIiwgInZhbHVlcyI6IFsiREsxIiwgImdzcm4wIl19',
+    ))
+    def test__paginate__invalid_cursor__should_raise_invalid_cursor(
+            self,
+            session: db.Session,
+            cursor: str,
+    ):
+        """
+        TODO.
+
+        :param session: Database session
+        :param cursor: Invalid cursor (or cursor for another ordering)
+        """
+
+        with pytest.raises(MeteringPointQuery.InvalidCursor):
+            MeteringPointQuery(session) \
+                .paginate(ordering=None, cursor=cursor, limit=10)
+
 
 class TestMeteringPointAddressQuery:
     """Tests MeteringPointAddressQuery."""
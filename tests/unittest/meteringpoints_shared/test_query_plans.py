@@ -0,0 +1,288 @@
+import pytest
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import engine, event, text
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.dialects import postgresql
+
+from origin.models.common import Order
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.models import (
+    DbSubjectMeteringPoint,
+    MeteringPointOrdering,
+    MeteringPointOrderingKeys,
+)
+from meteringpoints_shared.queries import (
+    MeteringPointQuery,
+    SubjectMeteringPointQuery,
+)
+
+
+# Number of rows to seed into meteringpoint_delegate. Large enough for
+# the planner to prefer an index over a sequential scan for real reasons.
+DELEGATE_ROWS = 2_000_000
+
+# Number of meteringpoints, and number of delegates per subject
+METERINGPOINTS = 100_000
+DELEGATES_PER_SUBJECT = 10
+
+# Number of rows to seed into subject_meteringpoint
+SUBJECT_METERINGPOINT_ROWS = 500_000
+
+
+@pytest.fixture(scope='class')
+def class_session(database: str) -> Iterator[db.Session]:
+    """
+    Session shared by the tests of a class, rolled back afterwards.
+
+    Lets a class seed a large table once for all of its tests.
+    """
+    connection = db.engine.connect()
+    transaction = connection.begin()
+
+    try:
+        with Session(bind=connection) as session:
+            yield session
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope='class')
+def delegate_session(class_session: db.Session) -> Iterator[db.Session]:
+    """Seed meteringpoints and delegates using generate_series()."""
+
+    class_session.execute(text(
+        'INSERT INTO meteringpoint (gsrn, sector, type) '
+        'SELECT \'gsrn-\' || i, \'DK1\', \'CONSUMPTION\' '
+        'FROM generate_series(0, :n - 1) AS i'
+    ), {'n': METERINGPOINTS})
+
+    class_session.execute(text(
+        'INSERT INTO meteringpoint_delegate (gsrn, subject) '
+        'SELECT \'gsrn-\' || (i % :mps), '
+        '\'subject-\' || (i / :per_subject) '
+        'FROM generate_series(0, :n - 1) AS i'
+    ), {
+        'n': DELEGATE_ROWS,
+        'mps': METERINGPOINTS,
+        'per_subject': DELEGATES_PER_SUBJECT,
+    })
+
+    class_session.execute(text('ANALYZE meteringpoint'))
+    class_session.execute(text('ANALYZE meteringpoint_delegate'))
+
+    yield class_session
+
+
+@pytest.fixture(scope='class')
+def read_model_session(class_session: db.Session) -> Iterator[db.Session]:
+    """Seed subject_meteringpoint using generate_series()."""
+
+    class_session.execute(text(
+        'INSERT INTO subject_meteringpoint '
+        '(subject, gsrn, sector, type, street_name) '
+        'SELECT \'subject-\' || (i / :per_subject), \'gsrn-\' || i, '
+        '\'DK1\', \'CONSUMPTION\', \'street\' '
+        'FROM generate_series(0, :n - 1) AS i'
+    ), {
+        'n': SUBJECT_METERINGPOINT_ROWS,
+        'per_subject': DELEGATES_PER_SUBJECT,
+    })
+
+    class_session.execute(text('ANALYZE subject_meteringpoint'))
+
+    yield class_session
+
+
+def explain(session: db.Session, query: Query) -> Dict[str, Any]:
+    """Return the (JSON) query plan for query."""
+
+    sql = query.statement.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={'literal_binds': True},
+    )
+
+    res = session.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'))
+
+    return res.scalar()[0]['Plan']
+
+
+@contextmanager
+def capture_statements() -> Iterator[List[Tuple[str, Any]]]:
+    """Capture statements (and their parameters) executed within context."""
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(engine.Engine, 'before_cursor_execute', _capture)
+
+    try:
+        yield statements
+    finally:
+        event.remove(engine.Engine, 'before_cursor_execute', _capture)
+
+
+def explain_statement(
+        session: db.Session,
+        statement: str,
+        parameters: Any,
+) -> Dict[str, Any]:
+    """Return the (JSON) query plan for an executed statement."""
+
+    res = session.connection().exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+
+    return res.scalar()[0]['Plan']
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Yield all nodes in a query plan (depth first)."""
+
+    yield plan
+
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def delegate_scans(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return plan nodes which scan the meteringpoint_delegate table."""
+
+    return [
+        node for node in plan_nodes(plan)
+        if node.get('Relation Name') == 'meteringpoint_delegate'
+    ]
+
+
+class TestDelegateQueryPlans:
+    """
+    Regression tests for the query plans of access checks.
+
+    Asserts that access checks on a large meteringpoint_delegate
+    table are resolved using an index rather than a sequential scan.
+    """
+
+    def test__is_accessible_by__should_scan_subject_gsrn_index(
+            self,
+            delegate_session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        query = MeteringPointQuery(delegate_session) \
+            .is_accessible_by('subject-123') \
+            .query
+
+        # -- Act -------------------------------------------------------------
+
+        plan = explain(delegate_session, query)
+
+        # -- Assert ----------------------------------------------------------
+
+        scans = delegate_scans(plan)
+
+        assert len(scans) == 1
+        assert scans[0]['Node Type'] in ('Index Scan', 'Index Only Scan')
+        assert scans[0]['Index Name'] == 'ix_meteringpoint_delegate_subject_gsrn'  # noqa: E501
+
+    def test__is_accessible_by__has_gsrn__should_not_scan_sequentially(
+            self,
+            delegate_session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        query = MeteringPointQuery(delegate_session) \
+            .is_accessible_by('subject-123') \
+            .has_gsrn('gsrn-123') \
+            .query
+
+        # -- Act -------------------------------------------------------------
+
+        plan = explain(delegate_session, query)
+
+        # -- Assert ----------------------------------------------------------
+
+        scans = delegate_scans(plan)
+
+        assert len(scans) == 1
+        assert scans[0]['Node Type'] in ('Index Scan', 'Index Only Scan')
+
+
+class TestSubjectMeteringPointQueryPlans:
+    """
+    Regression tests for the query plans of the subject read model.
+
+    Asserts that listing MeteringPoints accessible by a subject is a
+    single index range scan, without joining any other tables.
+    """
+
+    def test__list_page__should_range_scan_primary_key_without_joins(
+            self,
+            read_model_session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        query = SubjectMeteringPointQuery(read_model_session) \
+            .is_accessible_by('subject-123') \
+            .query \
+            .order_by(DbSubjectMeteringPoint.gsrn) \
+            .limit(101)
+
+        # -- Act -------------------------------------------------------------
+
+        plan = explain(read_model_session, query)
+
+        # -- Assert ----------------------------------------------------------
+
+        nodes = list(plan_nodes(plan))
+        scans = [node for node in nodes if 'Relation Name' in node]
+
+        assert len(scans) == 1
+        assert scans[0]['Node Type'] == 'Index Scan'
+        assert scans[0]['Index Name'] == 'subject_meteringpoint_pkey'
+        assert not any('Join' in node['Node Type'] for node in nodes)
+        assert not any(node['Node Type'] == 'Sort' for node in nodes)
+
+    def test__paginate_by_type__deep_page__should_range_scan_index_without_sorting(  # noqa: E501
+            self,
+            read_model_session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        query = SubjectMeteringPointQuery(read_model_session) \
+            .is_accessible_by('subject-123')
+
+        ordering = MeteringPointOrdering(
+            key=MeteringPointOrderingKeys.TYPE,
+            order=Order.DESC,
+        )
+
+        _, cursor = query.paginate(ordering=ordering, cursor=None, limit=2)
+
+        # -- Act -------------------------------------------------------------
+
+        with capture_statements() as statements:
+            query.paginate(ordering=ordering, cursor=cursor, limit=2)
+
+        plan = explain_statement(read_model_session, *statements[0])
+
+        # -- Assert ----------------------------------------------------------
+
+        nodes = list(plan_nodes(plan))
+        scans = [node for node in nodes if 'Relation Name' in node]
+
+        assert len(scans) == 1
+        assert scans[0]['Node Type'] == 'Index Scan'
+        assert scans[0]['Index Name'] == 'ix_subject_meteringpoint_subject_type_gsrn'  # noqa: E501
+        assert not any(node['Node Type'] == 'Sort' for node in nodes)
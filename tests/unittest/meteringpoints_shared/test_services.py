@@ -0,0 +1,130 @@
+import pytest
+from threading import Thread
+from unittest.mock import patch
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from meteringpoints_shared.services import HttpClient
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Responds 200 OK to every GET request."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # noqa: N802
+        """TODO."""
+
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'OK')
+
+    def log_message(self, *args):
+        """TODO."""
+
+
+@pytest.fixture(scope='function')
+def server_url():
+    """URL of a local HTTP server."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpClient:
+    """Tests HttpClient."""
+
+    def test__get__no_timeout_provided__should_use_configured_timeouts(
+            self,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        client = HttpClient(pool_size=2, connect_timeout=1, read_timeout=5)
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(client.session, 'get') as get:
+            client.get('http://foo/bar', headers={'foo': 'bar'})
+
+        # -- Assert ----------------------------------------------------------
+
+        get.assert_called_once_with(
+            'http://foo/bar',
+            headers={'foo': 'bar'},
+            timeout=(1, 5),
+        )
+
+    def test__get__timeout_provided__should_use_provided_timeout(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        client = HttpClient(pool_size=2, connect_timeout=1, read_timeout=5)
+
+        # -- Act -------------------------------------------------------------
+
+        with patch.object(client.session, 'get') as get:
+            client.get('http://foo/bar', timeout=30)
+
+        # -- Assert ----------------------------------------------------------
+
+        get.assert_called_once_with('http://foo/bar', timeout=30)
+
+    def test__session__should_reuse_pooled_session(self):
+        """TODO."""
+
+        client = HttpClient(pool_size=2, connect_timeout=1, read_timeout=5)
+
+        adapter = client.session.get_adapter('http://foo')
+
+        assert client.session is client.session
+        assert adapter._pool_maxsize == 2
+        assert adapter._pool_block is False
+
+    def test__session__pool_block__should_use_blocking_pool(self):
+        """TODO."""
+
+        client = HttpClient(
+            pool_size=2,
+            connect_timeout=1,
+            read_timeout=5,
+            pool_block=True,
+        )
+
+        adapter = client.session.get_adapter('http://foo')
+
+        assert adapter._pool_block is True
+
+    def test__get__pool_is_exhausted__should_not_wait_for_pooled_connection(
+            self,
+            server_url: str,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        client = HttpClient(pool_size=1, connect_timeout=1, read_timeout=5)
+
+        # Holds the only pooled connection until its body is read
+        in_use = client.get(f'{server_url}/foo', stream=True)
+
+        # -- Act -------------------------------------------------------------
+
+        responses = []
+        request = Thread(target=lambda: responses.append(
+            client.get(f'{server_url}/foo')), daemon=True)
+        request.start()
+        request.join(timeout=5)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert not request.is_alive()
+        assert [r.status_code for r in responses] == [200]
+
+        in_use.close()
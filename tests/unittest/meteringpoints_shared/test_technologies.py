@@ -0,0 +1,179 @@
+from unittest.mock import Mock, patch
+from origin.models.tech import Technology, TechnologyType
+
+from meteringpoints_shared.db import db
+from meteringpoints_shared.queries import MeteringPointQuery, TechnologyQuery
+from meteringpoints_shared.technologies import (
+    TechnologyCatalogue,
+    technology_catalogue,
+)
+from meteringpoints_shared.models import (
+    DbMeteringPoint,
+    DbMeteringPointTechnology,
+    DbTechnology,
+)
+
+
+TECHNOLOGY = Technology(
+    tech_code='T1',
+    fuel_code='F1',
+    type=TechnologyType.SOLAR,
+)
+
+
+def seed(session: db.Session):
+    """Add a Technology and a MeteringPoint using it."""
+
+    session.add(DbTechnology(
+        tech_code='T1',
+        fuel_code='F1',
+        type=TechnologyType.SOLAR,
+    ))
+    session.add(DbMeteringPoint(gsrn='gsrn1'))
+    session.add(DbMeteringPointTechnology(
+        gsrn='gsrn1',
+        tech_code='T1',
+        fuel_code='F1',
+    ))
+    session.commit()
+
+
+class TestTechnologyCatalogue:
+    """Tests TechnologyCatalogue."""
+
+    def test__refresh__should_load_technologies_once_and_get_by_codes(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        seed(session)
+
+        get_technologies = Mock(return_value=TechnologyQuery(session).all())
+
+        uut = TechnologyCatalogue(ttl=0)
+
+        # -- Act -------------------------------------------------------------
+
+        uut.refresh(get_technologies)
+        uut.refresh(get_technologies)
+
+        technology = uut.get(tech_code='T1', fuel_code='F1')
+        unknown = uut.get(tech_code='T1', fuel_code='F2')
+
+        # -- Assert ----------------------------------------------------------
+
+        get_technologies.assert_called_once()
+
+        assert technology == Technology(
+            tech_code='T1',
+            fuel_code='F1',
+            type=TechnologyType.SOLAR,
+        )
+        assert unknown is None
+
+    def test__ttl_expired__should_reload_technologies(self):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = TechnologyCatalogue(ttl=60)
+        uut.refresh(lambda: [])
+
+        # -- Act -------------------------------------------------------------
+
+        with patch('meteringpoints_shared.technologies.monotonic',
+                   return_value=uut._loaded_at + 60):
+            uut.refresh(lambda: [TECHNOLOGY])
+
+        # -- Assert ----------------------------------------------------------
+
+        assert uut.get(tech_code='T1', fuel_code='F1') == TECHNOLOGY
+
+    def test__get__not_loaded__should_return_none_without_loading(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        seed(session)
+
+        uut = TechnologyCatalogue(ttl=0)
+
+        # -- Act -------------------------------------------------------------
+
+        technology = uut.get(tech_code='T1', fuel_code='F1')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert technology is None
+        assert uut.is_stale
+
+    def test__set_and_remove__should_update_catalogue_without_reloading(
+            self,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        uut = TechnologyCatalogue(ttl=0)
+        uut.load([TECHNOLOGY])
+
+        technology = Technology(
+            tech_code='T2',
+            fuel_code='F2',
+            type=TechnologyType.WIND,
+        )
+
+        # -- Act -------------------------------------------------------------
+
+        uut.set(technology)
+        uut.remove(tech_code='T1', fuel_code='F1')
+
+        # -- Assert ----------------------------------------------------------
+
+        assert uut.get(tech_code='T2', fuel_code='F2') == technology
+        assert uut.get(tech_code='T1', fuel_code='F1') is None
+
+
+class TestDbMeteringPointTechnology:
+    """Tests resolving DbMeteringPoint.technology."""
+
+    def test__should_resolve_technology_from_catalogue(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Arrange ---------------------------------------------------------
+
+        seed(session)
+
+        technology_catalogue.load(TechnologyQuery(session))
+
+        # -- Act -------------------------------------------------------------
+
+        meteringpoint = MeteringPointQuery(session).has_gsrn('gsrn1').one()
+
+        # -- Assert ----------------------------------------------------------
+
+        assert meteringpoint.technology.type is TechnologyType.SOLAR
+
+    def test__query__should_not_join_technology_table(
+            self,
+            session: db.Session,
+    ):
+        """TODO."""
+
+        # -- Act -------------------------------------------------------------
+
+        statement = str(MeteringPointQuery(session).has_gsrn('gsrn1').query)
+
+        # -- Assert ----------------------------------------------------------
+
+        assert 'meteringpoint_technology' in statement
+        assert 'JOIN technology' not in statement